@@ -1,6 +1,14 @@
 """PyTest fixtures."""
+import asyncio
+from http.server import BaseHTTPRequestHandler, HTTPServer
 import json
+import logging
 import os
+import socketserver
+import ssl
+import threading
+import timeit
+import tracemalloc
 
 import pytest
 
@@ -10,6 +18,175 @@ DATA_DIR = os.path.join(BASE_DIR, 'data')
 TEST_IPV4_FPATH = os.path.join(DATA_DIR, 'test_ipv4_addresses.json')
 TEST_SUBDOMAINS_FPATH = os.path.join(DATA_DIR, 'test_subdomains.json')
 
+TEST_SERVER_CERT_FPATH = os.path.join(DATA_DIR, 'test_server.crt')
+TEST_SERVER_KEY_FPATH = os.path.join(DATA_DIR, 'test_server.key')
+
+# Benchmarks report their numbers and assert only that an optimized variant
+# beats a baseline, as exact timing ratios are not reliable on loaded machines
+BENCHMARK_LOGGER = logging.getLogger('benchmark')
+
+
+def measure_time(func, number=1, repeat=3):
+    """Return a best time of running a function a given number of times."""
+    return min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def measure_memory(factory, count):
+    """Return an average number of bytes allocated per created object.
+
+    :param factory: Function of an object index which creates an object.
+    :param count:   Number of objects to create.
+    """
+    tracemalloc.start()
+
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [factory(i) for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+
+    finally:
+        tracemalloc.stop()
+
+    assert len(objects) == count
+    return (after - before) / count
+
+
+def run_async(coro):
+    """Run a coroutine in a new event loop and close the loop.
+
+    Same as `asyncio.run`, which is only available since Python 3.7.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        return loop.run_until_complete(coro)
+
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def report_benchmark(title, fmt='%.4fs', **results):
+    """Log benchmark results formatted with a given format and return them."""
+    BENCHMARK_LOGGER.info('%s: %s', title, ', '.join(
+        '%s=%s' % (name, fmt % value) for name, value in results.items()
+    ))
+
+    return results
+
+
+class StubAPIRequestHandler(BaseHTTPRequestHandler):
+    """Keep-alive request handler which serves routes of a stub server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        """."""
+        super().setup()
+
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):  # pylint: disable=C0103
+        """."""
+        self.handle_route()
+
+    def do_POST(self):  # pylint: disable=C0103
+        """."""
+        self.handle_route()
+
+    def handle_route(self):
+        """Send a response of a route matching a request."""
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        with self.server.lock:
+            self.server.requests.append((
+                self.command,
+                self.path,
+                dict(self.headers),
+                body
+            ))
+
+        try:
+            route = self.server.routes[self.path.split('?')[0]]
+
+        except KeyError:
+            route = (404, {'error': {'name': 'no_such_endpoint'}})
+
+        if callable(route):
+            route = route(self, body)
+
+        status, data = route[:2]
+        headers = route[2] if len(route) > 2 else {}
+
+        data = data if isinstance(data, bytes) else json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+
+        if not self.server.keep_alive:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        """Do not log requests to stderr."""
+
+
+class StubAPIServer(socketserver.ThreadingMixIn, HTTPServer):
+    """Local stand-in of an API server.
+
+    Routes map request paths (without a query string) to either
+    `(status, data[, headers])` tuples or functions of a request handler and
+    a decoded request body which return such tuples.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, routes, tls=False):
+        """."""
+        super().__init__(('127.0.0.1', 0), StubAPIRequestHandler)
+
+        self.routes = routes
+        self.keep_alive = True
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+        scheme = 'http'
+
+        if tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(
+                TEST_SERVER_CERT_FPATH,
+                TEST_SERVER_KEY_FPATH
+            )
+
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+            scheme = 'https'
+
+        self.base_url = '%s://127.0.0.1:%i/v1' % (
+            scheme,
+            self.server_address[1]
+        )
+
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close a listening socket."""
+        self.shutdown()
+        self.server_close()
+
 
 @pytest.fixture(scope='session')
 def test_ipv4_addresses():
@@ -23,3 +200,36 @@ def test_subdomains():
     """Load and return a list of test subdomain dictionaries."""
     with open(TEST_SUBDOMAINS_FPATH) as infile:
         return json.load(infile)
+
+
+@pytest.fixture
+def api_server(test_subdomains):
+    """Start a stub API server serving test data and errors.
+
+    Reference IDs of all responses are consistent with each other, as they
+    are with a real API.
+    """
+    references = test_subdomains[0][1]
+
+    server = StubAPIServer({
+        '/v1/ip/8.8.8.8': (200, [
+            references['1'],
+            {'2': references['2'], '3': references['3']}
+        ]),
+        '/v1/subdomain/foo.example.com': (200, test_subdomains[0]),
+        '/v1/ip/1.1.1.1': (429, {'error': {
+            'name': 'rate_limit_exceeded',
+            'message': 'Slow down'
+        }}, {'Retry-After': '0'}),
+        '/v1/ip/1.0.0.1': (500, b'Internal Server Error'),
+        '/v1/ip/9.9.9.9': (200, [])
+    })
+
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def tls_context():
+    """Return a client SSL context which trusts a stub server certificate."""
+    return ssl.create_default_context(cafile=TEST_SERVER_CERT_FPATH)
@@ -0,0 +1,290 @@
+"""Test zeroguard.batching module."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+# pylint: disable=E0401
+from conftest import run_async
+from zeroguard.batching import AsyncBatcher, Batcher
+from zeroguard.client import AsyncClient, Client
+from zeroguard.errors.client import (
+    ZGClientError,
+    ZGCommunicationError,
+    ZGSanityCheckFailed
+)
+from zeroguard.errors.server import ZGEmptyResult, ZGInternalServerError
+from zeroguard.retry import RetryPolicy
+
+# Reference IDs of IPv4 addresses of a test subdomain reference table
+TEST_IPV4_REFS = {'8.8.8.8': '1', '8.8.4.4': '4'}
+
+
+class Recorder:
+    """Bulk send function which records its batches."""
+
+    def __init__(self):
+        """."""
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, queries):
+        """."""
+        with self.lock:
+            self.batches.append(sorted(queries))
+
+        return {q: q * 2 for q in queries if q != 'missing'}
+
+
+@pytest.fixture
+def bulk_api_server(api_server, test_subdomains):
+    """Add bulk lookup routes to a stub API server."""
+    references = test_subdomains[0][1]
+
+    def bulk_ip(handler, body):
+        envelopes = []
+        table = {'2': references['2'], '3': references['3']}
+
+        # Shared prefixes are sent only once per response
+        for query in body['queries']:
+            if query in TEST_IPV4_REFS:
+                envelopes.append([references[TEST_IPV4_REFS[query]], table])
+                table = {}
+
+        return 200, envelopes
+
+    def bulk_subdomain(handler, body):
+        if 'foo.example.com' in body['queries']:
+            return 200, [test_subdomains[0]]
+
+        return 200, []
+
+    api_server.routes['/v1/ip/bulk'] = bulk_ip
+    api_server.routes['/v1/subdomain/bulk'] = bulk_subdomain
+
+    return api_server
+
+
+def test_batcher():
+    """Queries of many threads are sent in batches."""
+    send = Recorder()
+    batcher = Batcher(send, max_size=100, window=0.05)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(
+            lambda q: batcher.submit(q).result(),
+            ['a', 'b', 'c', 'a'] * 4
+        ))
+
+    assert results == ['aa', 'bb', 'cc', 'aa'] * 4
+    assert send.batches == [['a', 'b', 'c']]
+    assert batcher.stats == {'batches': 1, 'queries': 16, 'pending': 0}
+
+    # Full batches are sent right away
+    batcher = Batcher(send, max_size=2, window=10)
+    futures = [batcher.submit(q) for q in 'abc']
+
+    assert futures[0].result(timeout=1) == 'aa'
+    assert not futures[2].done()
+
+    batcher.flush()
+    assert futures[2].result(timeout=1) == 'cc'
+    assert send.batches[-2:] == [['a', 'b'], ['c']]
+
+    with pytest.raises(KeyError):
+        Batcher(send, window=0).submit('missing').result(timeout=1)
+
+    for kwargs in ({'max_size': 0}, {'window': -1}):
+        with pytest.raises(ZGSanityCheckFailed):
+            Batcher(send, **kwargs)
+
+
+def test_batcher_fail():
+    """A failed bulk request fails all queries of a batch."""
+    def send(queries):
+        raise ZGInternalServerError(500)
+
+    batcher = Batcher(send, window=0.01)
+    futures = [batcher.submit(q) for q in 'ab']
+
+    errors = []
+
+    for future in futures + [batcher.submit('a')]:
+        with pytest.raises(ZGInternalServerError) as excinfo:
+            future.result(timeout=1)
+
+        errors.append(excinfo.value)
+
+    # Every future raises its own error chained to a batch error
+    assert len(set(map(id, errors))) == 3
+    assert errors[0].__cause__ is errors[1].__cause__
+    assert isinstance(errors[0].__cause__, ZGInternalServerError)
+
+    class Unbuildable(Exception):
+        """Error which can not be copied."""
+
+        def __init__(self, *, code):
+            """."""
+            super().__init__()
+            self.code = code
+
+    def send_unbuildable(queries):
+        raise Unbuildable(code=1)
+
+    future = Batcher(send_unbuildable, window=0).submit('a')
+
+    with pytest.raises(ZGClientError) as excinfo:
+        future.result(timeout=1)
+
+    assert isinstance(excinfo.value.__cause__, Unbuildable)
+
+
+def test_async_batcher():
+    """Queries of many tasks are sent in batches."""
+    recorder = Recorder()
+
+    async def send(queries):
+        return recorder(queries)
+
+    async def run():
+        batcher = AsyncBatcher(send, max_size=3, window=0.01)
+
+        results = await asyncio.gather(
+            *(batcher.submit(q) for q in 'abcdea'),
+            batcher.submit('missing'),
+            return_exceptions=True
+        )
+
+        return batcher, results
+
+    batcher, results = run_async(run())
+
+    assert results[:6] == ['aa', 'bb', 'cc', 'dd', 'ee', 'aa']
+    assert isinstance(results[6], KeyError)
+
+    assert recorder.batches == [['a', 'b', 'c'], ['a', 'd', 'e'], ['missing']]
+    assert batcher.stats['batches'] == 3
+
+
+def test_async_batcher_event_loops():
+    """A batch left by a closed event loop does not block a next loop."""
+    recorder = Recorder()
+
+    async def send(queries):
+        return recorder(queries)
+
+    batcher = AsyncBatcher(send, window=0.01)
+
+    async def abandon():
+        batcher.submit('a')
+
+    async def run():
+        return await batcher.submit('b')
+
+    run_async(abandon())
+
+    assert run_async(run()) == 'bb'
+    assert recorder.batches == [['b']]
+
+
+def test_client_batching_timeout(bulk_api_server):
+    """Batched lookups are waited for no longer than a client timeout."""
+    release = threading.Event()
+
+    client = Client(
+        base_url=bulk_api_server.base_url,
+        timeout=0.1,
+        retry_policy=RetryPolicy(deadline=0),
+        batch_window=0.01
+    )
+
+    # pylint: disable=W0212
+    client._batchers['ip'].send = lambda queries: release.wait(5)
+
+    try:
+        with pytest.raises(ZGCommunicationError):
+            client.lookup_ip('8.8.8.8')
+
+    finally:
+        release.set()
+
+
+def test_client_batching(bulk_api_server):
+    """Concurrent lookups are coalesced into bulk requests."""
+    client = Client(base_url=bulk_api_server.base_url, batch_window=0.05)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [
+            executor.submit(client.lookup_ip, address)
+            for address in ['8.8.8.8', '8.8.4.4', '1.0.0.1'] * 2
+        ]
+
+        ipaddrs = [future.result() for future in futures[:2]]
+        assert str(ipaddrs[1].address) == '8.8.4.4'
+        assert ipaddrs[0].closest_prefix is ipaddrs[1].closest_prefix
+
+        with pytest.raises(ZGEmptyResult):
+            futures[2].result()
+
+    assert len(bulk_api_server.requests) == 1
+
+    method, path, _, body = bulk_api_server.requests[0]
+
+    assert (method, path) == ('POST', '/v1/ip/bulk')
+    assert sorted(body['queries']) == ['1.0.0.1', '8.8.4.4', '8.8.8.8']
+
+    subdomain = client.lookup_subdomain('FOO.example.com')
+    assert subdomain.latest_ipv4.closest_prefix is ipaddrs[0].closest_prefix
+
+    with pytest.raises(ValueError):
+        client.lookup_ip('foo')
+
+
+def test_async_client_batching(bulk_api_server):
+    """Concurrent tasks share bulk requests."""
+    async def run():
+        async with AsyncClient(
+                base_url=bulk_api_server.base_url,
+                batch_window=0.01,
+                batch_size=3
+        ) as client:
+            return await asyncio.gather(
+                client.lookup_ip('8.8.8.8'),
+                client.lookup_ip('8.8.4.4'),
+                client.lookup_ip('8.8.8.8'),
+                client.lookup_subdomain('foo.example.com')
+            )
+
+    ipaddr, _, same, subdomain = run_async(run())
+
+    # Identical queries of a batch share a result
+    assert same is ipaddr
+    assert subdomain.latest_ipv4.closest_prefix is ipaddr.closest_prefix
+
+    assert sorted(r[1] for r in bulk_api_server.requests) == [
+        '/v1/ip/bulk',
+        '/v1/subdomain/bulk'
+    ]
+
+
+def test_async_client_close(bulk_api_server):
+    """Pending batches are sent before a client is closed."""
+    async def run():
+        async with AsyncClient(
+                base_url=bulk_api_server.base_url,
+                batch_window=60
+        ) as client:
+            tasks = [
+                asyncio.ensure_future(client.lookup_ip(address))
+                for address in ('8.8.8.8', '8.8.4.4')
+            ]
+
+            await asyncio.sleep(0)
+
+        return await asyncio.gather(*tasks)
+
+    ipaddrs = run_async(run())
+
+    assert [str(i.address) for i in ipaddrs] == ['8.8.8.8', '8.8.4.4']
+    assert len(bulk_api_server.requests) == 1
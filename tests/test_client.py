@@ -0,0 +1,358 @@
+"""Test zeroguard.client module."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+# pylint: disable=E0401
+from conftest import StubAPIServer, run_async
+from zeroguard.client import (
+    API_KEY_HEADER,
+    TLS_SESSIONS,
+    AsyncClient,
+    Client,
+    ConnectionPool
+)
+from zeroguard.errors.client import ZGCommunicationError, ZGSanityCheckFailed
+from zeroguard.errors.server import (
+    ZGEmptyResult,
+    ZGInternalServerError,
+    ZGNoSuchEndpoint,
+    ZGRateLimitExceeded,
+    ZGServerError,
+    get_server_error
+)
+from zeroguard.ratelimit import RateLimiter
+from zeroguard.referencer import DictReferencer
+from zeroguard.retry import RetryPolicy
+from zeroguard.types import IPv4Address, Subdomain
+
+
+def test_client(api_server):
+    """Lookups are decoded into a session referencer over one connection."""
+    with Client(api_key='secret', base_url=api_server.base_url) as client:
+        ipaddr = client.lookup_ip('8.8.8.8')
+        subdomain = client.lookup_subdomain('foo.example.com')
+
+        assert isinstance(ipaddr, IPv4Address)
+        assert isinstance(subdomain, Subdomain)
+        assert str(subdomain.latest_ipv4.address) == '8.8.8.8'
+
+        # Objects shared by responses are decoded once
+        prefix = client.referencer[2]
+        assert client.lookup_ip('8.8.8.8').closest_prefix is prefix
+
+    assert api_server.connections == 1
+    assert len(api_server.requests) == 3
+
+    method, path, headers, _ = api_server.requests[0]
+
+    assert (method, path) == ('GET', '/v1/ip/8.8.8.8')
+    assert headers[API_KEY_HEADER] == 'secret'
+
+
+def test_client_errors(api_server):
+    """Failed responses are mapped onto server-side errors."""
+    client = Client(
+        base_url=api_server.base_url,
+        rate_limiter=RateLimiter(rate=100),
+        retry_policy=RetryPolicy(base_delay=0.001)
+    )
+
+    with pytest.raises(ZGRateLimitExceeded) as excinfo:
+        client.lookup_ip('1.1.1.1')
+
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.message == 'Slow down'
+
+    with pytest.raises(ZGInternalServerError):
+        client.lookup_ip('1.0.0.1')
+
+    assert client.retry_policy.stats['retries'] == 3
+
+    with pytest.raises(ZGNoSuchEndpoint):
+        client.lookup_ip('8.8.4.4')
+
+    with pytest.raises(ZGEmptyResult):
+        client.lookup_ip('9.9.9.9')
+
+    with pytest.raises(ValueError):
+        client.lookup_ip('foo')
+
+    # Connections are kept open after error responses
+    assert api_server.connections == 1
+
+    api_server.routes['/v1/ip/8.8.8.8'] = (200, b'[{"type": "ipv4"')
+
+    with pytest.raises(ZGCommunicationError):
+        client.lookup_ip('8.8.8.8')
+
+    api_server.stop()
+
+    with pytest.raises(ZGCommunicationError):
+        client.lookup_ip('8.8.8.8')
+
+    with pytest.raises(ZGSanityCheckFailed):
+        Client(base_url='ftp://localhost')
+
+
+def test_get_server_error():
+    """Errors are chosen by names first and by status codes second."""
+    error = get_server_error(400, name='rate_limit_exceeded')
+    assert isinstance(error, ZGRateLimitExceeded)
+
+    error = get_server_error(404, name='foo')
+    assert isinstance(error, ZGNoSuchEndpoint)
+    assert error.name == 'foo'
+
+    error = get_server_error(418)
+    assert type(error) is ZGServerError  # pylint: disable=C0123
+    assert error.name == 'unknown_server_error'
+
+
+def test_client_reconnect(api_server):
+    """Connections closed by a server are reopened transparently."""
+    client = Client(base_url=api_server.base_url)
+    api_server.keep_alive = False
+
+    for _ in range(3):
+        client.lookup_ip('8.8.8.8')
+
+    assert api_server.connections == 3
+
+    # A server may close an idle connection without telling a client
+    api_server.keep_alive = True
+    client.lookup_ip('8.8.8.8')
+
+    pool = client._get_pool()  # pylint: disable=W0212
+    connection = pool.acquire()
+    connection.sock.shutdown(2)
+    pool.release(connection)
+
+    assert client.lookup_ip('8.8.8.8').closest_prefix is not None
+    assert client.stats[api_server.base_url[:-3]]['opened'] == 5
+
+
+def test_client_no_resend(api_server):
+    """Requests which may have been processed are never sent twice."""
+    route = api_server.routes['/v1/ip/8.8.8.8']
+
+    def slow(handler, body):
+        time.sleep(0.3)
+        return route
+
+    client = Client(base_url=api_server.base_url, timeout=0.1)
+    client.lookup_ip('8.8.8.8')
+
+    api_server.routes['/v1/ip/8.8.8.8'] = slow
+
+    # A timeout on a reused connection is not a stale connection
+    with pytest.raises(ZGCommunicationError):
+        client.lookup_ip('8.8.8.8')
+
+    time.sleep(0.3)
+    assert len(api_server.requests) == 2
+
+
+def test_client_concurrent(api_server):
+    """Threads share a bounded number of connections and one referencer."""
+    client = Client(base_url=api_server.base_url, pool_size=4)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        ipaddrs = list(executor.map(
+            lambda _: client.lookup_ip('8.8.8.8'),
+            range(200)
+        ))
+
+    assert api_server.connections <= 4
+    assert len({id(i.closest_prefix) for i in ipaddrs}) == 1
+
+
+def test_client_tls(test_ipv4_addresses, tls_context):
+    """Reopened TLS connections resume a pooled TLS session."""
+    server = StubAPIServer(
+        {'/v1/ip/8.8.8.8': (200, test_ipv4_addresses[0])},
+        tls=True
+    )
+
+    server.keep_alive = False
+
+    try:
+        client = Client(
+            base_url=server.base_url,
+            ssl_context=tls_context,
+            referencer=DictReferencer()
+        )
+
+        for _ in range(3):
+            assert str(client.lookup_ip('8.8.8.8').address) == '8.8.8.8'
+
+        pool = client._get_pool()  # pylint: disable=W0212
+        assert pool.stats['opened'] == 3
+        assert pool.stats['resumed'] == (2 if TLS_SESSIONS else 0)
+
+        # Certificates are verified
+        with pytest.raises(ZGCommunicationError):
+            Client(base_url=server.base_url).lookup_ip('8.8.8.8')
+
+    finally:
+        server.stop()
+
+
+def test_connection_pool():
+    """Test pool limits."""
+    pool = ConnectionPool('http', '127.0.0.1', size=1, timeout=0.01)
+    connection = pool.acquire()
+
+    with pytest.raises(ZGCommunicationError):
+        pool.acquire()
+
+    pool.release(connection)
+    assert pool.acquire() is not connection
+
+    for scheme, size in (('ftp', 1), ('http', 0)):
+        with pytest.raises(ZGSanityCheckFailed):
+            ConnectionPool(scheme, '127.0.0.1', size=size)
+
+
+def test_async_client(api_server, test_subdomains):
+    """Lookups run concurrently and complete in any order."""
+    references = test_subdomains[0][1]
+    release = threading.Event()
+
+    def slow(handler, body):
+        release.wait(5)
+        return 200, [references['4'], {
+            '2': references['2'],
+            '3': references['3']
+        }]
+
+    api_server.routes['/v1/ip/8.8.4.4'] = slow
+
+    async def run():
+        async with AsyncClient(
+                base_url=api_server.base_url,
+                concurrency=4
+        ) as client:
+            ipaddr = await client.lookup_ip('8.8.8.8')
+            subdomain = await client.lookup_subdomain('foo.example.com')
+            assert subdomain.latest_ipv4.closest_prefix is (
+                ipaddr.closest_prefix
+            )
+
+            results = []
+
+            async for result in client.lookup_ips(
+                    ['8.8.4.4', '8.8.8.8', '1.1.1.1', 'foo', '8.8.8.8']
+            ):
+                results.append(result)
+
+                if len(results) == 4:
+                    release.set()
+
+            return client, results
+
+    client, results = run_async(run())
+
+    # A slow lookup is released only after all others complete
+    assert results[-1].query == '8.8.4.4'
+
+    results = {r.query: r for r in results}
+
+    assert isinstance(results['1.1.1.1'].error, ZGRateLimitExceeded)
+    assert isinstance(results['foo'].error, ValueError)
+    assert results['8.8.8.8'].error is None
+
+    # A prefix shared by all responses is decoded once
+    prefix = client.referencer[2]
+    assert results['8.8.4.4'].value.closest_prefix is prefix
+    assert results['8.8.8.8'].value.closest_prefix is prefix
+
+
+def test_async_client_concurrency(api_server):
+    """Number of requests in flight is bounded."""
+    route = api_server.routes['/v1/ip/8.8.8.8']
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def tracked(handler, body):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+
+        time.sleep(0.01)
+
+        with lock:
+            in_flight[0] -= 1
+
+        return route
+
+    api_server.routes['/v1/ip/8.8.8.8'] = tracked
+
+    async def run():
+        client = AsyncClient(base_url=api_server.base_url, concurrency=3)
+
+        try:
+            gathered = await asyncio.gather(*(
+                client.lookup_ip('8.8.8.8') for _ in range(10)
+            ))
+
+            count = 0
+
+            async for result in client.lookup_ips(['8.8.8.8'] * 30):
+                assert result.value.prefixes == gathered[0].prefixes
+                count += 1
+
+            # Lookups of an iteration stopped early are cancelled
+            lookups = client.lookup_ips(['8.8.8.8'] * 30)
+            assert (await lookups.__anext__()).error is None
+
+            await lookups.aclose()
+
+            with pytest.raises(StopAsyncIteration):
+                await lookups.__anext__()
+
+            return count
+
+        finally:
+            client.close()
+
+    assert run_async(run()) == 30
+    assert in_flight[1] == 3
+    assert api_server.connections == 3
+
+
+def test_async_client_event_loops(api_server):
+    """A client can be used by consecutive event loops."""
+    client = AsyncClient(base_url=api_server.base_url, concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(
+            client.lookup_ip('8.8.8.8') for _ in range(4)
+        ))
+
+    try:
+        for _ in range(2):
+            assert len(run_async(run())) == 4
+
+    finally:
+        client.close()
+
+    with pytest.raises(RuntimeError):
+        client.lookup_ip('8.8.8.8').send(None)
+
+    async def iterate():
+        results = []
+
+        async for result in client.lookup_ips(['8.8.8.8'] * 3):
+            results.append(result)
+
+        return results
+
+    # Lookups of a closed client fail without stopping an iteration
+    results = run_async(iterate())
+
+    assert len(results) == 3
+    assert all(isinstance(r.error, RuntimeError) for r in results)
@@ -0,0 +1,190 @@
+"""Test zeroguard.codec module."""
+import io
+import json
+
+import pytest
+
+# pylint: disable=E0401
+from zeroguard.codec import (
+    pack,
+    packb,
+    py_packb,
+    py_unpackb,
+    restore,
+    snapshot,
+    unpack,
+    unpackb
+)
+from zeroguard.envelope import iter_decode
+from zeroguard.referencer import DictReferencer
+from zeroguard.types import IPv4Address, IPv6Address, NetworkPrefix
+from zeroguard.types.meta import DataReference
+
+MSGPACK_VECTORS = [
+    (None, b'\xc0'),
+    (True, b'\xc3'),
+    (False, b'\xc2'),
+    (1, b'\x01'),
+    (-1, b'\xff'),
+    (200, b'\xcc\xc8'),
+    (-33, b'\xd0\xdf'),
+    (70000, b'\xce\x00\x01\x11\x70'),
+    (2 ** 40, b'\xcf\x00\x00\x01\x00\x00\x00\x00\x00'),
+    (-2 ** 40, b'\xd3\xff\xff\xff\x00\x00\x00\x00\x00'),
+    (1.5, b'\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00'),
+    ('a', b'\xa1a'),
+    ('a' * 40, b'\xd9\x28' + b'a' * 40),
+    (b'ab', b'\xc4\x02ab'),
+    ([1, 2], b'\x92\x01\x02'),
+    ([0] * 16, b'\xdc\x00\x10' + bytes(16)),
+    ({1: 'b'}, b'\x81\x01\xa1b')
+]
+
+
+def load_ipv4_addresses(test_ipv4_addresses):
+    """Decode IPv4 address fixtures into a new referencer."""
+    referencer = DictReferencer()
+
+    ipaddrs = list(iter_decode(
+        io.StringIO(json.dumps(test_ipv4_addresses)),
+        referencer
+    ))
+
+    return ipaddrs, referencer
+
+
+@pytest.mark.parametrize('value, expected', MSGPACK_VECTORS)
+def test_py_msgpack(value, expected):
+    """Pure-Python implementation follows MessagePack specification."""
+    assert py_packb(value) == expected
+    assert py_unpackb(expected) == value
+    assert unpackb(packb(value)) == value
+
+
+def test_py_msgpack_compat():
+    """Pure-Python implementation is compatible with msgpack library."""
+    msgpack = pytest.importorskip('msgpack')
+
+    value = [
+        [v for v, _ in MSGPACK_VECTORS],
+        {'x' * 300: b'y' * 70000, -2 ** 63: [None] * 70000}
+    ]
+
+    data = msgpack.packb(value, use_bin_type=True)
+
+    assert py_packb(value) == data
+    assert py_unpackb(data) == value
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'\xc1',
+    b'\x92\x01',
+    b'\xa2a',
+    b'\xc4\x05ab',
+    b'\x01\x02',
+    b'\x81\x90\x01'
+])
+def test_py_msgpack_fail(data):
+    """Test decoding of malformed data."""
+    with pytest.raises(ValueError):
+        py_unpackb(data)
+
+    with pytest.raises(ValueError):
+        unpackb(data)
+
+
+def test_py_msgpack_pack_fail():
+    """Test encoding of unsupported values."""
+    for value in (object(), 2 ** 64, [set()]):
+        with pytest.raises(TypeError):
+            py_packb(value)
+
+
+def test_pack(test_ipv4_addresses, test_subdomains):
+    """Data type instances survive a round trip."""
+    ipaddrs, referencer = load_ipv4_addresses(test_ipv4_addresses)
+    ipaddr = ipaddrs[0]
+
+    data = pack(ipaddr, referencer.ref_of)
+    assert len(data) * 3 < len(json.dumps(ipaddr.to_ref_dict(
+        referencer.ref_of
+    )))
+
+    unpacked = unpack(data, referencer)
+
+    assert unpacked.to_dict() == ipaddr.to_dict()
+    assert unpacked.closest_prefix is ipaddr.closest_prefix
+    assert unpacked.reputation[0].first_seen == ipaddr.reputation[0].first_seen
+
+    # Unknown references are left to be dereferenced lazily
+    unpacked = unpack(data, DictReferencer())
+    assert unpacked.pending_fields == ('closest_prefix', 'prefixes')
+
+    prefix = NetworkPrefix('2001:4860::/32')
+    ipv6 = IPv6Address('2001:4860::8888', prefix, [prefix], [])
+    unpacked = unpack(pack(ipv6, lambda p: 1), {1: prefix})
+    assert unpacked.to_dict() == ipv6.to_dict()
+
+    # References with extra fields keep their fields
+    referencer = DictReferencer()
+    subdomain = next(iter_decode(
+        io.StringIO(json.dumps(test_subdomains)),
+        referencer
+    ))
+
+    unpacked = unpack(pack(subdomain, referencer.ref_of), referencer)
+    assert unpacked.to_dict() == subdomain.to_dict()
+    assert unpacked.latest_ipv4 is subdomain.latest_ipv4
+
+
+@pytest.mark.parametrize('values', [
+    ['foo'],
+    ['netpref'],
+    ['netpref', b'\x08\x08', 16],
+    ['ipv4', b'\x08\x08\x08\x08', 1, [1]],
+    ['ipv4', b'\x08\x08\x08\x08', 1, [1], [['foo', True, 'bar', 1]]],
+    ['subdomain', 'foo', [[1]], []],
+    'foo'
+])
+def test_unpack_fail(values):
+    """Test decoding of malformed packed values."""
+    with pytest.raises(ValueError):
+        unpack(packb(values), DictReferencer())
+
+
+def test_snapshot(test_ipv4_addresses, test_subdomains):
+    """All referencer objects survive a snapshot round trip."""
+    _, referencer = load_ipv4_addresses(test_ipv4_addresses)
+    subdomains = list(iter_decode(
+        io.StringIO(json.dumps(test_subdomains)),
+        referencer
+    ))
+
+    # Object which refers to an object that is not held at all
+    referencer[100] = IPv4Address(
+        '8.8.4.4',
+        DataReference(200),
+        [],
+        [],
+        referencer=referencer
+    )
+
+    restored = restore(snapshot(referencer))
+
+    assert sorted(restored) == sorted(referencer)
+
+    for ref_id, instance in referencer.items():
+        if ref_id != 100:
+            assert restored[ref_id].to_dict() == instance.to_dict()
+            assert restored[ref_id].pending_fields == ()
+
+    assert restored[100].pending_fields == ('closest_prefix',)
+    assert restored[4].prefixes == [restored[2], restored[3]]
+
+    subdomain = unpack(pack(subdomains[0], referencer.ref_of), restored)
+    assert subdomain.oldest_ipv4 is restored[4]
+
+    for data in (packb([2]), packb({}), packb([1, [1]])):
+        with pytest.raises(ValueError):
+            restore(data)
@@ -0,0 +1,257 @@
+"""Test zeroguard.envelope module."""
+import io
+import json
+
+import pytest
+
+# pylint: disable=E0401
+from zeroguard.envelope import (
+    dump,
+    iter_decode,
+    iter_encode,
+    load_reference_table
+)
+from zeroguard.errors.client import ZGClientError
+from zeroguard.referencer import DictReferencer
+from zeroguard.types import IPv4Address, NetworkPrefix, Subdomain
+from zeroguard.types.meta import DataReference
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+def test_iter_decode(test_ipv4_addresses, test_subdomains, chunk_size):
+    """Test decoding of envelope lists in binary and text modes."""
+    referencer = DictReferencer()
+
+    ipaddrs = list(iter_decode(
+        io.BytesIO(json.dumps(test_ipv4_addresses).encode()),
+        referencer,
+        chunk_size=chunk_size
+    ))
+
+    assert len(ipaddrs) == len(test_ipv4_addresses)
+    assert isinstance(ipaddrs[0], IPv4Address)
+    assert ipaddrs[0].prefixes == [referencer[1], referencer[2]]
+    assert str(ipaddrs[0].closest_prefix.prefix) == '8.8.0.0/16'
+
+    subdomains = list(iter_decode(
+        io.StringIO(json.dumps(test_subdomains, indent=4)),
+        chunk_size=chunk_size
+    ))
+
+    assert isinstance(subdomains[0], Subdomain)
+    assert subdomains[0].name == 'foo.example.com'
+    assert str(subdomains[0].latest_ipv4.address) == '8.8.8.8'
+    assert str(subdomains[0].live_ipv6.closest_prefix.prefix) == (
+        '2001:4860::/32'
+    )
+
+
+def test_iter_decode_incremental(test_ipv4_addresses):
+    """Instances are yielded before a whole document is read."""
+    data, references = test_ipv4_addresses[0]
+    document = json.dumps(
+        [[data, references]] * 3,
+        ensure_ascii=False
+    ).replace('firehol-coinbl-hosts', 'firehol-coinbl-hosts-\u00e9')
+
+    encoded = document.encode()
+    read = []
+
+    def chunks():
+        # Chunk boundaries split multi-byte characters
+        for offset in range(0, len(encoded), 5):
+            read.append(offset)
+            yield encoded[offset:offset + 5]
+
+    referencer = DictReferencer()
+    decoder = iter_decode(chunks(), referencer, chunk_size=5)
+
+    first = next(decoder)
+    assert read[-1] < len(encoded) // 2
+    assert first.reputation[0].name == 'firehol-coinbl-hosts-\u00e9'
+    assert isinstance(first.closest_prefix, NetworkPrefix)
+    assert sorted(referencer) == [1, 2]
+
+    # Repeated reference table entries keep already registered objects
+    prefix = referencer[1]
+    assert len(list(decoder)) == 2
+    assert referencer[1] is prefix
+
+
+def test_iter_decode_single_envelope(test_ipv4_addresses):
+    """A single envelope and an empty list are decoded as well."""
+    assert list(iter_decode(io.StringIO(' [ ] '))) == []
+
+    ipaddrs = list(iter_decode(io.StringIO(
+        json.dumps(test_ipv4_addresses[0])
+    )))
+
+    assert len(ipaddrs) == 1
+    assert str(ipaddrs[0].address) == '8.8.8.8'
+
+
+@pytest.mark.parametrize('document', [
+    '',
+    '{}',
+    '[{"type": "netpref", "prefix": "8.8.0.0/16"}]',
+    '[{"type": "netpref", "prefix": "8.8.0.0/16"}, {"1": {"type": "netp',
+    '[{"type": "netpref", "prefix": "8.8.0.0/16"}, {"x": {}}]',
+    '[{"type": "netpref", "prefix": "8.8.0.0/16"}, {}] []',
+    '[{"type": "foo"}, {}]',
+    '[[{"type": "netpref", "prefix": "8.8.0.0/16"}, {}] [',
+])
+def test_iter_decode_fail(document):
+    """Test decoding of malformed documents."""
+    with pytest.raises(ValueError):
+        list(iter_decode(io.StringIO(document)))
+
+
+def test_load_reference_table(test_subdomains):
+    """Entries are created in a dependency order and fully resolved."""
+    data, references = test_subdomains[0]
+    referencer = DictReferencer()
+
+    # Referring entries come first in a table
+    table = dict(sorted(
+        references.items(),
+        key=lambda item: item[1]['type'] == 'netpref'
+    ))
+
+    loaded = load_reference_table(table, referencer)
+
+    assert sorted(loaded) == [1, 2, 3, 4, 5, 6, 7]
+    assert loaded[1] is referencer[1]
+
+    for instance in loaded.values():
+        assert instance.pending_fields == ()
+
+    # pylint: disable=W0212
+    assert loaded[1]._get_raw_field('closest_prefix') is referencer[2]
+    assert loaded[4].prefixes == [referencer[2], referencer[3]]
+
+    subdomain = Subdomain.from_dict(data, referencer)
+    assert subdomain.oldest_ipv4 is referencer[4]
+
+
+def test_load_reference_table_fail():
+    """Test detection of dependency cycles and unknown references."""
+    def ipv4(ref_id):
+        return {
+            'type': 'ipv4',
+            'address': '8.8.8.8',
+            'closest_prefix': {'_ref': ref_id},
+            'prefixes': [{'_ref': ref_id}]
+        }
+
+    with pytest.raises(ValueError):
+        load_reference_table({'1': ipv4(1)})
+
+    with pytest.raises(ValueError):
+        load_reference_table({'1': ipv4(2), '2': ipv4(1), '3': ipv4(1)})
+
+    with pytest.raises(ValueError):
+        load_reference_table({'1': ipv4(2)})
+
+    with pytest.raises(ValueError):
+        load_reference_table({'x': ipv4(2)})
+
+    # Unknown references are left to be dereferenced lazily if allowed
+    referencer = DictReferencer()
+    loaded = load_reference_table(
+        {'1': ipv4(3), '2': ipv4(1)},
+        referencer,
+        strict=False
+    )
+
+    assert loaded[1].pending_fields == ('closest_prefix', 'prefixes')
+    assert loaded[2].pending_fields == ()
+    assert loaded[2].closest_prefix is loaded[1]
+
+
+def test_iter_encode(test_ipv4_addresses, test_subdomains):
+    """Encoded documents are decoded back into the same records."""
+    referencer = DictReferencer()
+    ipaddrs = list(iter_decode(
+        io.StringIO(json.dumps(test_ipv4_addresses)),
+        referencer
+    ))
+
+    chunks = list(iter_encode(ipaddrs * 3, referencer))
+    assert len(chunks) == 4
+
+    document = json.loads(''.join(chunks))
+    assert len(document) == 3
+
+    # Shared objects are emitted once in a first reference table
+    assert document[0] == [ipaddrs[0].to_ref_dict(referencer.ref_of), {
+        '1': referencer[1].to_dict(),
+        '2': referencer[2].to_dict()
+    }]
+
+    assert document[1][1] == {}
+
+    decoded = list(iter_decode(io.StringIO(''.join(chunks))))
+    assert [i.to_dict() for i in decoded] == [i.to_dict() for i in ipaddrs * 3]
+
+    # Referenced objects are emitted before objects referring to them
+    referencer = DictReferencer()
+    subdomains = list(iter_decode(
+        io.StringIO(json.dumps(test_subdomains)),
+        referencer
+    ))
+
+    table = json.loads(''.join(iter_encode(subdomains, referencer)))[0][1]
+    ref_ids = list(table)
+
+    for ref_id, data in table.items():
+        if data['type'] == 'ipv4':
+            assert ref_ids.index(str(data['closest_prefix']['_ref'])) < (
+                ref_ids.index(ref_id)
+            )
+
+    assert list(iter_encode([])) == ['[]']
+
+
+def test_dump(test_ipv4_addresses):
+    """Unregistered objects get new reference IDs and files are written."""
+    referencer = DictReferencer()
+    ipaddr = next(iter_decode(
+        io.StringIO(json.dumps(test_ipv4_addresses[0])),
+        referencer
+    ))
+
+    prefix = NetworkPrefix('8.8.8.0/24', referencer=referencer)
+    other = IPv4Address('8.8.8.9', prefix, [prefix], [], referencer=referencer)
+
+    text = io.StringIO()
+    binary = io.BytesIO()
+    dump([ipaddr, other], text, referencer)
+    dump([ipaddr, other], binary, referencer)
+
+    assert binary.getvalue().decode() == text.getvalue()
+
+    document = json.loads(text.getvalue())
+    assert document[1] == [other.to_ref_dict(lambda p: 3), {
+        '3': prefix.to_dict()
+    }]
+
+    decoded = list(iter_decode(io.StringIO(text.getvalue())))
+    assert str(decoded[1].closest_prefix.prefix) == '8.8.8.0/24'
+
+
+def test_iter_encode_fail():
+    """Test encoding of references to unknown objects."""
+    ipaddr = IPv4Address(
+        '8.8.8.8',
+        DataReference(1),
+        [DataReference(1)],
+        [],
+        referencer=DictReferencer()
+    )
+
+    with pytest.raises(ZGClientError):
+        list(iter_encode([ipaddr]))
+
+    document = json.loads(''.join(iter_encode([ipaddr], strict=False)))
+    assert document[0][1] == {}
+    assert document[0][0]['closest_prefix'] == {'_ref': 1}
@@ -0,0 +1,43 @@
+"""Test zeroguard.errors package."""
+# pylint: disable=E0401
+from zeroguard.errors.client import ZGSanityCheckFailed
+from zeroguard.errors.meta import ZGErrorMeta
+from zeroguard.errors.server import ZGProcessingTimeout
+from zeroguard.utils.log import LazyLogMessage
+
+
+def test_client_error_str():
+    """Client errors are formatted when converted to a string."""
+    try:
+        int('foo')
+
+    except ValueError as err:
+        error = ZGSanityCheckFailed(
+            error=err,
+            message=LazyLogMessage('Bad value', fields={'value': 'foo'}),
+            context={'ref_id': 42}
+        )
+
+    message, fields = ZGErrorMeta.__str__(error, as_tuple=True)
+
+    assert message.endswith('Bad value: value="foo"')
+    assert fields == {
+        'error_name': 'sanity_check_failed',
+        'error_context': {'ref_id': 42}
+    }
+
+    assert error.args == ('Bad value',)
+    assert str(error).startswith('Sanity check failed')
+    assert 'original_error' not in str(error)
+    assert 'error_trace=' in error.__str__(with_trace=True)
+
+
+def test_server_error_str():
+    """Server errors include a status code and query parameters."""
+    error = ZGProcessingTimeout(504, query={'ip': '8.8.8.8'})
+
+    assert str(error) == (
+        'Request processing took too long: error_name="processing_timeout", '
+        'error_context="None", status_code="504", '
+        'resolved_query_params="ip=\\"8.8.8.8\\""'
+    )
@@ -0,0 +1,151 @@
+"""Test zeroguard.prefix_index module."""
+import ipaddress
+import random
+
+import pytest
+
+# pylint: disable=E0401
+from conftest import measure_time, report_benchmark
+from zeroguard.errors.client import ZGSanityCheckFailed
+from zeroguard.prefix_index import PrefixIndex
+from zeroguard.referencer import DictReferencer
+from zeroguard.types import KNOWN_TYPES, IPv4Address, NetworkPrefix
+
+
+def random_prefixes(rand, count, version):
+    """Generate a list of random network prefix data type instances."""
+    bits = 32 if version == 4 else 128
+    network_cls = (
+        ipaddress.IPv4Network if version == 4 else ipaddress.IPv6Network
+    )
+
+    prefixes = []
+
+    for _ in range(count):
+        length = rand.randint(0, bits)
+        address = rand.getrandbits(bits) >> (bits - length) << (bits - length)
+        prefixes.append(NetworkPrefix(str(network_cls((address, length)))))
+
+    return prefixes
+
+
+def brute_force_covering(prefixes, address):
+    """Find all prefixes containing an address with a linear scan."""
+    address = ipaddress.ip_address(address)
+
+    found = {
+        str(p.prefix): p for p in prefixes
+        if p.prefix.version == address.version and address in p.prefix
+    }
+
+    return sorted(
+        found.values(),
+        key=lambda p: p.prefix.prefixlen,
+        reverse=True
+    )
+
+
+def test_prefix_index_fixture(test_ipv4_addresses):
+    """Index prefixes from a referencer and compare with API output."""
+    for data, references in test_ipv4_addresses:
+        referencer = DictReferencer()
+
+        for ref_id, refed_data in references.items():
+            referencer[int(ref_id)] = KNOWN_TYPES[
+                refed_data['type']].from_dict(refed_data, referencer)
+
+        index = PrefixIndex.from_referencer(referencer)
+        ipaddr = IPv4Address.from_dict(data, referencer)
+
+        assert len(index) == len(references)
+        assert index.longest_prefix(ipaddr) is ipaddr.closest_prefix
+        assert index.covering_prefixes(ipaddr.address) == ipaddr.prefixes
+
+
+@pytest.mark.parametrize('version', [4, 6])
+def test_prefix_index_random(version):
+    """Compare index lookups with a brute force search."""
+    rand = random.Random(version)
+    bits = 32 if version == 4 else 128
+
+    prefixes = random_prefixes(rand, 300, version)
+    index = PrefixIndex(prefixes)
+
+    assert len(index) == len({str(p.prefix) for p in prefixes})
+    assert len(list(index)) == len(index)
+
+    address_cls = (
+        ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+    )
+
+    addresses = [address_cls(rand.getrandbits(bits)) for _ in range(200)]
+
+    # Make sure addresses inside of the indexed prefixes are checked as well
+    addresses += [p.prefix.network_address for p in prefixes]
+
+    for address in addresses:
+        want = brute_force_covering(index, address)
+
+        assert index.covering_prefixes(str(address)) == want
+        assert index.longest_prefix(address) == (want[0] if want else None)
+
+    assert index.longest_prefixes(addresses) == [
+        index.longest_prefix(a) for a in addresses
+    ]
+
+    assert index.covering_prefixes_many(
+        [int(a) for a in addresses],
+        version=version
+    ) == [index.covering_prefixes(a) for a in addresses]
+
+
+def test_prefix_index_versions_and_errors():
+    """Test IP version separation, replacement and bad input."""
+    index = PrefixIndex([
+        NetworkPrefix('0.0.0.0/0'),
+        NetworkPrefix('::/0'),
+        NetworkPrefix('10.0.0.0/8')
+    ])
+
+    replacement = NetworkPrefix('10.0.0.0/8')
+    index.add(replacement)
+
+    assert len(index) == 3
+    assert index.longest_prefix('10.1.1.1') is replacement
+    assert str(index.longest_prefix('::1').prefix) == '::/0'
+    assert PrefixIndex().longest_prefix('10.1.1.1') is None
+
+    with pytest.raises(ValueError):
+        index.longest_prefix('foo')
+
+    with pytest.raises(ZGSanityCheckFailed):
+        index.add('10.0.0.0/8')
+
+
+@pytest.mark.benchmark
+def test_benchmark_prefix_index_lookup():
+    """Compare trie lookups with linear ipaddress containment checks."""
+    rand = random.Random(42)
+
+    prefixes = random_prefixes(rand, 1000, 4)
+    index = PrefixIndex(prefixes)
+
+    addresses = [
+        ipaddress.IPv4Address(rand.getrandbits(32)) for _ in range(100)
+    ]
+
+    def linear():
+        for address in addresses:
+            max(
+                (p for p in prefixes if address in p.prefix),
+                key=lambda p: p.prefix.prefixlen,
+                default=None
+            )
+
+    results = report_benchmark(
+        'longest prefix match',
+        trie=measure_time(lambda: index.longest_prefixes(addresses), 5),
+        linear=measure_time(linear, 5)
+    )
+
+    assert results['trie'] / results['linear'] < 1
@@ -0,0 +1,174 @@
+"""Test zeroguard.ratelimit module."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+
+# pylint: disable=E0401
+from conftest import run_async
+from zeroguard.client import AsyncClient, Client
+from zeroguard.errors.client import ZGSanityCheckFailed
+from zeroguard.errors.server import ZGRateLimitExceeded
+from zeroguard.ratelimit import RateLimiter
+
+
+class FakeClock:
+    """Monotonic clock which is advanced manually."""
+
+    def __init__(self):
+        """."""
+        self.now = 1000.0
+
+    def __call__(self):
+        """."""
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace a monotonic clock of a rate limiter module."""
+    fake = FakeClock()
+    monkeypatch.setattr('zeroguard.ratelimit.time.monotonic', fake)
+
+    return fake
+
+
+def test_rate_limiter(clock):
+    """Requests over a burst are delayed in order."""
+    limiter = RateLimiter(rate=10, burst=2)
+
+    delays = [limiter.reserve() for _ in range(4)]
+    assert delays == pytest.approx([0, 0, 0.1, 0.2])
+
+    clock.now += 0.2
+    assert limiter.reserve() == pytest.approx(0.1)
+
+    # Tokens are refilled up to a burst only
+    clock.now += 10
+    delays = [limiter.reserve() for _ in range(3)]
+    assert delays == pytest.approx([0, 0, 0.1])
+
+    stats = limiter.stats
+    assert stats['acquired'] == 8
+    assert stats['delayed'] == 4
+    assert stats['wait_time'] == pytest.approx(0.5)
+
+    # Rate limiter without a rate does not limit anything
+    limiter = RateLimiter()
+    assert not any(limiter.reserve() for _ in range(100))
+
+    for kwargs in ({'rate': 0}, {'burst': -1}):
+        with pytest.raises(ZGSanityCheckFailed):
+            RateLimiter(**kwargs)
+
+
+def test_rate_limiter_update(clock):
+    """A permitted rate is learned from response headers."""
+    limiter = RateLimiter()
+
+    limiter.update(200, {
+        'X-RateLimit-Remaining': '50',
+        'X-RateLimit-Reset': '10'
+    })
+
+    assert limiter.rate == pytest.approx(4.5)
+
+    # Malformed headers are ignored
+    for headers in (
+            {'X-RateLimit-Remaining': 'foo', 'X-RateLimit-Reset': '1'},
+            {'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': '0'},
+            {'X-RateLimit-Remaining': '-5', 'X-RateLimit-Reset': '1'},
+            {'X-RateLimit-Remaining': 'inf', 'X-RateLimit-Reset': '1'},
+            {}
+    ):
+        limiter.update(200, headers)
+        assert limiter.rate == pytest.approx(4.5)
+
+    # Exhausted limit pauses requests until a window is reset
+    limiter.update(200, {
+        'X-RateLimit-Remaining': '0',
+        'X-RateLimit-Reset': '3'
+    })
+
+    assert limiter.stats['paused_for'] == pytest.approx(3)
+    assert limiter.rate == pytest.approx(4.5)
+
+
+def test_rate_limiter_throttle(clock):
+    """A rate limit exceeded response pauses and slows down requests."""
+    limiter = RateLimiter(rate=10, burst=10)
+    limiter.update(429, {'Retry-After': '2'})
+
+    stats = limiter.stats
+
+    assert stats['throttled'] == 1
+    assert stats['paused_for'] == pytest.approx(2)
+    assert limiter.rate == pytest.approx(5)
+
+    # Waiting requests are spread over time after a pause
+    delays = [limiter.reserve() for _ in range(3)]
+    assert delays == pytest.approx([2.2, 2.4, 2.6])
+
+    # Unknown rate is estimated from recent requests
+    limiter = RateLimiter()
+
+    for _ in range(8):
+        limiter.reserve()
+
+    limiter.update(429, {})
+
+    assert limiter.rate == pytest.approx(4)
+    assert limiter.stats['paused_for'] == pytest.approx(1)
+
+
+def test_rate_limiter_shared():
+    """Threads and tasks share one rate."""
+    limiter = RateLimiter(rate=100, burst=1)
+
+    async def run():
+        await asyncio.gather(*(limiter.acquire_async() for _ in range(10)))
+
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        future = executor.submit(run_async, run())
+        list(executor.map(lambda _: limiter.acquire(), range(10)))
+        future.result()
+
+    assert time.monotonic() - start >= 0.18
+    assert limiter.stats['acquired'] == 20
+
+
+def test_client_rate_limit(api_server):
+    """Clients pace requests by rates learned from responses."""
+    route = api_server.routes['/v1/ip/8.8.8.8']
+    api_server.routes['/v1/ip/8.8.8.8'] = route + ({
+        'X-RateLimit-Remaining': '5',
+        'X-RateLimit-Reset': '1'
+    },)
+
+    limiter = RateLimiter()
+    client = Client(base_url=api_server.base_url, rate_limiter=limiter)
+
+    client.lookup_ip('8.8.8.8')
+    assert limiter.rate == pytest.approx(4.5)
+
+    with pytest.raises(ZGRateLimitExceeded):
+        client.lookup_ip('1.1.1.1')
+
+    assert limiter.stats['throttled'] == 1
+
+    async def run():
+        async with AsyncClient(
+                base_url=api_server.base_url,
+                rate_limiter=limiter
+        ) as async_client:
+            await asyncio.gather(*(
+                async_client.lookup_ip('8.8.8.8') for _ in range(3)
+            ))
+
+    run_async(run())
+
+    assert limiter.stats['acquired'] == 5
+    assert limiter.stats['delayed'] >= 2
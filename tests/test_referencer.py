@@ -1,12 +1,28 @@
 """Test zeroguard.referencer module."""
+from concurrent.futures import ThreadPoolExecutor
+import gc
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
 from uuid import uuid4
 
 import pytest
 
 # pylint: disable=E0401
+from conftest import measure_time, report_benchmark
 from zeroguard.errors.client import ZGSanityCheckFailed
-from zeroguard.referencer import DictReferencer
-from zeroguard.types.meta import DataTypeMeta
+from zeroguard.referencer import (
+    BoundedReferencer,
+    DictReferencer,
+    SQLiteReferencer,
+    StripedReferencer
+)
+from zeroguard.types import KNOWN_TYPES, IPv4Address, NetworkPrefix
+from zeroguard.types.meta import DataReference, DataTypeMeta
+from zeroguard.utils.log import format_logmsg
 
 
 # pylint: disable=R0903
@@ -41,6 +57,28 @@ class MockDataType(DataTypeMeta):
         return cls()
 
 
+class EagerLogReferencer(DictReferencer):
+    """Dictionary referencer which formats log messages before logging.
+
+    This is how referencer lookups used to log misses before lazy log
+    messages were introduced. It is kept only as a benchmark baseline.
+    """
+
+    def __getitem__(self, ref, log=True):
+        """."""
+        try:
+            return self._refs[ref]
+
+        except KeyError as err:
+            if log:
+                self.logger.debug(format_logmsg(
+                    'Failed to retrieve object reference as it was not found',
+                    fields={'ref_id': ref}
+                ))
+
+            raise err
+
+
 def test_dict_referencer():
     """Test zeroguard.referencer.DictReferencer."""
     referencer = DictReferencer()
@@ -94,3 +132,422 @@ def test_dict_referencer():
     # Make sure iteration over reference IDs is working
     for ref_id in referencer:
         assert 0 <= ref_id < len(mock_data_type_instances)
+
+    # Make sure reverse lookups survive deletion of aliased references
+    instance = mock_data_type_instances[0]
+    assert referencer.ref_of(instance) == 0
+
+    del referencer[0]
+    assert referencer.ref_of(instance) == 1
+
+    with pytest.raises(KeyError):
+        referencer.ref_of(MockDataType())
+
+
+def test_bounded_referencer_lru():
+    """Test zeroguard.referencer.BoundedReferencer entry limit."""
+    referencer = BoundedReferencer(max_entries=3)
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer['foo'] = MockDataType()
+
+    for index in range(3):
+        referencer[index] = MockDataType()
+
+    # Touch the oldest entry so the second one becomes least recently used
+    assert referencer[0]
+
+    referencer[3] = MockDataType()
+    gc.collect()
+
+    assert sorted(referencer) == [0, 2, 3]
+    assert len(referencer) == 3
+
+    with pytest.raises(KeyError):
+        # pylint: disable=W0106
+        referencer[1]
+
+    # References still cannot be overriden
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer[3] = MockDataType()
+
+    del referencer[3]
+    referencer[3] = MockDataType()
+
+    assert referencer.stats == {
+        'entries': 3,
+        'bytes': referencer.stats['bytes'],
+        'pinned': 0,
+        'hits': 1,
+        'misses': 1,
+        'evictions': 1,
+        'expirations': 0,
+        'revivals': 0
+    }
+
+
+def test_bounded_referencer_live_and_pinned():
+    """Objects used by live instances and pinned ones must not be lost."""
+    referencer = BoundedReferencer(max_entries=2)
+    live_instance = MockDataType()
+
+    referencer[0] = live_instance
+    referencer.pin(0)
+    referencer[1] = MockDataType()
+    referencer[2] = MockDataType()
+    referencer[3] = MockDataType()
+
+    # Pinned object is kept, others are evicted in LRU order
+    assert sorted(referencer) == [0, 3]
+
+    referencer.unpin(0)
+    referencer[4] = MockDataType()
+    gc.collect()
+
+    assert sorted(referencer) == [3, 4]
+
+    # Evicted object is still alive so it must be revived on access
+    assert referencer[0] is live_instance
+    assert referencer.stats['revivals'] == 1
+    assert sorted(referencer) == [0, 4]
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer[4] = MockDataType()
+
+    with pytest.raises(KeyError):
+        referencer.unpin(0)
+
+    with pytest.raises(KeyError):
+        referencer.pin(42)
+
+
+def test_bounded_referencer_bytes_and_ttl(monkeypatch):
+    """Test zeroguard.referencer.BoundedReferencer byte budget and TTL."""
+    referencer = BoundedReferencer(max_bytes=250, sizer=lambda _: 100)
+
+    for index in range(3):
+        referencer[index] = MockDataType()
+
+    gc.collect()
+    assert sorted(referencer) == [1, 2]
+    assert referencer.stats['bytes'] == 200
+
+    now = [1000.0]
+    monkeypatch.setattr('zeroguard.referencer.time.monotonic', lambda: now[0])
+
+    referencer = BoundedReferencer(ttl=10)
+    referencer[0] = MockDataType()
+    referencer[1] = MockDataType()
+    referencer.pin(1)
+
+    now[0] += 5
+    referencer[2] = MockDataType()
+    assert sorted(referencer) == [0, 1, 2]
+
+    now[0] += 6
+    assert sorted(referencer) == [1, 2]
+    assert referencer.stats['expirations'] == 1
+
+    now[0] += 10
+    assert sorted(referencer) == [1]
+
+    with pytest.raises(KeyError):
+        # pylint: disable=W0106
+        referencer[0]
+
+
+def test_bounded_referencer_oversized():
+    """Objects which do not fit into limits at all are held weakly."""
+    for referencer in (
+            BoundedReferencer(max_bytes=1),
+            BoundedReferencer(max_entries=0)
+    ):
+        live_instance = MockDataType()
+
+        referencer[1] = live_instance
+        referencer[2] = MockDataType()
+        gc.collect()
+
+        assert referencer[1] is live_instance
+        assert referencer[1] is live_instance
+        assert list(referencer) == []
+
+        with pytest.raises(KeyError):
+            # pylint: disable=W0106
+            referencer[2]
+
+        # Pinned objects are held strongly regardless of limits
+        referencer.pin(1)
+        assert list(referencer) == [1]
+
+        referencer.unpin(1)
+        del live_instance
+        gc.collect()
+
+        assert list(referencer) == []
+
+
+def test_striped_referencer():
+    """Test zeroguard.referencer.StripedReferencer basic operations."""
+    referencer = StripedReferencer(stripes=4)
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer['foo'] = MockDataType()
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer[0] = 42
+
+    with pytest.raises(ZGSanityCheckFailed):
+        StripedReferencer(stripes=0)
+
+    instances = [MockDataType() for _ in range(10)]
+
+    for index, instance in enumerate(instances):
+        referencer[index] = instance
+
+    assert sorted(referencer) == list(range(10))
+    assert len(referencer) == 10
+    assert dict(referencer.items()) == dict(enumerate(instances))
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer[0] = instances[1]
+
+    assert referencer.setdefault(0, instances[1]) is instances[0]
+    assert referencer.get_or_create(0, MockDataType) is instances[0]
+
+    del referencer[0]
+
+    with pytest.raises(KeyError):
+        # pylint: disable=W0106
+        referencer[0]
+
+    assert referencer.get_or_create(0, lambda: instances[5]) is instances[5]
+
+
+def test_striped_referencer_stress():
+    """Hammer zeroguard.referencer.StripedReferencer from a thread pool."""
+    referencer = StripedReferencer(stripes=8)
+    ref_count = 200
+    workers = 16
+
+    created = []
+    created_lock = threading.Lock()
+    barrier = threading.Barrier(workers)
+
+    def factory():
+        instance = MockDataType()
+
+        with created_lock:
+            created.append(instance)
+
+        return instance
+
+    def worker(worker_id):
+        barrier.wait()
+        registered = 0
+        resolved = []
+
+        for ref in range(ref_count):
+            try:
+                referencer[ref] = MockDataType()
+                registered += 1
+
+            except ZGSanityCheckFailed:
+                pass
+
+            resolved.append(
+                referencer.get_or_create(ref_count + ref, factory)
+            )
+
+            # Spread contention over different reference IDs
+            assert referencer[(ref + worker_id) % (ref + 1)]
+
+        return registered, resolved
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(worker, range(workers)))
+
+    # Every reference ID must be registered exactly once
+    assert sum(r for r, _ in results) == ref_count
+
+    # Objects must be created once and shared by all threads
+    assert len(created) == ref_count
+
+    for _, resolved in results:
+        assert resolved == results[0][1]
+
+    assert len(referencer) == 2 * ref_count
+
+
+def fill_referencer(referencer, references):
+    """Add all objects from a test data reference table to a referencer.
+
+    Objects are added in a reference ID order which in test data means that
+    dependencies of an object are always added before the object itself.
+    """
+    for ref_id, refed_data in sorted(
+            references.items(),
+            key=lambda i: (i[1]['type'] != 'netpref', int(i[0]))
+    ):
+        referencer[int(ref_id)] = KNOWN_TYPES[
+            refed_data['type']].from_dict(refed_data, referencer)
+
+
+def test_sqlite_referencer(tmpdir, test_subdomains):
+    """Test zeroguard.referencer.SQLiteReferencer persistence."""
+    db_path = str(tmpdir.join('refs.db'))
+    referencer = SQLiteReferencer(db_path)
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer['foo'] = NetworkPrefix('0.0.0.0/0')
+
+    data, references = test_subdomains[0]
+    fill_referencer(referencer, references)
+
+    subdomain = KNOWN_TYPES[data['type']].from_dict(data, referencer)
+    referencer[100] = subdomain
+    want_dict = subdomain.to_dict()
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer[1] = NetworkPrefix('0.0.0.0/0')
+
+    # Objects referring to objects from elsewhere cannot be persisted
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer[200] = IPv4Address(
+            '1.1.1.1',
+            NetworkPrefix('1.0.0.0/8'),
+            [],
+            []
+        )
+
+    assert len(referencer) == len(references) + 1
+    assert referencer.ref_of(subdomain) == 100
+
+    # Reopen a database as if a process was restarted
+    referencer.close()
+    del referencer, subdomain
+    gc.collect()
+
+    referencer = SQLiteReferencer(db_path)
+
+    assert sorted(referencer) == sorted(
+        [int(r) for r in references] + [100]
+    )
+
+    subdomain = referencer[100]
+    assert subdomain.pending_fields == ('ipv4', 'ipv6')
+    assert subdomain.to_dict() == want_dict
+    assert subdomain.latest_ipv4 is referencer[1]
+    assert subdomain.latest_ipv4.closest_prefix is referencer[2]
+
+    # Rehydrated objects are shared while in use
+    assert referencer[100] is subdomain
+    assert dict(referencer.items())[100] is subdomain
+
+    del referencer[100]
+
+    with pytest.raises(KeyError):
+        # pylint: disable=W0106
+        referencer[100]
+
+    with pytest.raises(KeyError):
+        del referencer[100]
+
+
+def test_sqlite_referencer_close(tmpdir):
+    """Closing a referencer must close connections of all threads."""
+    referencer = SQLiteReferencer(str(tmpdir.join('refs.db')))
+    referencer[1] = NetworkPrefix('8.8.0.0/16')
+
+    connections = []
+
+    def use_referencer():
+        assert str(referencer[1].prefix) == '8.8.0.0/16'
+        connections.append(referencer._connection)  # pylint: disable=W0212
+
+    thread = threading.Thread(target=use_referencer)
+    thread.start()
+    thread.join()
+
+    referencer.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[0].execute('SELECT 1')
+
+    # Connection of a current thread is reopened on next use
+    assert len(referencer) == 1
+
+
+def test_sqlite_referencer_cross_process(tmpdir):
+    """Referenced objects must be visible to other processes."""
+    db_path = str(tmpdir.join('refs.db'))
+    referencer = SQLiteReferencer(db_path)
+    referencer[1] = NetworkPrefix('8.8.0.0/16')
+
+    script = (
+        'import sys\n'
+        'from zeroguard.referencer import SQLiteReferencer\n'
+        'from zeroguard.types import NetworkPrefix\n'
+        'referencer = SQLiteReferencer(sys.argv[1])\n'
+        'print(referencer[1].prefix)\n'
+        'referencer[2] = NetworkPrefix("0.0.0.0/0")\n'
+    )
+
+    output = subprocess.check_output(
+        [sys.executable, '-c', script, db_path],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+
+    assert output.decode().strip() == '8.8.0.0/16'
+    assert str(referencer[2].prefix) == '0.0.0.0/0'
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer[2] = NetworkPrefix('0.0.0.0/0')
+
+
+@pytest.mark.benchmark
+def test_benchmark_lookup_logging_off():
+    """Compare referencer lookups with lazy and eager log messages."""
+    logger = logging.getLogger('zeroguard')
+    level = logger.level
+    logger.setLevel(logging.INFO)
+
+    def misses(referencer):
+        def lookup():
+            for ref in range(10000):
+                try:
+                    referencer[ref]
+                except KeyError:
+                    pass
+
+        return measure_time(lookup)
+
+    def dereferences(referencer):
+        prefix = NetworkPrefix('8.8.0.0/16')
+        referencer[1] = prefix
+        ipaddr = IPv4Address('8.8.8.8', prefix, [], [], referencer=referencer)
+        reference = DataReference(1)
+
+        def dereference():
+            for _ in range(10000):
+                # pylint: disable=W0212
+                ipaddr._dereference(reference)
+
+        return measure_time(dereference)
+
+    try:
+        eager_time = misses(EagerLogReferencer())
+        lazy_time = misses(DictReferencer())
+        dereference_time = dereferences(DictReferencer())
+
+    finally:
+        logger.setLevel(level)
+
+    report_benchmark(
+        'referencer misses',
+        eager=eager_time,
+        lazy=lazy_time,
+        deref=dereference_time
+    )
+
+    assert lazy_time / eager_time < 1
@@ -0,0 +1,155 @@
+"""Test zeroguard.retry module."""
+import pytest
+
+# pylint: disable=E0401
+from conftest import run_async
+from zeroguard.client import AsyncClient, Client
+from zeroguard.errors.client import ZGCommunicationError, ZGSanityCheckFailed
+from zeroguard.errors.server import (
+    ZGBadRequest,
+    ZGInternalServerError,
+    ZGProcessingTimeout,
+    ZGRateLimitExceeded,
+    get_server_error
+)
+from zeroguard.retry import RetryPolicy
+
+
+class Flaky:
+    """Function which raises given errors before returning a value."""
+
+    def __init__(self, *errors):
+        """."""
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        """."""
+        self.calls += 1
+
+        if self.errors:
+            raise self.errors.pop(0)
+
+        return 'ok'
+
+
+def test_is_retryable():
+    """Errors are classified by their classes."""
+    policy = RetryPolicy()
+
+    assert policy.is_retryable(ZGProcessingTimeout(504))
+    assert policy.is_retryable(get_server_error(500, name='foo'))
+    assert not policy.is_retryable(ZGRateLimitExceeded(429))
+    assert not policy.is_retryable(ZGCommunicationError())
+
+    policy = RetryPolicy(retryable={ZGRateLimitExceeded.NAME})
+    assert policy.is_retryable(ZGRateLimitExceeded(429))
+
+    with pytest.raises(ZGSanityCheckFailed):
+        RetryPolicy(max_attempts=0)
+
+
+def test_retry_policy():
+    """Transient errors are retried a limited number of times."""
+    policy = RetryPolicy(base_delay=0.001)
+
+    func = Flaky(ZGProcessingTimeout(504), ZGInternalServerError(500))
+    assert policy.call(func) == 'ok'
+    assert func.calls == 3
+
+    func = Flaky(*(ZGProcessingTimeout(504) for _ in range(5)))
+
+    with pytest.raises(ZGProcessingTimeout):
+        policy.call(func)
+
+    assert func.calls == 4
+
+    func = Flaky(ZGBadRequest(400))
+
+    with pytest.raises(ZGBadRequest):
+        policy.call(func)
+
+    assert func.calls == 1
+    assert policy.stats['retries'] == 5
+
+
+def test_retry_policy_backoff(monkeypatch):
+    """Delays grow exponentially up to a maximum."""
+    monkeypatch.setattr('zeroguard.retry.random.uniform', lambda a, b: b)
+
+    policy = RetryPolicy(max_attempts=10, base_delay=0.5, max_delay=3)
+    error = ZGProcessingTimeout(504)
+
+    delays = [policy.get_delay(error, i, float('inf')) for i in range(1, 6)]
+    assert delays == [0.5, 1, 2, 3, 3]
+
+
+def test_retry_policy_limits():
+    """Retries are bounded by a deadline and a shared budget."""
+    policy = RetryPolicy(base_delay=0.001, deadline=0)
+    func = Flaky(ZGProcessingTimeout(504))
+
+    with pytest.raises(ZGProcessingTimeout):
+        policy.call(func)
+
+    assert func.calls == 1
+    assert policy.stats['rejected'] == 1
+
+    policy = RetryPolicy(base_delay=0.001, budget_ratio=0.5, budget_reserve=2)
+
+    for _ in range(3):
+        with pytest.raises(ZGProcessingTimeout):
+            policy.call(Flaky(*(ZGProcessingTimeout(504) for _ in range(4))))
+
+    # A reserve and deposits of three requests allow three retries only
+    stats = policy.stats
+
+    assert stats['retries'] == 3
+    assert stats['rejected'] == 3
+    assert stats['budget'] < 1
+
+    assert policy.call(Flaky()) == 'ok'
+    assert policy.stats['budget'] == pytest.approx(stats['budget'] + 0.5)
+
+
+def test_retry_policy_async():
+    """Coroutine functions are retried too."""
+    policy = RetryPolicy(base_delay=0.001)
+    func = Flaky(ZGProcessingTimeout(504))
+
+    async def flaky():
+        return func()
+
+    assert run_async(policy.call_async(flaky)) == 'ok'
+    assert func.calls == 2
+
+
+def test_client_retry(api_server):
+    """Clients retry transient error responses."""
+    route = api_server.routes['/v1/ip/8.8.8.8']
+    failures = []
+
+    def flaky(handler, body):
+        if len(failures) % 3 < 2:
+            failures.append(handler.path)
+            return 504, {'error': {'name': 'processing_timeout'}}
+
+        failures.append(None)
+        return route
+
+    api_server.routes['/v1/ip/8.8.8.8'] = flaky
+    policy = RetryPolicy(base_delay=0.001)
+
+    client = Client(base_url=api_server.base_url, retry_policy=policy)
+    assert client.lookup_ip('8.8.8.8').closest_prefix is not None
+
+    async def run():
+        async with AsyncClient(
+                base_url=api_server.base_url,
+                retry_policy=policy
+        ) as async_client:
+            return await async_client.lookup_ip('8.8.8.8')
+
+    assert run_async(run()).closest_prefix is not None
+    assert policy.stats['retries'] == 4
+    assert len(api_server.requests) == 6
@@ -7,7 +7,14 @@ import pytest
 
 # pylint: disable=E0401
 from zeroguard.errors.client import ZGClientError
-from zeroguard.types import KNOWN_TYPES, IPv4Address, NetworkPrefix, Subdomain
+from zeroguard.types import (
+    KNOWN_TYPES,
+    IPAddressBatch,
+    IPv4Address,
+    IPv6Address,
+    NetworkPrefix,
+    Subdomain
+)
 
 
 @pytest.mark.testit
@@ -108,3 +115,116 @@ def test_network_prefix_init_fail(data):
     """Test zeroguard.types.network_prefix.NetworkPrefix type."""
     with pytest.raises(ValueError):
         NetworkPrefix.from_dict(data, {})
+
+
+def make_batch_records(test_ipv4_addresses):
+    """Create a mixed list of IPv4/IPv6 records and a filled referencer."""
+    records = []
+    referencer = {}
+
+    for data, references in test_ipv4_addresses:
+        for ref_id, refed_data in references.items():
+            referencer[int(ref_id)] = NetworkPrefix.from_dict(refed_data, {})
+
+        records.append(data)
+
+    referencer[10] = NetworkPrefix('2001:4860::/32')
+    records.append({
+        'type': 'ipv6',
+        'address': '2001:4860:4860::8888',
+        'closest_prefix': {'_ref': 10},
+        'prefixes': [{'_ref': 10}]
+    })
+
+    records.append(dict(records[0], address='8.8.4.4', reputation=[]))
+    return records, referencer
+
+
+def test_ip_address_batch(test_ipv4_addresses):
+    """Test zeroguard.types.ip_address_batch.IPAddressBatch type."""
+    records, referencer = make_batch_records(test_ipv4_addresses)
+    batch = IPAddressBatch.from_dicts(records, referencer)
+
+    assert len(batch) == len(records)
+
+    # Materialized records must be the same as decoded with from_dict
+    for index, record in enumerate(records):
+        data_type = KNOWN_TYPES[record['type']]
+        want = data_type.from_dict(record, referencer)
+
+        for ipaddr in (batch[index], batch[index - len(records)]):
+            assert isinstance(ipaddr, data_type)
+            assert ipaddr.to_dict() == want.to_dict()
+
+    assert batch.to_dicts() == [
+        KNOWN_TYPES[r['type']].from_dict(r, referencer).to_dict()
+        for r in records
+    ]
+
+    assert [i.address for i in batch] == [i.address for i in batch[:]]
+    assert isinstance(batch[-2], IPv6Address)
+
+    with pytest.raises(IndexError):
+        # pylint: disable=W0104
+        batch[len(records)]
+
+    # Test columnar filtering
+    assert batch.where_prefix(2) == [0, 2]
+    assert batch.where_prefix(10) == [1]
+    assert batch.where_reputation('firehol-coinbl-hosts') == [0]
+    assert batch.where_reputation('firehol-coinbl-hosts', True) == []
+    assert batch.where_reputation('no-such-list') == []
+
+    subset = batch.take([1, 2])
+    assert subset.to_dicts() == batch.to_dicts()[1:]
+
+    # Records are not resolved if a referencer is missing
+    ipaddr = IPAddressBatch.from_dicts(records)[0]
+    with pytest.raises(ZGClientError):
+        # pylint: disable=W0104
+        ipaddr.closest_prefix
+
+
+@pytest.mark.parametrize('record', [
+    {'type': 'ipv4', 'address': '::1'},
+    {'type': 'ipv6', 'address': '8.8.8.8'},
+    {'type': 'netpref', 'address': '8.8.8.8'},
+    {'type': None},
+    {'type': 'ipv4', 'address': 'foo'},
+    {'type': 'ipv4', 'address': '8.8.8.8', 'closest_prefix': {}},
+    {'type': 'ipv4', 'address': '8.8.8.8', 'reputation': [{'name': 'x'}]},
+    {'closest_prefix': {'_ref': '1'}},
+    {'prefixes': [{'_ref': 2 ** 63}]},
+    {'reputation': [{
+        'name': 'x',
+        'current': True,
+        'first_seen': 10 ** 15,
+        'last_seen': 0
+    }]},
+    {'reputation': [{
+        'name': 'x',
+        'current': True,
+        'first_seen': 0,
+        'last_seen': 2 ** 63
+    }]}
+])
+def test_ip_address_batch_fail(record):
+    """Malformed records must be rejected without changing a batch."""
+    good_record = {
+        'type': 'ipv4',
+        'address': '8.8.8.8',
+        'closest_prefix': {'_ref': 1},
+        'prefixes': [{'_ref': 1}]
+    }
+
+    bad_record = dict(good_record)
+    bad_record.update(record)
+
+    batch = IPAddressBatch.from_dicts([good_record])
+
+    with pytest.raises(ValueError):
+        batch.extend([good_record, bad_record])
+
+    assert len(batch) == 1
+    assert len(batch.take([0])) == 1
+    assert len(batch._closest_prefix_refs) == 1  # pylint: disable=W0212
@@ -0,0 +1,537 @@
+"""Test zeroguard.types.meta module."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import inspect
+import ipaddress
+import threading
+
+import pytest
+
+# pylint: disable=E0401
+from conftest import measure_memory, measure_time, report_benchmark
+from zeroguard.errors.client import ZGClientError, ZGSanityCheckFailed
+from zeroguard.types import IPv4Address, NetworkPrefix, Subdomain
+from zeroguard.types.ip_address import IPReputationEntry
+from zeroguard.referencer import DictReferencer, StripedReferencer
+from zeroguard.types.meta import (
+    EMPTY_FIELDS,
+    PENDING_PREFIX,
+    DataReference,
+    DataTypeMeta,
+    dereference_graph
+)
+from zeroguard.utils.log import get_labeled_logger
+
+
+class LegacyReflectionType:
+    """Reimplementation of reflection based attribute access.
+
+    This is how data type attributes used to be dereferenced before lazy
+    reference descriptors were introduced. It is kept only as a benchmark
+    baseline.
+    """
+
+    def __init__(self, value):
+        """."""
+        self.value = value
+        self._deref_map = {'value': True}
+
+    def __getattribute__(self, name):
+        """."""
+        value = object.__getattribute__(self, name)
+
+        if name.startswith('_') or inspect.ismethod(value):
+            return value
+
+        try:
+            if self._deref_map[name]:
+                return value
+
+        except KeyError:
+            pass
+
+        return value
+
+
+class LegacyIPReputationEntry:
+    """Reputation entry with a dictionary based layout and datetimes."""
+
+    def __init__(self, name, current, first_seen, last_seen):
+        """."""
+        self.name = name
+        self.current = current
+        self.first_seen = datetime.fromtimestamp(first_seen)
+        self.last_seen = datetime.fromtimestamp(last_seen)
+
+
+class LegacyIPv4Address:
+    """IPv4 address with a dictionary based layout.
+
+    This is how data type instances used to be laid out in memory before
+    slots were introduced. It is kept only as a benchmark baseline.
+    """
+
+    def __init__(self, address, closest_prefix, prefixes, reputation):
+        """."""
+        self.address = address
+        self.closest_prefix = closest_prefix
+        self.prefixes = prefixes
+        self.reputation = reputation
+
+        self._logger = get_labeled_logger(__name__)
+        self._referencer = None
+        self._deref_map = {'closest_prefix': True, 'prefixes': True}
+
+
+class PlainType:
+    """Class with a plain attribute used as a benchmark baseline."""
+
+    def __init__(self, value):
+        """."""
+        self.value = value
+
+
+class HostType(DataTypeMeta):
+    """Data type which relies on default serialization methods."""
+
+    TYPE = 'host'
+
+    FIELDS = ('name', 'address', 'prefix', 'prefixes')
+    REFERENCE_FIELDS = ('prefix', 'prefixes')
+
+    def __init__(self, name, address, prefix, prefixes, **kwargs):
+        """."""
+        self.name = name
+        self.address = ipaddress.ip_address(address)
+
+        self._set_reference_field('prefix', prefix)
+        self._set_reference_field('prefixes', prefixes)
+
+        super().__init__(**kwargs)
+
+    def __str__(self, as_list=False):
+        """."""
+        return self.name
+
+    @classmethod
+    def from_dict(cls, data, referencer):
+        """."""
+        return cls(
+            data['name'],
+            data['address'],
+            DataReference(data['prefix']['_ref']),
+            [DataReference(p['_ref']) for p in data['prefixes']],
+            referencer=referencer
+        )
+
+    def to_dict(self):
+        """."""
+        return {'type': self.TYPE, 'name': self.name}
+
+    def update_from_reference_fields(self, reference, derefed_value):
+        """."""
+
+
+def make_ipv4_address(referencer):
+    """Create an IPv4 address instance with two prefix references."""
+    return IPv4Address.from_dict(
+        {
+            'type': 'ipv4',
+            'address': '8.8.8.8',
+            'closest_prefix': {'_ref': 1},
+            'prefixes': [{'_ref': 1}, {'_ref': 2}]
+        },
+        referencer
+    )
+
+
+def make_referencer():
+    """Create a dictionary referencer with two network prefixes."""
+    return {
+        1: NetworkPrefix('8.8.0.0/16'),
+        2: NetworkPrefix('0.0.0.0/0')
+    }
+
+
+def test_slots_layout():
+    """Data type instances must not carry an instance dictionary."""
+    for cls in (IPv4Address, NetworkPrefix, Subdomain, IPReputationEntry):
+        for name in cls.FIELDS if hasattr(cls, 'FIELDS') else cls.__slots__:
+            assert name in cls.__slots__
+
+    ipaddr = make_ipv4_address(make_referencer())
+    assert not hasattr(ipaddr, '__dict__')
+
+    # pylint: disable=W0212
+    assert IPv4Address._REFERENCE_BITS == {
+        'closest_prefix': 1,
+        'prefixes': 2
+    }
+
+
+def test_deprecated_logger_label():
+    """A logger label is still accepted, but ignored."""
+    with pytest.warns(DeprecationWarning):
+        prefix = NetworkPrefix('8.8.0.0/16', logger_label='foo')
+
+    assert str(prefix.prefix) == '8.8.0.0/16'
+
+    with pytest.warns(DeprecationWarning):
+        ipaddr = IPv4Address('8.8.8.8', None, (), (), logger_label='foo')
+
+    assert not hasattr(ipaddr, '__dict__')
+
+
+def test_lazy_dereference():
+    """Reference fields are resolved on a first read and then cached."""
+    referencer = make_referencer()
+    ipaddr = make_ipv4_address({})
+
+    assert ipaddr.pending_fields == ('closest_prefix', 'prefixes')
+    assert isinstance(
+        getattr(ipaddr, PENDING_PREFIX + 'closest_prefix'),
+        DataReference
+    )
+
+    with pytest.raises(ZGClientError):
+        # pylint: disable=W0104
+        ipaddr.closest_prefix
+
+    # Failed dereferencing must keep the raw value for a later retry
+    assert ipaddr.pending_fields == ('closest_prefix', 'prefixes')
+
+    # pylint: disable=W0212
+    ipaddr._referencer = referencer
+    assert ipaddr.closest_prefix is referencer[1]
+
+    assert ipaddr.pending_fields == ('prefixes',)
+    assert not hasattr(ipaddr, PENDING_PREFIX + 'closest_prefix')
+
+    # Resolved values must be served directly from a slot
+    IPv4Address.closest_prefix.__set__(ipaddr, referencer[2])
+    assert ipaddr.closest_prefix is referencer[2]
+
+    with pytest.raises(AttributeError):
+        # pylint: disable=E1101,W0104
+        ipaddr.no_such_attribute
+
+
+def test_dereference_all():
+    """Test recursive dereferencing of all instance fields."""
+    referencer = make_referencer()
+    ipaddr = make_ipv4_address(referencer)
+
+    # Even values resolved at creation time are kept pending until accessed
+    assert ipaddr.pending_fields == ('closest_prefix', 'prefixes')
+    ipaddr.dereference_all(recursive=True)
+
+    assert ipaddr.pending_fields == ()
+    assert ipaddr.prefixes == [referencer[1], referencer[2]]
+
+
+class CountingReferencer(DictReferencer):
+    """Dictionary referencer which counts batched and single lookups."""
+
+    def __init__(self):
+        """."""
+        super().__init__()
+        self.batches = []
+        self.single_lookups = 0
+
+    def __getitem__(self, ref, log=True):
+        """."""
+        self.single_lookups += 1
+        return super().__getitem__(ref, log=log)
+
+    def get_many(self, refs):
+        """."""
+        self.batches.append(sorted(refs))
+        found = super().get_many(refs)
+        self.single_lookups -= len(refs)
+        return found
+
+
+def make_ipv4_addresses(referencer, count):
+    """Create IPv4 address instances with unresolved prefix references."""
+    return [
+        IPv4Address.from_dict(
+            {
+                'type': 'ipv4',
+                'address': str(ipaddress.IPv4Address(index)),
+                'closest_prefix': {'_ref': 1},
+                'prefixes': [{'_ref': 1}, {'_ref': 2}]
+            },
+            referencer
+        ) for index in range(count)
+    ]
+
+
+def test_dereference_graph():
+    """All pending references are resolved with a single batched lookup."""
+    referencer = CountingReferencer()
+    ipaddrs = make_ipv4_addresses(referencer, 100)
+
+    for ref, prefix in make_referencer().items():
+        referencer[ref] = prefix
+
+    referencer.single_lookups = 0
+    assert dereference_graph(ipaddrs) == set()
+
+    assert referencer.batches == [[1, 2]]
+    assert referencer.single_lookups == 0
+
+    for ipaddr in ipaddrs:
+        assert ipaddr.pending_fields == ()
+        assert ipaddr.closest_prefix is referencer[1]
+        assert ipaddr.prefixes == [referencer[1], referencer[2]]
+
+
+def test_dereference_graph_fetch():
+    """Missing references are fetched once per graph level."""
+    referencer = DictReferencer()
+    ipaddr = make_ipv4_addresses(referencer, 1)[0]
+    prefixes = make_referencer()
+    fetched = []
+
+    subdomain = Subdomain.from_dict(
+        {
+            'type': 'subdomain',
+            'name': 'www.example.com',
+            'ipv4': [{'_ref': 10, 'live': True, 'latest': True}]
+        },
+        referencer
+    )
+
+    def fetch(ref_ids):
+        fetched.append(ref_ids)
+        return {r: ipaddr if r == 10 else prefixes[r] for r in ref_ids}
+
+    assert dereference_graph([subdomain], fetch=fetch) == set()
+
+    # Prefixes of a fetched IPv4 address are fetched on a next level
+    assert fetched == [[10], [1, 2]]
+    assert referencer[10] is ipaddr
+    assert referencer[2] is prefixes[2]
+
+    assert subdomain.pending_fields == ()
+    assert subdomain.live_ipv4 is ipaddr
+    assert ipaddr.pending_fields == ()
+    assert ipaddr.prefixes == [prefixes[1], prefixes[2]]
+
+
+def test_dereference_graph_fail():
+    """Unresolvable references are reported and kept pending."""
+    referencer = {1: NetworkPrefix('8.8.0.0/16')}
+    ipaddr = make_ipv4_addresses({}, 1)[0]
+
+    with pytest.raises(ZGClientError):
+        dereference_graph([ipaddr], referencer=referencer)
+
+    assert dereference_graph(
+        [ipaddr],
+        referencer=referencer,
+        strict=False
+    ) == {2}
+
+    # Only fields with all references resolved are patched
+    assert ipaddr.pending_fields == ('prefixes',)
+    assert ipaddr.closest_prefix is referencer[1]
+
+
+def test_intern_reference():
+    """Equal references are shared within a referencer."""
+    referencer = DictReferencer()
+    first, second = make_ipv4_addresses(referencer, 2)
+
+    # pylint: disable=W0212
+    reference = first._get_raw_field('closest_prefix')
+
+    assert reference is second._get_raw_field('closest_prefix')
+    assert reference is first._get_raw_field('prefixes')[0]
+    assert reference.fields is EMPTY_FIELDS
+    assert reference == DataReference(1)
+
+    assert referencer.intern_reference(5, {'live': True}) is (
+        referencer.intern_reference(5, {'live': True})
+    )
+
+    assert referencer.intern_reference(5, {'live': True}) is not (
+        referencer.intern_reference(5, {'latest': True})
+    )
+
+    # Plain mappings cannot intern references
+    assert make_ipv4_addresses({}, 1)[0]._get_raw_field(
+        'closest_prefix'
+    ) is not reference
+
+    with pytest.raises(AttributeError):
+        reference.ref_id = 2
+
+    with pytest.raises(TypeError):
+        reference.fields['live'] = True
+
+    with pytest.raises(ZGSanityCheckFailed):
+        referencer.intern_reference('1')
+
+
+def test_intern_reference_threads():
+    """Threads interning references of a new referencer share one table."""
+    for _ in range(20):
+        referencer = StripedReferencer()
+        barrier = threading.Barrier(8)
+
+        def intern(_):
+            barrier.wait()
+            return referencer.intern_reference(1)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            references = list(executor.map(intern, range(8)))
+
+        assert len({id(r) for r in references}) == 1
+
+
+@pytest.mark.benchmark
+def test_benchmark_intern_reference_memory():
+    """Compare memory used by interned and per-instance data references."""
+    count = 5000
+    referencer = DictReferencer()
+
+    results = report_benchmark(
+        'bytes per data reference',
+        fmt='%i',
+        plain=measure_memory(lambda i: DataReference(i % 2), count),
+        interned=measure_memory(
+            lambda i: referencer.intern_reference(i % 2),
+            count
+        )
+    )
+
+    assert results['interned'] / results['plain'] < 1
+
+
+def test_default_serialization():
+    """Data types get serialization methods built from their fields."""
+    referencer = make_referencer()
+    host = HostType(
+        'foo',
+        '8.8.8.8',
+        referencer[1],
+        [DataReference(2, {'live': True}), referencer[1]],
+        referencer=referencer
+    )
+
+    ref_ids = {id(v): k for k, v in referencer.items()}
+
+    def ref_of(instance):
+        return ref_ids[id(instance)]
+
+    assert host.to_ref_dict(ref_of) == {
+        'type': 'host',
+        'name': 'foo',
+        'address': '8.8.8.8',
+        'prefix': {'_ref': 1},
+        'prefixes': [{'_ref': 2, 'live': True}, {'_ref': 1}]
+    }
+
+    values = host.to_packed(ref_of)
+    assert values == ['foo', '8.8.8.8', 1, [[2, {'live': True}], 1]]
+
+    unpacked = HostType.from_packed(values, referencer)
+
+    assert unpacked.address == host.address
+    assert unpacked.prefix is referencer[1]
+    assert unpacked.pending_fields == ('prefixes',)
+    assert unpacked.to_ref_dict(ref_of) == host.to_ref_dict(ref_of)
+
+    loaded = HostType.from_dict(host.to_ref_dict(ref_of), referencer)
+    assert loaded.prefixes == [referencer[2], referencer[1]]
+
+    # A single reference with extra fields is not a list of references
+    unpacked = HostType.from_packed(
+        ['foo', '8.8.8.8', [2, {'live': True}], []],
+        referencer
+    )
+
+    assert unpacked.to_ref_dict(ref_of)['prefix'] == {'_ref': 2, 'live': True}
+
+    with pytest.raises(ValueError):
+        HostType.from_packed(values[1:], referencer)
+
+    # Data types without reference fields use their dictionaries
+    assert referencer[1].to_ref_dict(ref_of) == referencer[1].to_dict()
+
+
+def test_ip_reputation_entry():
+    """Reputation timestamps are kept as integers and converted on demand."""
+    entry = IPReputationEntry('foo', True, 1584712048, '1584720037')
+
+    assert entry.first_seen_ts == 1584712048
+    assert entry.last_seen_ts == 1584720037
+    assert entry.first_seen == datetime.fromtimestamp(1584712048)
+    assert entry.to_dict() == {
+        'name': 'foo',
+        'current': True,
+        'first_seen': 1584712048,
+        'last_seen': 1584720037
+    }
+
+    with pytest.raises(ValueError):
+        IPReputationEntry('foo', True, 'bar', 1584720037)
+
+
+@pytest.mark.benchmark
+def test_benchmark_resolved_field_read():
+    """Compare a resolved field read speed with reflection based access."""
+    ipaddr = make_ipv4_address(make_referencer())
+    ipaddr.dereference_all()
+
+    legacy = LegacyReflectionType(ipaddr.closest_prefix)
+    plain = PlainType(ipaddr.closest_prefix)
+
+    def measure(stmt):
+        return measure_time(stmt, number=100000, repeat=5)
+
+    results = report_benchmark(
+        'resolved field read',
+        descriptor=measure(lambda: ipaddr.closest_prefix),
+        reflection=measure(lambda: legacy.value),
+        plain=measure(lambda: plain.value)
+    )
+
+    assert results['descriptor'] / results['reflection'] < 1
+
+
+@pytest.mark.benchmark
+def test_benchmark_memory_per_object():
+    """Compare memory used by slots and dictionary based layouts."""
+    count = 5000
+    prefixes = [NetworkPrefix('8.8.0.0/16'), NetworkPrefix('0.0.0.0/0')]
+    reputation = (('foo', True, 1584712048, 1584720037),) * 2
+
+    def make_legacy(index):
+        return LegacyIPv4Address(
+            ipaddress.IPv4Address(index),
+            prefixes[0],
+            list(prefixes),
+            [LegacyIPReputationEntry(*r) for r in reputation]
+        )
+
+    def make_slotted(index):
+        ipaddr = IPv4Address(
+            ipaddress.IPv4Address(index),
+            prefixes[0],
+            list(prefixes),
+            [IPReputationEntry(*r) for r in reputation]
+        )
+
+        ipaddr.dereference_all()
+        return ipaddr
+
+    results = report_benchmark(
+        'bytes per IPv4 object',
+        fmt='%i',
+        dict=measure_memory(make_legacy, count),
+        slots=measure_memory(make_slotted, count)
+    )
+
+    assert results['slots'] / results['dict'] < 1
@@ -0,0 +1,190 @@
+"""Test zeroguard.types.schema module."""
+from copy import deepcopy
+
+import pytest
+
+# pylint: disable=E0401
+from conftest import measure_time, report_benchmark
+from zeroguard.referencer import DictReferencer
+from zeroguard.types import KNOWN_TYPES, IPv4Address, IPv6Address
+from zeroguard.types.ip_address import IPReputationEntry
+from zeroguard.types.meta import DataReference, DataTypeMeta
+from zeroguard.types.schema import Field, ReferenceField
+
+
+def legacy_from_dict(cls, data, referencer):
+    """Decode an IP address the way hand-written decoders used to.
+
+    It is kept as a reference implementation and a benchmark baseline.
+    """
+    try:
+        data_type = data['type']
+        address = data['address']
+
+        reputation = [
+            IPReputationEntry.from_dict(d)
+            for d in data.get('reputation', [])
+        ]
+
+        closest_prefix_ref = data['closest_prefix']['_ref']
+        prefixes_refs = [p['_ref'] for p in data['prefixes']]
+
+        if data_type != cls.TYPE:
+            raise ValueError('Wrong data type in data')
+
+    except (KeyError, TypeError, ValueError) as err:
+        raise ValueError(err)
+
+    try:
+        closest_prefix = referencer[closest_prefix_ref]
+    except KeyError:
+        closest_prefix = DataReference(closest_prefix_ref)
+
+    prefixes = []
+    for prefixes_ref in prefixes_refs:
+        try:
+            prefixes.append(referencer[prefixes_ref])
+        except KeyError:
+            prefixes.append(DataReference(prefixes_ref))
+
+    return cls(
+        address,
+        closest_prefix,
+        prefixes,
+        reputation,
+        referencer=referencer
+    )
+
+
+class SchemaType(DataTypeMeta):
+    """Data type with optional and renamed schema fields."""
+
+    TYPE = 'schema'
+
+    FIELDS = ('name', 'parent', 'tags')
+    REFERENCE_FIELDS = ('parent',)
+
+    SCHEMA = (
+        Field('name', key='full_name'),
+        ReferenceField('parent', default={'_ref': 0}),
+        Field('tags', default=())
+    )
+
+    def __init__(self, name, parent, tags, **kwargs):
+        """."""
+        self.name = name
+        self._set_reference_field('parent', parent)
+        self.tags = tags
+        super().__init__(**kwargs)
+
+    def __str__(self):
+        """."""
+        return self.name
+
+    def to_dict(self):
+        """."""
+        return {'type': self.TYPE, 'full_name': self.name}
+
+    def update_from_reference_fields(self, reference, derefed_value):
+        """."""
+
+
+def load_references(references):
+    """Load a reference table of a fixture into a new referencer."""
+    referencer = DictReferencer()
+
+    for ref_id, data in references.items():
+        referencer[int(ref_id)] = KNOWN_TYPES[data['type']].from_dict(
+            data,
+            referencer
+        )
+
+    return referencer
+
+
+def test_generated_decoder(test_ipv4_addresses):
+    """Generated decoders yield the same instances as hand-written ones."""
+    assert 'def from_dict(cls, data, referencer):' in (
+        IPv4Address.DECODER_SOURCE
+    )
+
+    for data, references in test_ipv4_addresses:
+        referencer = load_references(references)
+
+        ipaddr = IPv4Address.from_dict(data, referencer)
+        expected = legacy_from_dict(IPv4Address, data, referencer)
+
+        assert ipaddr.to_dict() == expected.to_dict()
+        assert ipaddr.prefixes == expected.prefixes
+
+        # Unresolved references are kept as interned data references
+        ipaddr = IPv4Address.from_dict(data, DictReferencer())
+        assert ipaddr.pending_fields == ('closest_prefix', 'prefixes')
+
+
+def test_generated_decoder_fields():
+    """Test optional and renamed schema fields."""
+    instance = SchemaType.from_dict(
+        {'type': 'schema', 'full_name': 'foo'},
+        {0: SchemaType('root', None, ())}
+    )
+
+    assert instance.name == 'foo'
+    assert instance.parent.name == 'root'
+    assert instance.tags == ()
+
+
+@pytest.mark.parametrize('update', [
+    {'type': 'ipv6'},
+    {'type': None},
+    {'closest_prefix': None},
+    {'prefixes': [{}]},
+    {'reputation': [{'name': 'foo'}]},
+    {'reputation': [{
+        'name': 'foo',
+        'current': True,
+        'first_seen': 'bar',
+        'last_seen': 1
+    }]}
+])
+def test_generated_decoder_fail(test_ipv4_addresses, update):
+    """Test decoding of malformed records."""
+    data = dict(deepcopy(test_ipv4_addresses[0][0]), **update)
+
+    with pytest.raises(ValueError):
+        IPv4Address.from_dict(data, {})
+
+    with pytest.raises(ValueError):
+        IPv6Address.from_dict(dict(data, type='ipv6'), {})
+
+
+@pytest.mark.benchmark
+def test_benchmark_generated_decoder(test_ipv4_addresses):
+    """Compare generated and hand-written decoders on scaled fixture data.
+
+    Most of the decoding time is spent in data type constructors which are
+    shared by both decoders, so only a decoder overhead differs and timings
+    are close enough to be dominated by noise.
+    """
+    data, references = test_ipv4_addresses[0]
+    referencer = load_references(references)
+    records = [data] * 20000
+
+    def generated():
+        decode = IPv4Address.from_dict
+        return [decode(r, referencer) for r in records]
+
+    def legacy():
+        return [legacy_from_dict(IPv4Address, r, referencer) for r in records]
+
+    # Runs are interleaved so both decoders are equally affected by drift
+    timings = [
+        (measure_time(generated, repeat=1), measure_time(legacy, repeat=1))
+        for _ in range(5)
+    ]
+
+    report_benchmark(
+        'decoding 20k records',
+        generated=min(t[0] for t in timings),
+        legacy=min(t[1] for t in timings)
+    )
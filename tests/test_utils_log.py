@@ -1,8 +1,27 @@
 """Test zeroguard.utils.log module."""
+import logging
+
 import pytest
 
 # pylint: disable=E0401
-from zeroguard.utils.log import get_labeled_logger
+from zeroguard.utils.log import (
+    LazyLogMessage,
+    format_logmsg,
+    get_labeled_logger
+)
+
+
+class CountingValue:
+    """Value which counts how many times it was converted to a string."""
+
+    def __init__(self):
+        """."""
+        self.count = 0
+
+    def __str__(self):
+        """."""
+        self.count += 1
+        return 'counted'
 
 
 @pytest.mark.parametrize(('name', 'label'), [
@@ -27,3 +46,30 @@ def test_get_labeled_logger_fail(name, label):
     """Test bad cases for zeroguard.utils.log.get_labeled_logger function."""
     with pytest.raises(TypeError):
         get_labeled_logger(name, label)
+
+
+def test_lazy_log_message(caplog):
+    """Lazy log messages are formatted only when emitted."""
+    error = ValueError('bar')
+    message = LazyLogMessage('foo', fields={'a': 1}, error=error, trace=False)
+
+    assert str(message) == format_logmsg(
+        'foo',
+        fields={'a': 1},
+        error=error,
+        trace=False
+    )
+
+    value = CountingValue()
+    logger = get_labeled_logger(__name__, 'lazy')
+
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        logger.debug(LazyLogMessage('foo', fields={'value': value}))
+
+    assert value.count == 0
+
+    with caplog.at_level(logging.DEBUG, logger=logger.name):
+        logger.debug(LazyLogMessage('foo', fields={'value': value}))
+
+    assert value.count > 0
+    assert caplog.records[-1].getMessage() == 'foo: value="counted"'
@@ -0,0 +1,152 @@
+"""Test zeroguard.validators.cache module."""
+from ipaddress import IPv4Address, IPv4Network, ip_network
+import random
+
+import pytest
+
+# pylint: disable=E0401
+from conftest import measure_time, report_benchmark
+from zeroguard.validators.cache import (
+    CACHES,
+    ConversionCache,
+    cache_stats,
+    resize_caches
+)
+from zeroguard.validators.meta import validate
+from zeroguard.validators.networks import (
+    IP_ADDRESS_CACHE,
+    NETWORK_PREFIX_CACHE,
+    check_valid_ip_address,
+    check_valid_network_prefix
+)
+
+
+@pytest.fixture
+def cache():
+    """Create a small conversion cache and unregister it afterwards."""
+    cache = ConversionCache('test', max_entries=2)
+    yield cache
+    del CACHES['test']
+
+
+def test_conversion_cache(cache):
+    """Test memoization, eviction and statistics of a cache."""
+    first = cache.validate('8.8.8.8', (IPv4Address,))
+
+    assert cache.validate('8.8.8.8', (IPv4Address,)) is first
+    assert cache.validate('8.8.8.8', (IPv4Address,), convert=False) is True
+    assert cache.stats == {
+        'entries': 1,
+        'max_entries': 2,
+        'hits': 2,
+        'misses': 1,
+        'hit_rate': 2 / 3
+    }
+
+    # Values of different types and expected types are cached separately
+    assert cache.validate(134744072, (IPv4Address,)) == first
+    assert cache.validate(
+        '8.8.8.8',
+        (IPv4Address,),
+        expected_type=IPv4Address
+    ) is not first
+
+    # Oldest entries are evicted first
+    assert len(cache) == 2
+    assert cache.validate('8.8.8.8', (IPv4Address,)) is not first
+
+    # Failed conversions and unhashable values are never cached
+    assert cache.validate([], (lambda v: 1,)) == 1
+    assert len(cache) == 2
+
+    with pytest.raises(ValueError):
+        cache.validate('foo', (IPv4Address,))
+
+    cache.resize(0)
+    assert len(cache) == 0
+    assert cache.validate('8.8.8.8', (IPv4Address,)) == first
+    assert len(cache) == 0
+
+    cache.clear()
+    assert cache.stats['hits'] == 0
+
+
+def test_conversion_cache_check(cache):
+    """Outcomes of checks without conversion must be cached as well."""
+    calls = []
+
+    def check_ipv4(value):
+        calls.append(value)
+        return IPv4Address(value)
+
+    for _ in range(3):
+        assert cache.validate('8.8.8.8', (check_ipv4,), convert=False) is True
+        assert cache.validate('foo', (check_ipv4,), convert=False) is False
+
+    assert calls == ['8.8.8.8', 'foo']
+    assert len(cache) == 2
+    assert cache.stats['hits'] == 4
+    assert cache.stats['misses'] == 2
+
+    # Outcomes do not stand in for converted values
+    assert cache.validate('8.8.8.8', (check_ipv4,)) == IPv4Address('8.8.8.8')
+    assert len(calls) == 3
+
+    with pytest.raises(ValueError):
+        cache.validate('foo', (check_ipv4,))
+
+
+def test_validator_caches():
+    """Network validators share results through named caches."""
+    assert CACHES['ip_address'] is IP_ADDRESS_CACHE
+    assert CACHES['network_prefix'] is NETWORK_PREFIX_CACHE
+
+    prefix = check_valid_network_prefix('8.8.0.0/16')
+    assert check_valid_network_prefix('8.8.0.0/16') is prefix
+    assert isinstance(prefix, IPv4Network)
+
+    address = check_valid_ip_address('8.8.8.8')
+    assert check_valid_ip_address('8.8.8.8') is address
+    assert cache_stats()['ip_address']['hits'] >= 1
+
+    try:
+        resize_caches(0, names=['ip_address'])
+        assert len(IP_ADDRESS_CACHE) == 0
+        assert check_valid_ip_address('8.8.8.8') is not address
+        assert len(NETWORK_PREFIX_CACHE) > 0
+
+    finally:
+        resize_caches(8192)
+
+    with pytest.raises(KeyError):
+        resize_caches(1, names=['foo'])
+
+
+@pytest.mark.benchmark
+def test_benchmark_conversion_cache(cache):
+    """Compare cached and uncached convertion of repeated prefixes."""
+    rand = random.Random(42)
+
+    prefixes = [
+        '%i.%i.0.0/16' % (rand.randrange(256), rand.randrange(256))
+        for _ in range(1000)
+    ]
+
+    values = [rand.choice(prefixes) for _ in range(20000)]
+    cache.resize(len(prefixes))
+
+    def cached():
+        return [cache.validate(v, (ip_network,)) for v in values]
+
+    def uncached():
+        return [validate(v, (ip_network,)) for v in values]
+
+    results = report_benchmark(
+        'network prefix convertion',
+        cached=measure_time(cached),
+        uncached=measure_time(uncached)
+    )
+
+    assert results['cached'] / results['uncached'] < 1
+
+    assert cache.stats['hit_rate'] > 0.9
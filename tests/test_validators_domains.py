@@ -1,8 +1,76 @@
 """Test zeroguard.validators.domains module."""
+import random
+import string
+
 import pytest
 
 # pylint: disable=E0401
-from zeroguard.validators.domains import check_valid_domain
+from conftest import measure_time, report_benchmark
+from zeroguard.validators.domains import (
+    DOMAIN_RE,
+    IDNA_CACHE,
+    check_valid_domain,
+    check_valid_domains
+)
+from zeroguard.validators.meta import (
+    BAD_VALUE_RESULT,
+    REASON_OK,
+    to_unicode,
+    validate
+)
+
+
+def legacy_check_valid_domain(value, convert=True, expected_type=None):
+    """Validate a domain always going through the IDNA codec.
+
+    This is how domains used to be validated before an ASCII fast path was
+    introduced. It is kept as a reference implementation and a benchmark
+    baseline.
+    """
+    def convertor(value):
+        try:
+            converted = to_unicode(value).encode('idna').decode('ascii')
+
+            if DOMAIN_RE.match(converted):
+                return converted
+
+        except UnicodeError as err:
+            raise ValueError(err)
+
+        raise ValueError()
+
+    return validate(
+        value,
+        (convertor,),
+        convert=convert,
+        expected_type=expected_type
+    )
+
+
+def make_hostnames(count, seed=42):
+    """Generate a corpus of mostly valid and mostly ASCII hostnames."""
+    rand = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits
+    tlds = ['com', 'net', 'org', 'io', 'xn--p1ai', 'co.uk']
+    hostnames = []
+
+    for _ in range(count):
+        labels = [
+            ''.join(rand.choice(alphabet) for _ in range(rand.randint(1, 12)))
+            for _ in range(rand.randint(1, 3))
+        ]
+
+        hostname = '.'.join(labels + [rand.choice(tlds)])
+
+        if rand.random() < 0.01:
+            hostname = 'b\u00fccher-%i.de' % rand.randrange(100)
+
+        elif rand.random() < 0.01:
+            hostname = '-' + hostname
+
+        hostnames.append(hostname)
+
+    return hostnames
 
 
 @pytest.mark.parametrize(('value', 'converted_value'), [
@@ -23,6 +91,11 @@ def test_check_valid_domain_ok(value, converted_value):
     """."""
     assert check_valid_domain(value, convert=False) is True
     assert check_valid_domain(value) == converted_value
+    assert check_valid_domain(value, as_result=True) == (
+        True,
+        converted_value,
+        REASON_OK
+    )
 
 
 @pytest.mark.parametrize('value', [
@@ -51,6 +124,78 @@ def test_check_valid_domain_ok(value, converted_value):
 def test_check_valid_domain_fail(value):
     """."""
     assert check_valid_domain(value, convert=False) is False
+    assert check_valid_domain(value, as_result=True) is BAD_VALUE_RESULT
 
     with pytest.raises(ValueError):
         check_valid_domain(value)
+
+
+def test_check_valid_domain_legacy():
+    """Fast path yields the same results as the IDNA codec."""
+    for value in make_hostnames(5000) + [None, b'example.com', 42, '']:
+        try:
+            expected = legacy_check_valid_domain(value)
+        except ValueError:
+            expected = None
+
+        try:
+            got = check_valid_domain(value)
+        except ValueError:
+            got = None
+
+        assert got == expected
+
+
+def test_check_valid_domains():
+    """Test bulk domain validation."""
+    hits = IDNA_CACHE.hits
+
+    names, rejected = check_valid_domains([
+        'example.com',
+        '-bruh.com',
+        'kr\u00e4uter.com',
+        b'example.org',
+        None,
+        'kr\u00e4uter.com',
+        'xn--kruter-cua.com-'
+    ])
+
+    assert names == [
+        'example.com',
+        'xn--kruter-cua.com',
+        'example.org',
+        'xn--kruter-cua.com'
+    ]
+
+    assert rejected == [
+        (1, '-bruh.com'),
+        (4, None),
+        (6, 'xn--kruter-cua.com-')
+    ]
+
+    assert IDNA_CACHE.hits > hits
+
+
+@pytest.mark.benchmark
+def test_benchmark_check_valid_domains():
+    """Compare the fast path and bulk validation with the IDNA codec.
+
+    A corpus of a million hostnames is validated once per function, as a
+    run over such a corpus is long enough to be timed reliably.
+    """
+    hostnames = make_hostnames(1000000)
+
+    def legacy():
+        return [legacy_check_valid_domain(v, convert=False) for v in hostnames]
+
+    def single():
+        return [check_valid_domain(v, convert=False) for v in hostnames]
+
+    results = report_benchmark(
+        'domain validation',
+        legacy=measure_time(legacy, repeat=1),
+        single=measure_time(single, repeat=1),
+        bulk=measure_time(lambda: check_valid_domains(hostnames), repeat=1)
+    )
+
+    assert results['bulk'] / results['legacy'] < 1
@@ -1,14 +1,58 @@
 """Test zeroguard.validators.networks module."""
-from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
+from ipaddress import (
+    IPv4Address,
+    IPv4Network,
+    IPv6Address,
+    IPv6Network,
+    ip_address
+)
+import random
 
 import pytest
 
 # pylint: disable=E0401
+from conftest import measure_time, report_benchmark
+from zeroguard.utils.log import format_logmsg
+from zeroguard.validators.meta import (
+    BAD_VALUE_RESULT,
+    REASON_OK,
+    UNEXPECTED_TYPE_RESULT,
+    validate
+)
 from zeroguard.validators.networks import (
     check_valid_ip_address,
-    check_valid_network_prefix
+    check_valid_network_prefix,
+    pack_ip_addresses,
+    pack_ipv4_addresses,
+    pack_ipv6_addresses
 )
 
+PACK_TEST_VALUES = [
+    '8.8.8.8',
+    '127.0.0.1',
+    '255.255.255.255',
+    '::1',
+    'dead:bad:0:0:0:0:42:1',
+    '0:0:0:0:0:ffff:1.2.3.4',
+    '::192.168.30.2',
+    'abc.0.0.1',
+    '1278.0.0.1',
+    '01.1.1.1',
+    '1.1.1.1/32',
+    'abcd:1234::123::1',
+    '1:2:3:4:5:6:7:8:9',
+    '',
+    b'\x08\x08\x08\x08',
+    b'\x20\x01' + bytes(14),
+    b'8.8.8.8',
+    134744072,
+    2 ** 32,
+    -1,
+    2 ** 128,
+    None,
+    1.5
+]
+
 
 @pytest.mark.parametrize('value', [
     '8.8.8.8',
@@ -25,6 +69,11 @@ def test_check_valid_ip_address_ok_noexpecttype(value):
     assert result_bool is True
 
     result_converted = check_valid_ip_address(value)
+    assert check_valid_ip_address(value, as_result=True) == (
+        True,
+        result_converted,
+        REASON_OK
+    )
     assert isinstance(result_converted, (IPv4Address, IPv6Address))
 
 
@@ -65,6 +114,7 @@ def test_check_valid_ip_address_fail_noexpecttype(value):
     """."""
     result_bool = check_valid_ip_address(value, convert=False)
     assert result_bool is False
+    assert check_valid_ip_address(value, as_result=True) is BAD_VALUE_RESULT
 
     with pytest.raises(ValueError):
         check_valid_ip_address(value)
@@ -76,6 +126,12 @@ def test_check_valid_ip_address_fail_noexpecttype(value):
 ])
 def test_check_valid_ip_address_fail_expecttype(value, wrong_type):
     """."""
+    assert check_valid_ip_address(
+        value,
+        expected_type=wrong_type,
+        as_result=True
+    ) in (BAD_VALUE_RESULT, UNEXPECTED_TYPE_RESULT)
+
     with pytest.raises(ValueError):
         check_valid_ip_address(value, expected_type=wrong_type)
 
@@ -98,6 +154,11 @@ def test_check_valid_network_prefix_ok_noexpecttype(value):
     assert result_bool is True
 
     result_converted = check_valid_network_prefix(value)
+    assert check_valid_network_prefix(value, as_result=True) == (
+        True,
+        result_converted,
+        REASON_OK
+    )
     assert isinstance(result_converted, (IPv4Network, IPv6Network))
 
 
@@ -145,6 +206,9 @@ def test_check_valid_network_prefix_fail_noexpecttype(value):
     """
     result_bool = check_valid_network_prefix(value, convert=False)
     assert result_bool is False
+    assert check_valid_network_prefix(value, as_result=True) is (
+        BAD_VALUE_RESULT
+    )
 
     with pytest.raises(ValueError):
         check_valid_network_prefix(value)
@@ -160,5 +224,189 @@ def test_check_valid_network_prefix_fail_expecttype(value, wrong_type):
     Check bad cases by explicitly specifying an expected type which is
     different from the one that is correct.
     """
+    assert check_valid_network_prefix(
+        value,
+        expected_type=wrong_type,
+        as_result=True
+    ) in (BAD_VALUE_RESULT, UNEXPECTED_TYPE_RESULT)
+
     with pytest.raises(ValueError):
         check_valid_network_prefix(value, expected_type=wrong_type)
+
+
+def test_pack_ipv4_addresses():
+    """Bulk IPv4 packing must agree with check_valid_ip_address."""
+    addresses, mask = pack_ipv4_addresses(PACK_TEST_VALUES)
+
+    assert addresses.itemsize == 4
+    assert len(addresses) == len(mask) == len(PACK_TEST_VALUES)
+
+    for value, address, valid in zip(PACK_TEST_VALUES, addresses, mask):
+        try:
+            want = check_valid_ip_address(value, expected_type=IPv4Address)
+        except ValueError:
+            want = None
+
+        assert bool(valid) == (want is not None)
+        assert address == (int(want) if want else 0)
+
+
+def test_pack_ipv6_addresses():
+    """Bulk IPv6 packing must agree with check_valid_ip_address."""
+    addresses, mask = pack_ipv6_addresses(PACK_TEST_VALUES)
+
+    assert len(addresses) == 16 * len(PACK_TEST_VALUES)
+    assert len(mask) == len(PACK_TEST_VALUES)
+
+    for index, value in enumerate(PACK_TEST_VALUES):
+        try:
+            want = check_valid_ip_address(value, expected_type=IPv6Address)
+        except ValueError:
+            want = None
+
+        assert bool(mask[index]) == (want is not None)
+        assert addresses[index * 16:index * 16 + 16] == (
+            want.packed if want else bytes(16)
+        )
+
+
+def test_pack_ip_addresses():
+    """Bulk mixed packing must agree with check_valid_ip_address."""
+    versions, ipv4, ipv6 = pack_ip_addresses(PACK_TEST_VALUES)
+    want_ipv4 = []
+    want_ipv6 = []
+
+    for value, version in zip(PACK_TEST_VALUES, versions):
+        want = check_valid_ip_address(value, convert=False) and (
+            check_valid_ip_address(value)
+        )
+
+        assert version == (want.version if want else 0)
+
+        if want and want.version == 4:
+            want_ipv4.append(int(want))
+        elif want:
+            want_ipv6.append(want.packed)
+
+    assert list(ipv4) == want_ipv4
+    assert ipv6 == b''.join(want_ipv6)
+
+
+def test_pack_ip_addresses_numpy():
+    """Test NumPy output of bulk packing functions."""
+    numpy = pytest.importorskip('numpy')
+    values = ['8.8.8.8', 'foo', '::1', 'ffff::1']
+
+    addresses, mask = pack_ipv4_addresses(values, use_numpy=True)
+    assert addresses.dtype == numpy.uint32
+    assert addresses.tolist() == [134744072, 0, 0, 0]
+    assert mask.tolist() == [True, False, False, False]
+
+    addresses, mask = pack_ipv6_addresses(values, use_numpy=True)
+    assert addresses.shape == (4, 2)
+    assert addresses[2].tolist() == [0, 1]
+    assert addresses[3].tolist() == [0xffff << 48, 1]
+    assert mask.tolist() == [False, False, True, True]
+
+    versions, ipv4, ipv6 = pack_ip_addresses(values, use_numpy=True)
+    assert versions.tolist() == [4, 0, 6, 6]
+    assert ipv4.tolist() == [134744072]
+    assert ipv6.shape == (2, 2)
+
+
+@pytest.mark.benchmark
+def test_benchmark_pack_ip_addresses():
+    """Compare bulk packing with per-address validation."""
+    rand = random.Random(42)
+    values = [str(ip_address(rand.getrandbits(32))) for _ in range(20000)]
+    values += ['1.2.3.400'] * 1000
+
+    def per_address():
+        return [check_valid_ip_address(v, convert=False) for v in values]
+
+    results = report_benchmark(
+        'IP address validation',
+        bulk=measure_time(lambda: pack_ip_addresses(values)),
+        per_address=measure_time(per_address)
+    )
+
+    assert results['bulk'] / results['per_address'] < 1
+
+
+def test_lazy_error_messages():
+    """Error messages are rendered only when an error is stringified."""
+    with pytest.raises(ValueError) as excinfo:
+        check_valid_network_prefix('8.8.8.8/33')
+
+    message = str(excinfo.value)
+
+    assert message.startswith('Failed to convert a value to a native type')
+    assert 'value="8.8.8.8/33"' in message
+    assert 'error_trace=' in message
+    assert str(excinfo.value) == message
+
+    # Arguments of an error are plain strings
+    assert excinfo.value.args == (
+        'Failed to convert a value to a native type',
+    )
+
+    # An original error is kept without frames of a failed call
+    assert excinfo.value.logmsg.error.__traceback__ is None
+    assert 'Traceback (most recent call last)' in message
+
+
+@pytest.mark.benchmark
+def test_benchmark_rejected_values():
+    """Compare rejection of bad values with eagerly formatted errors."""
+    values = ['1.2.3.%i' % i for i in range(256, 2256)]
+
+    def eager_validate(value):
+        try:
+            return ip_address(value)
+
+        except ValueError as err:
+            cast_err = RuntimeError(format_logmsg(
+                'Failed to cast a value to any of the provided types',
+                fields={'value': value},
+                error=err
+            ))
+
+            format_logmsg(
+                'Failed to convert a value to a native type',
+                error=cast_err,
+                fields={'value': value, 'expected_type': 'not_spec'}
+            )
+
+            return False
+
+    results = report_benchmark(
+        'rejected IP addresses',
+        eager=measure_time(lambda: [eager_validate(v) for v in values]),
+        lazy=measure_time(
+            lambda: [validate(v, (ip_address,), convert=False) for v in values]
+        )
+    )
+
+    assert results['lazy'] / results['eager'] < 1
+
+
+@pytest.mark.benchmark
+def test_benchmark_rejected_values_as_result():
+    """Compare filtering of bad values with and without raising errors.
+
+    A cheap cast function is used so that the cost of validation machinery
+    itself is measured rather than the cost of parsing.
+    """
+    values = ['%ix' % i for i in range(20000)]
+
+    def as_bool():
+        return [v for v in values if validate(v, (int,), convert=False)]
+
+    def as_result():
+        return [v for v in values if validate(v, (int,), as_result=True).ok]
+
+    report_benchmark(
+        'rejected values',
+        convert_false=measure_time(as_bool),
+        as_result=measure_time(as_result)
+    )
@@ -0,0 +1,332 @@
+"""Coalescing of single lookups into bulk API requests.
+
+A batcher collects queries submitted within a short window (or until a
+maximum batch size is reached) and sends all of them in a single bulk
+request. Every submitter gets a future which is resolved with a result of
+its own query once a bulk response is decoded. Objects shared by many
+results (e.g. network prefixes) are sent in a bulk response and decoded
+only once, as with any other response.
+
+Identical queries of a same batch are sent once and all their futures are
+resolved with a same result. Every future of a failed query gets its own
+copy of an error, chained to an original one, so waiters raising it do not
+share (and extend) a single traceback.
+"""
+import asyncio
+from concurrent.futures import Future
+import copy
+import threading
+
+from zeroguard.errors.client import ZGClientError, ZGSanityCheckFailed
+from zeroguard.utils.aio import get_running_loop
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_WINDOW = 0.01
+
+
+class Batcher:
+    """Thread-safe batcher of blocking bulk requests.
+
+    A batch is sent either by a thread which fills it up or by a timer thread
+    once a batch window elapses.
+    """
+
+    def __init__(
+            self,
+            send,
+            max_size=DEFAULT_BATCH_SIZE,
+            window=DEFAULT_BATCH_WINDOW
+    ):
+        """.
+
+        :param send:     Function of a list of distinct queries which sends a
+                         bulk request and returns a dictionary mapping every
+                         query to its result or to an error to raise.
+        :param max_size: Maximum number of distinct queries in a batch.
+        :param window:   Number of seconds to wait for more queries after a
+                         first query of a batch.
+
+        :type send:     callable
+        :type max_size: int
+        :type window:   float
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        _check_batch_limits(max_size, window)
+
+        self.send = send
+        self.max_size = max_size
+        self.window = window
+
+        self._pending = {}
+        self._timer = None
+        self._batches = 0
+        self._queries = 0
+
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """Return batching metrics.
+
+        * `batches` - Number of sent bulk requests.
+        * `queries` - Number of submitted queries.
+        * `pending` - Number of distinct queries waiting to be sent.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'queries': self._queries,
+                'pending': len(self._pending)
+            }
+
+    def submit(self, query):
+        """Add a query to a current batch.
+
+        :param query: Hashable query.
+
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        with self._lock:
+            self._queries += 1
+            self._pending.setdefault(query, []).append(future)
+
+            if len(self._pending) >= self.max_size:
+                batch = self._take()
+
+            else:
+                batch = None
+
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+        if batch:
+            _resolve(batch, self.send)
+
+        return future
+
+    def flush(self):
+        """Send a current batch right away."""
+        with self._lock:
+            batch = self._take()
+
+        if batch:
+            _resolve(batch, self.send)
+
+    def _take(self):
+        """Detach a current batch and stop its timer."""
+        batch, self._pending = self._pending, {}
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if batch:
+            self._batches += 1
+
+        return batch
+
+
+class AsyncBatcher:
+    """Batcher of asynchronous bulk requests.
+
+    A batch is sent by a task created in an event loop of a first query of a
+    batch. A batcher may be used by consecutive event loops (e.g. of many
+    `asyncio.run` calls), but not by concurrent ones. A batch of a previous
+    loop which has not been sent is dropped once a new loop submits a query.
+    """
+
+    def __init__(
+            self,
+            send,
+            max_size=DEFAULT_BATCH_SIZE,
+            window=DEFAULT_BATCH_WINDOW
+    ):
+        """.
+
+        Arguments are the same as of `Batcher`, but `send` is a coroutine
+        function.
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        _check_batch_limits(max_size, window)
+
+        self.send = send
+        self.max_size = max_size
+        self.window = window
+
+        # Event loop which owns a timer and futures of a current batch
+        self._loop = None
+        self._pending = {}
+        self._timer = None
+        self._tasks = {}
+        self._batches = 0
+        self._queries = 0
+
+    @property
+    def stats(self):
+        """Return batching metrics.
+
+        Same as `Batcher.stats`.
+        """
+        return {
+            'batches': self._batches,
+            'queries': self._queries,
+            'pending': len(self._pending)
+        }
+
+    def submit(self, query):
+        """Add a query to a current batch.
+
+        Must be called from a running event loop.
+
+        :param query: Hashable query.
+
+        :rtype: asyncio.Future
+        """
+        loop = get_running_loop()
+
+        if loop is not self._loop:
+            self._reset(loop)
+
+        future = loop.create_future()
+
+        self._queries += 1
+        self._pending.setdefault(query, []).append(future)
+
+        if len(self._pending) >= self.max_size:
+            self.flush()
+
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+
+        return future
+
+    def flush(self):
+        """Start sending a current batch."""
+        batch, self._pending = self._pending, {}
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not batch:
+            return
+
+        self._batches += 1
+
+        # Event loops keep weak references to tasks only
+        loop = get_running_loop()
+        task = loop.create_task(_resolve_async(batch, self.send))
+
+        self._tasks[task] = loop
+        task.add_done_callback(self._discard)
+
+    async def drain(self):
+        """Send a current batch and wait until all batches are resolved.
+
+        Only batches of a running event loop are sent and waited for.
+        """
+        loop = get_running_loop()
+
+        if loop is self._loop:
+            self.flush()
+
+        tasks = [t for t, l in self._tasks.items() if l is loop]
+
+        if tasks:
+            await asyncio.wait(tasks)
+
+    def _reset(self, loop):
+        """Drop a batch of a previous event loop, whose timer never fires."""
+        if self._timer is not None:
+            self._timer.cancel()
+
+        self._loop = loop
+        self._pending = {}
+        self._timer = None
+
+    def _discard(self, task):
+        """Forget a task of a resolved batch."""
+        self._tasks.pop(task, None)
+
+
+def _check_batch_limits(max_size, window):
+    """Check batcher arguments.
+
+    :raises: zeroguard.errors.client.ZGSanityCheckFailed
+    """
+    if max_size < 1 or window < 0:
+        raise ZGSanityCheckFailed(
+            message='Batch size must be positive and window non-negative',
+            context={'max_size': max_size, 'window': window}
+        )
+
+
+def _resolve(batch, send):
+    """Send a batch and resolve futures of all its queries."""
+    try:
+        results = send(list(batch))
+
+    except Exception as err:  # pylint: disable=W0703
+        _set_results(batch, error=err)
+
+    else:
+        _set_results(batch, results)
+
+
+async def _resolve_async(batch, send):
+    """Send a batch asynchronously and resolve futures of all its queries."""
+    try:
+        results = await send(list(batch))
+
+    except Exception as err:  # pylint: disable=W0703
+        _set_results(batch, error=err)
+
+    else:
+        _set_results(batch, results)
+
+
+def _set_results(batch, results=None, error=None):
+    """Resolve futures of a batch with their results or a batch error."""
+    for query, futures in batch.items():
+        result = error
+
+        if result is None:
+            try:
+                result = results[query]
+
+            except (KeyError, TypeError) as err:
+                result = err
+
+        for future in futures:
+            # Futures of asyncio tasks may be cancelled by their waiters
+            if future.done():
+                continue
+
+            if isinstance(result, BaseException):
+                future.set_exception(_copy_error(result))
+
+            else:
+                future.set_result(result)
+
+
+def _copy_error(error):
+    """Copy an error for a single future and chain it to an original one."""
+    try:
+        copied = copy.copy(error)
+
+    # Errors which can not be rebuilt from their arguments are wrapped
+    except Exception:  # pylint: disable=W0703
+        copied = ZGClientError(error=error, message='Batched query failed')
+
+    copied.__cause__ = error
+
+    return copied
@@ -0,0 +1,1080 @@
+"""ZeroGuard API clients.
+
+Client keeps a pool of persistent (keep-alive) connections per API host, so
+consecutive requests do not pay for TCP and TLS handshakes. Connections which
+have to be reopened resume a TLS session of a pool instead of doing a full
+handshake (on Python 3.6 and newer). All objects returned by the API are
+registered in a single session referencer, so objects shared by many
+responses (e.g. network prefixes) are decoded only once.
+
+Requests of both clients are paced by a rate limiter which learns a permitted
+rate from API responses (see `zeroguard.ratelimit`). Transient server-side
+errors are retried within a retry budget (see `zeroguard.retry`). Lookups
+may be coalesced into bulk requests (see `zeroguard.batching`).
+
+Asynchronous client runs many lookups concurrently on top of the same pooled
+transport for use in asyncio applications.
+"""
+import asyncio
+from collections import namedtuple
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import http.client
+import json
+import queue
+import ssl
+import threading
+from urllib.parse import quote, urlencode, urlsplit
+import weakref
+
+from zeroguard.__version__ import __version__
+from zeroguard.batching import AsyncBatcher, Batcher, DEFAULT_BATCH_SIZE
+from zeroguard.envelope import iter_decode
+from zeroguard.errors.client import ZGCommunicationError, ZGSanityCheckFailed
+from zeroguard.errors.server import ZGEmptyResult, get_server_error
+from zeroguard.ratelimit import RateLimiter
+from zeroguard.referencer import StripedReferencer
+from zeroguard.retry import RetryPolicy
+from zeroguard.utils.aio import get_running_loop
+from zeroguard.utils.log import LazyLogMessage, get_labeled_logger
+from zeroguard.validators.domains import check_valid_domain
+from zeroguard.validators.networks import check_valid_ip_address
+
+DEFAULT_BASE_URL = 'https://api.zeroguard.com/v1'
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONCURRENCY = 32
+DEFAULT_TIMEOUT = 30.0
+
+API_KEY_HEADER = 'X-API-Key'
+USER_AGENT = 'zeroguard-sdk-python/%s' % __version__
+
+# Errors of sending a request over a connection which was closed by a server
+# before a response (and thus safe to resend)
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError
+)
+
+# TLS sessions can be resumed explicitly only since Python 3.6
+TLS_SESSIONS = hasattr(ssl.SSLSocket, 'session')
+
+# Lookup endpoints which accept many queries at once
+BULK_ENDPOINTS = ('ip', 'subdomain')
+
+# Result of a single lookup out of many. A value is None if a lookup failed
+# with an error.
+LookupResult = namedtuple('LookupResult', ('query', 'value', 'error'))
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent connections to a single host.
+
+    At most `size` connections are open at a time. Idle connections are
+    reused in a last in, first out order, so surplus connections are left to
+    be closed by a server keep-alive timeout.
+
+    Connection statistics counters are not synchronized between threads and
+    are therefore approximate under concurrent use.
+    """
+
+    def __init__(
+            self,
+            scheme,
+            host,
+            port=None,
+            size=DEFAULT_POOL_SIZE,
+            timeout=DEFAULT_TIMEOUT,
+            ssl_context=None
+    ):
+        """.
+
+        :param scheme:      Either 'http' or 'https'.
+        :param host:        Host name or an IP address.
+        :param port:        Port number. A scheme default if not set.
+        :param size:        Maximum number of open connections.
+        :param timeout:     Socket timeout and a maximum time to wait for a
+                            free connection in seconds.
+        :param ssl_context: SSL context of HTTPS connections. A default one
+                            is created if not set.
+
+        :type scheme:      str
+        :type host:        str
+        :type port:        int
+        :type size:        int
+        :type timeout:     float
+        :type ssl_context: ssl.SSLContext
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        if scheme not in ('http', 'https'):
+            raise ZGSanityCheckFailed(
+                message='Connection pool scheme must be http or https',
+                context={'scheme': scheme}
+            )
+
+        if not isinstance(size, int) or size < 1:
+            raise ZGSanityCheckFailed(
+                message='Connection pool size must be a positive integer',
+                context={'size': size}
+            )
+
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+
+        if scheme == 'https' and ssl_context is None:
+            ssl_context = ssl.create_default_context()
+
+        self.ssl_context = ssl_context
+
+        # Last TLS session which new connections attempt to resume
+        self.tls_session = None
+
+        # Number of opened connections and TLS sessions resumed by them
+        self.opened = 0
+        self.resumed = 0
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Return an idle connection or a new one if there is none.
+
+        :raises: zeroguard.errors.client.ZGCommunicationError
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ZGCommunicationError(
+                message='Timed out waiting for a free pooled connection',
+                context={'host': self.host, 'size': self.size}
+            )
+
+        try:
+            return self._idle.get_nowait()
+
+        except queue.Empty:
+            pass
+
+        if self.scheme == 'https':
+            return _HTTPSConnection(self)
+
+        return _HTTPConnection(self)
+
+    def release(self, connection, reuse=True):
+        """Return a connection acquired from this pool.
+
+        :param connection: Connection with a fully read last response.
+        :param reuse:      Keep a connection open for a next request.
+                           Otherwise it is closed.
+
+        :type reuse: bool
+        """
+        if isinstance(connection, _HTTPSConnection):
+            connection.save_session()
+
+        if reuse and connection.sock is not None:
+            self._idle.put(connection)
+        else:
+            connection.close()
+
+        self._slots.release()
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+
+            except queue.Empty:
+                return
+
+    @property
+    def stats(self):
+        """Return connection usage statistics.
+
+        :rtype: dict
+        """
+        return {
+            'idle': self._idle.qsize(),
+            'opened': self.opened,
+            'resumed': self.resumed
+        }
+
+
+class _HTTPConnection(http.client.HTTPConnection):
+    """HTTP connection which counts connects of its pool."""
+
+    def __init__(self, pool):
+        """."""
+        self._pool = pool
+        super().__init__(pool.host, pool.port, timeout=pool.timeout)
+
+    def connect(self):
+        """."""
+        super().connect()
+        self._pool.opened += 1
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS connection which resumes a TLS session of its pool."""
+
+    def __init__(self, pool):
+        """."""
+        self._pool = pool
+
+        super().__init__(
+            pool.host,
+            pool.port,
+            timeout=pool.timeout,
+            context=pool.ssl_context
+        )
+
+    def connect(self):
+        """."""
+        http.client.HTTPConnection.connect(self)
+
+        kwargs = {}
+
+        if TLS_SESSIONS:
+            kwargs['session'] = self._pool.tls_session
+
+        # pylint: disable=E1101
+        self.sock = self._context.wrap_socket(
+            self.sock,
+            server_hostname=self.host,
+            **kwargs
+        )
+
+        self._pool.opened += 1
+
+        if getattr(self.sock, 'session_reused', False):
+            self._pool.resumed += 1
+
+    def close(self):
+        """."""
+        # Connections which are closed by a server are closed as soon as
+        # response headers are read
+        self.save_session()
+        super().close()
+
+    def save_session(self):
+        """Make a TLS session of this connection the one to resume.
+
+        TLS 1.3 session tickets arrive after a handshake, thus sessions are
+        taken only once a response is received.
+        """
+        session = getattr(self.sock, 'session', None)
+
+        if session is not None:
+            self._pool.tls_session = session
+
+
+class Client:
+    """Synchronous ZeroGuard API client.
+
+    A single client instance is meant to be shared by all threads of a
+    process, as it is safe to use concurrently and its connections and
+    decoded objects are reused by all of them.
+    """
+
+    def __init__(
+            self,
+            api_key=None,
+            base_url=DEFAULT_BASE_URL,
+            pool_size=DEFAULT_POOL_SIZE,
+            timeout=DEFAULT_TIMEOUT,
+            referencer=None,
+            ssl_context=None,
+            logger_label=None,
+            rate_limiter=None,
+            retry_policy=None,
+            batch_size=DEFAULT_BATCH_SIZE,
+            batch_window=None
+    ):
+        """.
+
+        :param api_key:      API key to authenticate requests with.
+        :param base_url:     API root URL.
+        :param pool_size:    Maximum number of open connections per host.
+        :param timeout:      Socket timeout in seconds.
+        :param referencer:   Session referencer to register all received
+                             objects into. A new thread-safe referencer is
+                             used if not set.
+        :param ssl_context:  SSL context of HTTPS connections.
+        :param logger_label: Label to include in a name of an instance logger.
+        :param rate_limiter: Rate limiter to pace requests with. May be shared
+                             with other clients of a same API key. A new one
+                             which learns a rate from responses is used if not
+                             set.
+        :param retry_policy: Policy to retry transient errors with. May be
+                             shared with other clients to share a retry
+                             budget. A default policy is used if not set.
+        :param batch_size:   Maximum number of lookups in a bulk request.
+        :param batch_window: Number of seconds to collect lookups of other
+                             threads for before sending them in a bulk
+                             request. Lookups are not batched if not set.
+
+        :type api_key:      str
+        :type base_url:     str
+        :type pool_size:    int
+        :type timeout:      float
+        :type referencer:   zeroguard.referencer.ReferencerMeta child
+        :type ssl_context:  ssl.SSLContext
+        :type logger_label: str
+        :type rate_limiter: zeroguard.ratelimit.RateLimiter
+        :type retry_policy: zeroguard.retry.RetryPolicy
+        :type batch_size:   int
+        :type batch_window: float
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        url = urlsplit(base_url)
+
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise ZGSanityCheckFailed(
+                message='API base URL must be an absolute HTTP(S) URL',
+                context={'base_url': base_url}
+            )
+
+        self.api_key = api_key
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.referencer = (
+            StripedReferencer() if referencer is None else referencer
+        )
+
+        self.rate_limiter = (
+            RateLimiter() if rate_limiter is None else rate_limiter
+        )
+
+        self.retry_policy = (
+            RetryPolicy(logger_label=logger_label) if retry_policy is None
+            else retry_policy
+        )
+
+        self.ssl_context = ssl_context
+        self.logger = get_labeled_logger(__name__, logger_label)
+
+        self._base_path = url.path.rstrip('/')
+        self._origin = (url.scheme, url.hostname, url.port)
+
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+        self._batchers = None
+
+        if batch_window is not None:
+            self._batchers = {
+                endpoint: Batcher(
+                    functools.partial(self._bulk_lookup, endpoint),
+                    max_size=batch_size,
+                    window=batch_window
+                ) for endpoint in BULK_ENDPOINTS
+            }
+
+    def __enter__(self):
+        """."""
+        return self
+
+    def __exit__(self, *args):
+        """."""
+        self.close()
+
+    def close(self):
+        """Send pending batches and close all idle pooled connections."""
+        for batcher in (self._batchers or {}).values():
+            batcher.flush()
+
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+
+    def lookup_ip(self, address):
+        """Look up an IPv4 or an IPv6 address.
+
+        :rtype: zeroguard.types.IPv4Address or zeroguard.types.IPv6Address
+
+        :raises: ValueError, zeroguard.errors.client.ZGClientError child,
+                 zeroguard.errors.server.ZGServerError child
+        """
+        if self._batchers:
+            return self._wait_batched('ip', _get_ip_query(address))
+
+        return self._lookup(_get_ip_path(address))
+
+    def lookup_subdomain(self, name):
+        """Look up a subdomain.
+
+        :rtype: zeroguard.types.Subdomain
+
+        :raises: ValueError, zeroguard.errors.client.ZGClientError child,
+                 zeroguard.errors.server.ZGServerError child
+        """
+        if self._batchers:
+            return self._wait_batched(
+                'subdomain',
+                _get_subdomain_query(name)
+            )
+
+        return self._lookup(_get_subdomain_path(name))
+
+    def decode(self, data, query=None):
+        """Decode data type instances of a response body.
+
+        :param data:  Response body of a list of envelopes or an envelope.
+        :param query: Request parameters to report on failure.
+
+        :type data:  bytes
+        :type query: dict
+
+        :rtype: list(zeroguard.types.meta.DataTypeMeta)
+
+        :raises: zeroguard.errors.client.ZGCommunicationError
+        """
+        try:
+            return list(iter_decode([data], self.referencer))
+
+        except ValueError as err:
+            raise ZGCommunicationError(
+                error=err,
+                message='Failed to decode an API response',
+                context=query
+            )
+
+    def request(self, method, path, params=None, body=None):
+        """Send an API request once a rate limiter permits.
+
+        Same as `send`, but transient errors are retried by a retry policy.
+        """
+        return self.retry_policy.call(
+            self._request,
+            method,
+            path,
+            params,
+            body
+        )
+
+    def send(self, method, path, params=None, body=None):
+        """Send an API request right away and return a response body.
+
+        A request which finds a reused connection closed by a server (which
+        may close an idle connection at any time) before any response arrives
+        is sent once more on a new connection. All other errors, including
+        timeouts, are raised as a request may have been processed already. A
+        rate limiter learns a permitted rate from a response.
+
+        :param method: HTTP method.
+        :param path:   Path relative to an API root URL.
+        :param params: URL query parameters.
+        :param body:   Value to send JSON encoded as a request body.
+
+        :type method: str
+        :type path:   str
+        :type params: dict
+
+        :rtype: bytes
+
+        :raises: zeroguard.errors.client.ZGCommunicationError,
+                 zeroguard.errors.server.ZGServerError child
+        """
+        url = self._base_path + path
+
+        if params:
+            url += '?' + urlencode(params)
+
+        headers = {
+            'Accept': 'application/json',
+            'User-Agent': USER_AGENT
+        }
+
+        if self.api_key:
+            headers[API_KEY_HEADER] = self.api_key
+
+        if body is not None:
+            body = json.dumps(body, separators=(',', ':')).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        query = {'method': method, 'url': url}
+        pool = self._get_pool()
+
+        while True:
+            connection = pool.acquire()
+            reused = connection.sock is not None
+
+            try:
+                connection.request(method, url, body=body, headers=headers)
+                response = connection.getresponse()
+
+            except (OSError, http.client.HTTPException) as err:
+                pool.release(connection, reuse=False)
+
+                if reused and isinstance(err, STALE_CONNECTION_ERRORS):
+                    self.logger.debug(LazyLogMessage(
+                        'Retrying a request on a new connection',
+                        fields=query,
+                        error=err
+                    ))
+
+                    continue
+
+                raise ZGCommunicationError(
+                    error=err,
+                    message='Failed to send an API request',
+                    context=query
+                )
+
+            try:
+                data = response.read()
+
+            except (OSError, http.client.HTTPException) as err:
+                pool.release(connection, reuse=False)
+
+                raise ZGCommunicationError(
+                    error=err,
+                    message='Failed to read an API response',
+                    context=query
+                )
+
+            pool.release(connection, reuse=not response.will_close)
+            break
+
+        self.logger.debug(LazyLogMessage(
+            'Received an API response',
+            fields=dict(query, status=response.status, length=len(data))
+        ))
+
+        self.rate_limiter.update(response.status, response.headers)
+
+        if response.status >= 400:
+            raise _get_response_error(response.status, data, query)
+
+        return data
+
+    @property
+    def stats(self):
+        """Return connection usage statistics of all hosts.
+
+        :rtype: dict
+        """
+        with self._pools_lock:
+            return {
+                '%s://%s%s' % (
+                    scheme,
+                    host,
+                    ':%i' % port if port else ''
+                ): pool.stats for (scheme, host, port), pool in (
+                    self._pools.items()
+                )
+            }
+
+    def _get_pool(self):
+        """Return a connection pool of an API host."""
+        try:
+            return self._pools[self._origin]
+
+        except KeyError:
+            pass
+
+        with self._pools_lock:
+            scheme, host, port = self._origin
+
+            try:
+                return self._pools[self._origin]
+
+            except KeyError:
+                pool = self._pools[self._origin] = ConnectionPool(
+                    scheme,
+                    host,
+                    port,
+                    size=self.pool_size,
+                    timeout=self.timeout,
+                    ssl_context=self.ssl_context
+                )
+
+                return pool
+
+    def _request(self, method, path, params, body):
+        """Send a single attempt of a request once a rate limiter permits."""
+        self.rate_limiter.acquire()
+        return self.send(method, path, params=params, body=body)
+
+    def decode_bulk(self, data, endpoint, queries):
+        """Decode results of a bulk lookup response body.
+
+        :param data:     Response body of a list of envelopes.
+        :param endpoint: Bulk lookup endpoint name.
+        :param queries:  Normalized queries of a request.
+
+        :type data:     bytes
+        :type endpoint: str
+        :type queries:  list
+
+        :return: Data type instances or errors by queries.
+        :rtype:  dict
+
+        :raises: zeroguard.errors.client.ZGCommunicationError
+        """
+        query = {'method': 'POST', 'path': _get_bulk_path(endpoint)}
+        get_key = _BULK_KEYS[endpoint]
+
+        found = {}
+
+        for instance in self.decode(data, query):
+            found[get_key(instance)] = instance
+
+        return {
+            q: found[q] if q in found else ZGEmptyResult(
+                200,
+                query=dict(query, lookup=str(q))
+            ) for q in queries
+        }
+
+    def decode_single(self, data, path):
+        """Decode a single data type instance of a lookup response body.
+
+        :raises: zeroguard.errors.client.ZGCommunicationError,
+                 zeroguard.errors.server.ZGEmptyResult
+        """
+        query = {'method': 'GET', 'path': path}
+        instances = self.decode(data, query)
+
+        if not instances:
+            raise ZGEmptyResult(200, query=query)
+
+        return instances[0]
+
+    def _bulk_lookup(self, endpoint, queries):
+        """Request results of many normalized queries at once.
+
+        :raises: zeroguard.errors.client.ZGCommunicationError,
+                 zeroguard.errors.server.ZGServerError child
+        """
+        data = self.request(
+            'POST',
+            _get_bulk_path(endpoint),
+            body={'queries': [str(q) for q in queries]}
+        )
+
+        return self.decode_bulk(data, endpoint, queries)
+
+    def _lookup(self, path):
+        """Request a single data type instance.
+
+        :raises: zeroguard.errors.client.ZGCommunicationError,
+                 zeroguard.errors.server.ZGServerError child
+        """
+        return self.decode_single(self.request('GET', path), path)
+
+    def _wait_batched(self, endpoint, query):
+        """Submit a normalized query to a batch and wait for its result.
+
+        A batch is waited for no longer than its window, a retry deadline
+        and a socket timeout of a last attempt altogether.
+
+        :raises: zeroguard.errors.client.ZGCommunicationError,
+                 zeroguard.errors.server.ZGServerError child
+        """
+        batcher = self._batchers[endpoint]
+        future = batcher.submit(query)
+
+        try:
+            return future.result(
+                timeout=(
+                    batcher.window
+                    + self.retry_policy.deadline
+                    + self.timeout
+                )
+            )
+
+        except concurrent.futures.TimeoutError as err:
+            raise ZGCommunicationError(
+                error=err,
+                message='Timed out waiting for a bulk lookup',
+                context={
+                    'path': _get_bulk_path(endpoint),
+                    'lookup': str(query)
+                }
+            )
+
+
+class AsyncClient:
+    """Asynchronous ZeroGuard API client.
+
+    Requests are sent over a pooled synchronous client by a dedicated pool of
+    worker threads, at most `concurrency` of them at a time, while responses
+    are decoded in an event loop thread. Decoding is thus never concurrent and
+    an object shared by many in-flight responses is decoded only once and
+    registered in a shared session referencer.
+    """
+
+    def __init__(
+            self,
+            api_key=None,
+            base_url=DEFAULT_BASE_URL,
+            concurrency=DEFAULT_CONCURRENCY,
+            timeout=DEFAULT_TIMEOUT,
+            referencer=None,
+            ssl_context=None,
+            logger_label=None,
+            rate_limiter=None,
+            retry_policy=None,
+            batch_size=DEFAULT_BATCH_SIZE,
+            batch_window=None
+    ):
+        """.
+
+        :param concurrency: Maximum number of requests in flight. This is
+                            also a connection pool size.
+
+        Other arguments are the same as of `Client`, but lookups of other
+        tasks are collected into bulk requests.
+
+        :type concurrency: int
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        self.client = Client(
+            api_key=api_key,
+            base_url=base_url,
+            pool_size=concurrency,
+            timeout=timeout,
+            referencer=referencer,
+            ssl_context=ssl_context,
+            logger_label=logger_label,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy
+        )
+
+        self.concurrency = concurrency
+
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        # Semaphores are bound to event loops, so a client used by many
+        # loops (e.g. by consecutive `asyncio.run` calls) has one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+        self._batchers = None
+
+        if batch_window is not None:
+            self._batchers = {
+                endpoint: AsyncBatcher(
+                    functools.partial(self._bulk_lookup, endpoint),
+                    max_size=batch_size,
+                    window=batch_window
+                ) for endpoint in BULK_ENDPOINTS
+            }
+
+    async def __aenter__(self):
+        """."""
+        return self
+
+    async def __aexit__(self, *args):
+        """."""
+        await self.aclose()
+
+    @property
+    def referencer(self):
+        """Return a session referencer shared by all responses."""
+        return self.client.referencer
+
+    def close(self):
+        """Wait for requests in flight and close all pooled connections.
+
+        Batches which are still collecting lookups are not sent and their
+        lookups fail. Use `aclose` in an event loop to send them first.
+        """
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def aclose(self):
+        """Send pending batches and close a client once they are resolved.
+
+        Same as `close`, but worker threads are waited for without blocking
+        an event loop.
+        """
+        if self._batchers:
+            await asyncio.gather(*(
+                batcher.drain() for batcher in self._batchers.values()
+            ))
+
+        await get_running_loop().run_in_executor(None, self.close)
+
+    async def lookup_ip(self, address):
+        """Look up an IPv4 or an IPv6 address.
+
+        Same as `Client.lookup_ip`.
+        """
+        if self._batchers:
+            return await self._batchers['ip'].submit(_get_ip_query(address))
+
+        return await self._lookup(_get_ip_path(address))
+
+    async def lookup_subdomain(self, name):
+        """Look up a subdomain.
+
+        Same as `Client.lookup_subdomain`.
+        """
+        if self._batchers:
+            return await self._batchers['subdomain'].submit(
+                _get_subdomain_query(name)
+            )
+
+        return await self._lookup(_get_subdomain_path(name))
+
+    def lookup_ips(self, addresses):
+        """Look up many IPv4 or IPv6 addresses concurrently.
+
+        See `iter_lookups` for details.
+        """
+        return self.iter_lookups(self.lookup_ip, addresses)
+
+    def lookup_subdomains(self, names):
+        """Look up many subdomains concurrently.
+
+        See `iter_lookups` for details.
+        """
+        return self.iter_lookups(self.lookup_subdomain, names)
+
+    def iter_lookups(self, lookup, queries):
+        """Run lookups concurrently and yield results as they complete.
+
+        Queries are consumed lazily and no more than `concurrency` lookups
+        are pending at a time, so any number of queries can be looked up
+        without scheduling all of them upfront. Failed lookups do not stop
+        an iteration and are yielded with their errors. Lookups pending when
+        an iteration is stopped early are cancelled by its `aclose`.
+
+        :param lookup:  Lookup coroutine function (e.g. `lookup_ip`).
+        :param queries: Iterable of lookup arguments.
+
+        :type lookup:  callable
+        :type queries: iterable
+
+        :return: Asynchronous iterator of lookup results in a completion
+                 order.
+        :rtype:  zeroguard.client.LookupIterator
+        """
+        return LookupIterator(lookup, queries, self.concurrency)
+
+    async def request(self, method, path, params=None, body=None):
+        """Send an API request and return a response body.
+
+        Same as `Client.request`, but a task rather than a worker thread waits
+        for a rate limiter and between retries.
+        """
+        return await self.client.retry_policy.call_async(
+            self._request,
+            method,
+            path,
+            params,
+            body
+        )
+
+    async def _request(self, method, path, params, body):
+        """Send a single attempt of a request once a rate limiter permits."""
+        loop = get_running_loop()
+
+        try:
+            semaphore = self._semaphores[loop]
+
+        except KeyError:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(
+                self.concurrency
+            )
+
+        await self.client.rate_limiter.acquire_async()
+
+        async with semaphore:
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    self.client.send,
+                    method,
+                    path,
+                    params=params,
+                    body=body
+                )
+            )
+
+    async def _bulk_lookup(self, endpoint, queries):
+        """Request results of many normalized queries at once."""
+        data = await self.request(
+            'POST',
+            _get_bulk_path(endpoint),
+            body={'queries': [str(q) for q in queries]}
+        )
+
+        return self.client.decode_bulk(data, endpoint, queries)
+
+    async def _lookup(self, path):
+        """Request a single data type instance."""
+        return self.client.decode_single(
+            await self.request('GET', path),
+            path
+        )
+
+
+class LookupIterator:
+    """Asynchronous iterator of results of concurrent lookups.
+
+    An iterator class rather than an asynchronous generator, which is not
+    available on Python 3.5. See `AsyncClient.iter_lookups`.
+    """
+
+    def __init__(self, lookup, queries, concurrency):
+        """.
+
+        :param lookup:      Lookup coroutine function.
+        :param queries:     Iterable of lookup arguments.
+        :param concurrency: Maximum number of pending lookups.
+
+        :type lookup:      callable
+        :type queries:     iterable
+        :type concurrency: int
+        """
+        self.lookup = lookup
+        self.concurrency = concurrency
+
+        self._queries = iter(queries)
+        self._pending = set()
+        self._done = []
+
+    def __aiter__(self):
+        """."""
+        return self
+
+    async def __anext__(self):
+        """Return a result of a next completed lookup.
+
+        :rtype: zeroguard.client.LookupResult
+        """
+        if not self._done:
+            for query in self._queries:
+                self._pending.add(asyncio.ensure_future(
+                    _get_lookup_result(self.lookup, query)
+                ))
+
+                if len(self._pending) >= self.concurrency:
+                    break
+
+            if not self._pending:
+                raise StopAsyncIteration
+
+            try:
+                done, self._pending = await asyncio.wait(
+                    self._pending,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+            except BaseException:
+                self._cancel()
+                raise
+
+            self._done.extend(done)
+
+        return self._done.pop().result()
+
+    async def aclose(self):
+        """Stop an iteration and cancel all pending lookups."""
+        self._queries = iter(())
+        self._done = []
+        self._cancel()
+
+    def _cancel(self):
+        """Cancel all pending lookups."""
+        pending, self._pending = self._pending, set()
+
+        for task in pending:
+            task.cancel()
+
+
+async def _get_lookup_result(lookup, query):
+    """Run a lookup and return its result with an error it raised if any."""
+    try:
+        return LookupResult(query, await lookup(query), None)
+
+    except Exception as err:  # pylint: disable=W0703
+        return LookupResult(query, None, err)
+
+
+def _get_bulk_path(endpoint):
+    """Return a bulk lookup path of an endpoint."""
+    return '/%s/bulk' % endpoint
+
+
+def _get_ip_query(address):
+    """Return a normalized IP address of a lookup query.
+
+    :raises: ValueError
+    """
+    return check_valid_ip_address(address)
+
+
+def _get_ip_key(instance):
+    """Return a normalized IP address of a lookup result."""
+    return getattr(instance, 'address', None)
+
+
+def _get_ip_path(address):
+    """Return a lookup path of an IP address.
+
+    :raises: ValueError
+    """
+    address = check_valid_ip_address(address)
+    return '/ip/%s' % quote(str(address), safe='')
+
+
+def _get_subdomain_path(name):
+    """Return a lookup path of a subdomain.
+
+    :raises: ValueError
+    """
+    name = check_valid_domain(name)
+    return '/subdomain/%s' % quote(name, safe='')
+
+
+def _get_subdomain_query(name):
+    """Return a normalized subdomain name of a lookup query.
+
+    :raises: ValueError
+    """
+    return check_valid_domain(name).lower()
+
+
+def _get_subdomain_key(instance):
+    """Return a normalized subdomain name of a lookup result."""
+    name = getattr(instance, 'name', None)
+    return name.lower() if isinstance(name, str) else None
+
+
+def _get_response_error(status_code, data, query):
+    """Create a server-side error of a failed response.
+
+    Error responses are expected to be JSON objects of a form
+    `{"error": {"name": ..., "message": ...}}`. Other bodies are ignored and
+    an error is chosen by a status code.
+    """
+    name = message = None
+
+    try:
+        error = json.loads(data.decode('utf-8'))['error']
+        name = error.get('name')
+        message = error.get('message')
+
+    except (AttributeError, KeyError, TypeError, ValueError):
+        pass
+
+    return get_server_error(
+        status_code,
+        name=name if isinstance(name, str) else None,
+        message=message,
+        query=query
+    )
+
+
+# Functions returning normalized queries of bulk lookup results
+_BULK_KEYS = {'ip': _get_ip_key, 'subdomain': _get_subdomain_key}
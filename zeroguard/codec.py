@@ -0,0 +1,482 @@
+"""Compact binary serialization of data types and referencer snapshots.
+
+Data type instances are serialized as MessagePack arrays of a data type name
+followed by values returned by a `to_packed` method of an instance, thus
+addresses are stored as packed bytes, timestamps as integers and referenced
+objects as their reference IDs. A referencer snapshot is an array of a format
+version followed by `[reference ID, instance]` pairs of all its objects.
+
+MessagePack encoding is done by the `msgpack` library if it is installed and
+by a pure-Python implementation of a subset of the format (nil, booleans,
+integers, floats, strings, binary data, arrays and maps) otherwise. Both
+produce the same bytes and read each other's output.
+"""
+import struct
+
+from zeroguard.errors.builtin import LazyValueError
+from zeroguard.referencer import DictReferencer
+from zeroguard.types import KNOWN_TYPES
+from zeroguard.types.meta import dereference_graph
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SNAPSHOT_VERSION = 1
+
+_UINT8 = struct.Struct('>B')
+_UINT16 = struct.Struct('>H')
+_UINT32 = struct.Struct('>I')
+_UINT64 = struct.Struct('>Q')
+_INT8 = struct.Struct('>b')
+_INT16 = struct.Struct('>h')
+_INT32 = struct.Struct('>i')
+_INT64 = struct.Struct('>q')
+_FLOAT32 = struct.Struct('>f')
+_FLOAT64 = struct.Struct('>d')
+
+
+def pack(instance, ref_of):
+    """Serialize a data type instance.
+
+    :param instance: Data type instance to serialize.
+    :param ref_of:   Function which returns a reference ID of a referenced
+                     data type instance or raises KeyError (e.g. a `ref_of`
+                     method of a referencer).
+
+    :type instance: zeroguard.types.meta.DataTypeMeta
+    :type ref_of:   callable
+
+    :rtype: bytes
+
+    :raises: KeyError
+    """
+    return packb(_to_packed(instance, ref_of))
+
+
+def unpack(data, referencer):
+    """Deserialize a data type instance.
+
+    References are resolved in place if a referencer already holds them and
+    are left to be dereferenced lazily otherwise.
+
+    :param data:       Serialized data type instance.
+    :param referencer: Referencer which is used to resolve references.
+
+    :type data:       bytes
+    :type referencer: zeroguard.referencer.ReferencerMeta child
+
+    :rtype: zeroguard.types.meta.DataTypeMeta
+
+    :raises: ValueError
+    """
+    return _from_packed(unpackb(data), referencer)
+
+
+def snapshot(referencer):
+    """Serialize all objects held by a referencer.
+
+    Objects are written in an iteration order of a referencer. References
+    between them are written as reference IDs.
+
+    :param referencer: Referencer to serialize. Any referencer with a
+                       `ref_of` method is supported.
+    :type referencer:  zeroguard.referencer.ReferencerMeta child
+
+    :rtype: bytes
+    """
+    values = [SNAPSHOT_VERSION]
+    ref_of = referencer.ref_of
+
+    for ref_id, instance in referencer.items():
+        values.append([ref_id, _to_packed(instance, ref_of)])
+
+    return packb(values)
+
+
+def restore(data, referencer=None):
+    """Load all objects of a referencer snapshot into a referencer.
+
+    All references between snapshot objects are dereferenced once all of
+    them are loaded.
+
+    :param data:       Referencer snapshot.
+    :param referencer: Referencer to load objects into. A new dictionary
+                       referencer is used if not set.
+
+    :type data:       bytes
+    :type referencer: zeroguard.referencer.ReferencerMeta child
+
+    :return: Referencer holding all snapshot objects.
+    :rtype:  zeroguard.referencer.ReferencerMeta child
+
+    :raises: ValueError, zeroguard.errors.client.ZGClientError
+    """
+    if referencer is None:
+        referencer = DictReferencer()
+
+    values = unpackb(data)
+    version = values[0] if isinstance(values, list) and values else None
+
+    if version != SNAPSHOT_VERSION:
+        raise LazyValueError(
+            'Failed to restore a referencer snapshot of an unknown version',
+            fields={'version': version}
+        )
+
+    loaded = []
+
+    for entry in values[1:]:
+        try:
+            ref_id, packed = entry
+
+        except (TypeError, ValueError) as err:
+            raise LazyValueError(
+                'Failed to restore a malformed referencer snapshot entry',
+                error=err,
+                fields={'entry': entry}
+            )
+
+        instance = _from_packed(packed, referencer)
+        referencer[ref_id] = instance
+        loaded.append(instance)
+
+    dereference_graph(loaded, referencer, strict=False)
+
+    return referencer
+
+
+def _to_packed(instance, ref_of):
+    """Return a data type instance as a list of its type and values."""
+    values = instance.to_packed(ref_of)
+    values.insert(0, instance.TYPE)
+
+    return values
+
+
+def _from_packed(values, referencer):
+    """Create a data type instance from a list of its type and values.
+
+    :raises: ValueError
+    """
+    try:
+        data_type = KNOWN_TYPES[values[0]]
+        return data_type.from_packed(values[1:], referencer)
+
+    except (IndexError, KeyError, TypeError, ValueError) as err:
+        raise LazyValueError(
+            'Failed to create a data type instance from packed values',
+            error=err,
+            fields={'values': values}
+        )
+
+
+def packb(value):
+    """Encode a value into MessagePack bytes.
+
+    :raises: TypeError
+    """
+    if msgpack is not None:
+        return msgpack.packb(value, use_bin_type=True)
+
+    return py_packb(value)
+
+
+def unpackb(data):
+    """Decode a value from MessagePack bytes.
+
+    :raises: ValueError
+    """
+    if msgpack is not None:
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+        except Exception as err:  # pylint: disable=W0703
+            raise LazyValueError(
+                'Failed to decode MessagePack data',
+                error=err
+            )
+
+    return py_unpackb(data)
+
+
+def py_packb(value):
+    """Encode a value into MessagePack bytes in pure Python.
+
+    :raises: TypeError
+    """
+    out = bytearray()
+    _pack_value(value, out)
+
+    return bytes(out)
+
+
+def py_unpackb(data):
+    """Decode a value from MessagePack bytes in pure Python.
+
+    :raises: ValueError
+    """
+    try:
+        value, offset = _unpack_value(data, 0)
+
+    except (IndexError, TypeError, struct.error, UnicodeDecodeError) as err:
+        raise LazyValueError(
+            'Failed to decode truncated or malformed MessagePack data',
+            error=err
+        )
+
+    if offset != len(data):
+        raise LazyValueError(
+            'Failed to decode MessagePack data with trailing bytes',
+            fields={'offset': offset, 'length': len(data)}
+        )
+
+    return value
+
+
+def _pack_value(value, out):
+    """Append a MessagePack encoded value to a buffer.
+
+    Checks are ordered by a frequency of value types in packed data types.
+
+    :raises: TypeError
+    """
+    # pylint: disable=R0912
+    if isinstance(value, (list, tuple)):
+        _pack_header(len(value), out, 0x90, 16, None, b'\xdc', b'\xdd')
+
+        for item in value:
+            _pack_value(item, out)
+
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        _pack_header(len(data), out, 0xa0, 32, b'\xd9', b'\xda', b'\xdb')
+        out += data
+
+    elif value is True:
+        out.append(0xc3)
+
+    elif value is False:
+        out.append(0xc2)
+
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        else:
+            _pack_int(value, out)
+
+    elif isinstance(value, (bytes, bytearray)):
+        _pack_header(len(value), out, None, 0, b'\xc4', b'\xc5', b'\xc6')
+        out += value
+
+    elif value is None:
+        out.append(0xc0)
+
+    elif isinstance(value, dict):
+        _pack_header(len(value), out, 0x80, 16, None, b'\xde', b'\xdf')
+
+        for key, item in value.items():
+            _pack_value(key, out)
+            _pack_value(item, out)
+
+    elif isinstance(value, float):
+        out += b'\xcb'
+        out += _FLOAT64.pack(value)
+
+    else:
+        raise TypeError('Cannot serialize %r object' % value.__class__)
+
+
+def _pack_header(length, out, fix, fix_limit, type8, type16, type32):
+    """Append a smallest header of a sized value to a buffer."""
+    if length < fix_limit:
+        out.append(fix | length)
+
+    elif type8 is not None and length < 0x100:
+        out += type8
+        out.append(length)
+
+    elif length < 0x10000:
+        out += type16
+        out += _UINT16.pack(length)
+
+    elif length < 0x100000000:
+        out += type32
+        out += _UINT32.pack(length)
+
+    else:
+        raise TypeError('Cannot serialize a value of length %i' % length)
+
+
+def _pack_int(value, out):
+    """Append a smallest representation of an integer to a buffer."""
+    if -0x20 <= value < 0:
+        out += _INT8.pack(value)
+        return
+
+    if value >= 0:
+        packers = (
+            (b'\xcc', _UINT8, 0x100),
+            (b'\xcd', _UINT16, 0x10000),
+            (b'\xce', _UINT32, 0x100000000),
+            (b'\xcf', _UINT64, 0x10000000000000000)
+        )
+
+    else:
+        packers = (
+            (b'\xd0', _INT8, 0x80),
+            (b'\xd1', _INT16, 0x8000),
+            (b'\xd2', _INT32, 0x80000000),
+            (b'\xd3', _INT64, 0x8000000000000000)
+        )
+
+    for prefix, packer, limit in packers:
+        if -limit <= value < limit:
+            out += prefix
+            out += packer.pack(value)
+            return
+
+    raise TypeError('Cannot serialize an integer %i' % value)
+
+
+# Fixed size values by their type byte as (struct, size) pairs
+_FIXED = {
+    0xca: (_FLOAT32, 4),
+    0xcb: (_FLOAT64, 8),
+    0xcc: (_UINT8, 1),
+    0xcd: (_UINT16, 2),
+    0xce: (_UINT32, 4),
+    0xcf: (_UINT64, 8),
+    0xd0: (_INT8, 1),
+    0xd1: (_INT16, 2),
+    0xd2: (_INT32, 4),
+    0xd3: (_INT64, 8)
+}
+
+# Sized values by their type byte as (kind, length struct, length size)
+_SIZED = {
+    0xc4: ('bin', _UINT8, 1),
+    0xc5: ('bin', _UINT16, 2),
+    0xc6: ('bin', _UINT32, 4),
+    0xd9: ('str', _UINT8, 1),
+    0xda: ('str', _UINT16, 2),
+    0xdb: ('str', _UINT32, 4),
+    0xdc: ('array', _UINT16, 2),
+    0xdd: ('array', _UINT32, 4),
+    0xde: ('map', _UINT16, 2),
+    0xdf: ('map', _UINT32, 4)
+}
+
+
+def _unpack_value(data, offset):
+    """Decode a value at an offset and return it with a next offset.
+
+    :raises: IndexError, TypeError, ValueError, struct.error,
+             UnicodeDecodeError
+    """
+    # pylint: disable=R0911,R0912
+    byte = data[offset]
+    offset += 1
+
+    if byte < 0x80:
+        return byte, offset
+
+    if byte >= 0xe0:
+        return byte - 0x100, offset
+
+    if 0x90 <= byte < 0xa0:
+        values = []
+
+        for _ in range(byte & 0x0f):
+            value, offset = _unpack_value(data, offset)
+            values.append(value)
+
+        return values, offset
+
+    if 0xa0 <= byte < 0xc0:
+        return _unpack_str(data, offset, byte & 0x1f)
+
+    if byte < 0x90:
+        return _unpack_map(data, offset, byte & 0x0f)
+
+    if byte == 0xc0:
+        return None, offset
+
+    if byte == 0xc2:
+        return False, offset
+
+    if byte == 0xc3:
+        return True, offset
+
+    try:
+        unpacker, size = _FIXED[byte]
+        return unpacker.unpack_from(data, offset)[0], offset + size
+
+    except KeyError:
+        pass
+
+    try:
+        kind, unpacker, size = _SIZED[byte]
+
+    except KeyError:
+        raise LazyValueError(
+            'Failed to decode an unsupported MessagePack type',
+            fields={'type': byte, 'offset': offset - 1}
+        )
+
+    length = unpacker.unpack_from(data, offset)[0]
+    offset += size
+
+    if kind == 'bin':
+        return _unpack_bytes(data, offset, length)
+
+    if kind == 'str':
+        return _unpack_str(data, offset, length)
+
+    if kind == 'array':
+        return _unpack_array(data, offset, length)
+
+    return _unpack_map(data, offset, length)
+
+
+def _unpack_bytes(data, offset, length):
+    """Decode binary data of a given length."""
+    end = offset + length
+
+    if end > len(data):
+        raise IndexError('Binary data is truncated')
+
+    return bytes(data[offset:end]), end
+
+
+def _unpack_str(data, offset, length):
+    """Decode a string of a given length in bytes."""
+    end = offset + length
+
+    if end > len(data):
+        raise IndexError('String is truncated')
+
+    return str(data[offset:end], 'utf-8'), end
+
+
+def _unpack_array(data, offset, length):
+    """Decode an array of a given number of items."""
+    values = []
+
+    for _ in range(length):
+        value, offset = _unpack_value(data, offset)
+        values.append(value)
+
+    return values, offset
+
+
+def _unpack_map(data, offset, length):
+    """Decode a map of a given number of items."""
+    values = {}
+
+    for _ in range(length):
+        key, offset = _unpack_value(data, offset)
+        values[key], offset = _unpack_value(data, offset)
+
+    return values, offset
@@ -0,0 +1,696 @@
+"""Response envelope decoder and encoder.
+
+API responses are envelopes of a form `[record, reference-table]` where a
+record is a data type dictionary and a reference table is a dictionary of
+string reference IDs mapping to data type dictionaries which are referred to
+from records. Bulk exports are a JSON list of such envelopes.
+
+Decoder reads a document chunk by chunk, registers reference table entries
+into a referencer as soon as they are parsed and all objects they refer to
+are registered, and yields data type instances of records once their
+reference table is loaded. Only a single envelope
+record and a single read chunk are held in memory at a time.
+
+Encoder does the reverse. It writes records in the same envelope form and
+emits every shared object (e.g. a network prefix referred to from many IP
+addresses) only once per document, in a reference table of a first record
+which refers to it. Objects are emitted before objects which refer to them,
+so documents are loaded by the decoder without parking any entries.
+"""
+import codecs
+import json
+
+from zeroguard.errors.builtin import LazyValueError
+from zeroguard.errors.client import ZGClientError, ZGSanityCheckFailed
+from zeroguard.referencer import DictReferencer
+from zeroguard.types import KNOWN_TYPES
+from zeroguard.types.meta import dereference_graph
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+JSON_WHITESPACE = ' \t\n\r'
+
+
+def iter_decode(source, referencer=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Decode data type instances from a stream of response envelopes.
+
+    :param source:     File-like object with a `read` method (e.g. a file or
+                       a socket file) or an iterable of chunks. Both text and
+                       UTF-8 encoded binary data is supported.
+    :param referencer: Referencer to register reference table entries into.
+                       A new dictionary referencer is used if not set.
+    :param chunk_size: Number of bytes (or characters) to read at once.
+
+    :type referencer: zeroguard.referencer.ReferencerMeta child
+    :type chunk_size: int
+
+    :return: Generator of data type instances of envelope records.
+    :rtype:  generator(zeroguard.types.meta.DataTypeMeta)
+
+    :raises: ValueError
+    """
+    if referencer is None:
+        referencer = DictReferencer()
+
+    stream = _JSONStream(source, chunk_size)
+
+    stream.expect('[')
+
+    # A single envelope starts with a record and a list of envelopes starts
+    # with an envelope
+    first = stream.peek()
+
+    if first == '{':
+        yield from _decode_envelope_body(stream, referencer)
+
+    elif first == '[':
+        while True:
+            stream.expect('[')
+            yield from _decode_envelope_body(stream, referencer)
+
+            if stream.expect(',]') == ']':
+                break
+
+    else:
+        stream.expect(']')
+
+    if stream.peek():
+        raise stream.error('Unexpected data after a document end')
+
+
+def _decode_envelope_body(stream, referencer):
+    """Decode an envelope after its opening bracket."""
+    record = stream.object()
+
+    stream.expect(',')
+    stream.expect('{')
+
+    loader = ReferenceTableLoader(referencer)
+
+    if stream.peek() == '}':
+        stream.expect('}')
+
+    else:
+        while True:
+            ref_id = stream.string()
+            stream.expect(':')
+            data = stream.object()
+
+            try:
+                loader.add(ref_id, data)
+
+            except ValueError as err:
+                raise stream.error('Bad reference table entry', err, data)
+
+            if stream.expect(',}') == '}':
+                break
+
+    stream.expect(']')
+
+    try:
+        loader.finish()
+
+    except (ValueError, ZGClientError) as err:
+        raise stream.error('Bad reference table', err)
+
+    yield _from_dict(stream, record, referencer)
+
+
+def _from_dict(stream, data, referencer):
+    """Create a data type instance of a record.
+
+    :raises: ValueError
+    """
+    try:
+        return _create_instance(data, referencer)
+
+    except ValueError as err:
+        raise stream.error('Bad envelope record', err, data)
+
+
+def _create_instance(data, referencer):
+    """Create a data type instance from a dictionary.
+
+    :raises: ValueError
+    """
+    try:
+        data_type = KNOWN_TYPES[data['type']]
+
+    except (KeyError, TypeError) as err:
+        raise LazyValueError(
+            'Failed to create a data type instance of an unknown type',
+            error=err,
+            fields={'data': data}
+        )
+
+    return data_type.from_dict(data, referencer)
+
+
+def _iter_dependencies(data):
+    """Yield reference IDs a data type dictionary refers to."""
+    if isinstance(data, dict):
+        ref_id = data.get('_ref')
+
+        if ref_id is not None:
+            yield ref_id
+
+        for value in data.values():
+            yield from _iter_dependencies(value)
+
+    elif isinstance(data, list):
+        for value in data:
+            yield from _iter_dependencies(value)
+
+
+class ReferenceTableLoader:
+    """Loader of reference table entries in a dependency order.
+
+    Reference table entries may refer to other entries of the same table
+    (e.g. IPv4 addresses refer to network prefixes). An entry is created as
+    soon as all of its dependencies are registered in a referencer and is
+    parked until then, so every reference is resolved in place and no data
+    reference is left to be resolved lazily.
+
+    Entries are added one by one (as they arrive from a stream) and `finish`
+    is called after a last one. Entries which cannot be created at that point
+    either depend on objects which are not known at all or are a part of
+    (or depend on) a dependency cycle.
+    """
+
+    def __init__(self, referencer, strict=True):
+        """.
+
+        :param referencer: Referencer to register created objects into.
+        :param strict:     Raise if an entry refers to an object which is
+                           neither in a table nor in a referencer. Otherwise
+                           such references are left to be dereferenced
+                           lazily.
+
+        :type referencer: zeroguard.referencer.ReferencerMeta child
+        :type strict:     bool
+        """
+        self.referencer = referencer
+        self.strict = strict
+
+        # Parked entries with their unmet dependencies and reverse mapping of
+        # a dependency to reference IDs of entries waiting for it
+        self._parked = {}
+        self._waiting = {}
+
+        self._loaded = {}
+
+    def add(self, ref_id, data):
+        """Add a reference table entry.
+
+        An entry which is already referenced is skipped, as reference IDs are
+        stable and a repeated entry refers to the same object.
+
+        :raises: ValueError
+        """
+        try:
+            ref_id = int(ref_id)
+
+        except (TypeError, ValueError) as err:
+            raise LazyValueError(
+                'Failed to load a reference table entry with a bad ID',
+                error=err,
+                fields={'ref_id': ref_id}
+            )
+
+        if ref_id in self._parked or self._is_loaded(ref_id):
+            return
+
+        unmet = {
+            dependency for dependency in _iter_dependencies(data)
+            if not self._is_loaded(dependency)
+        }
+
+        if ref_id in unmet:
+            raise LazyValueError(
+                'Failed to load a reference table entry referring to itself',
+                fields={'ref_id': ref_id, 'data': data}
+            )
+
+        if not unmet:
+            self._load(ref_id, data)
+            return
+
+        self._parked[ref_id] = (data, unmet)
+
+        for dependency in unmet:
+            self._waiting.setdefault(dependency, []).append(ref_id)
+
+    def finish(self):
+        """Create all remaining entries and dereference all loaded objects.
+
+        :return: Mapping of reference IDs to all objects created by this
+                 loader.
+        :rtype:  dict
+
+        :raises: ValueError, zeroguard.errors.client.ZGClientError
+        """
+        unknown = sorted(set(self._waiting).difference(self._parked))
+
+        if unknown and self.strict:
+            raise LazyValueError(
+                'Failed to load a reference table with unknown references',
+                fields={'ref_ids': unknown}
+            )
+
+        for dependency in unknown:
+            self._release(dependency)
+
+        if self._parked:
+            raise LazyValueError(
+                'Failed to load a reference table with a dependency cycle',
+                fields={'ref_ids': sorted(self._parked)}
+            )
+
+        dereference_graph(
+            self._loaded.values(),
+            self.referencer,
+            strict=self.strict
+        )
+
+        loaded = self._loaded
+
+        self._waiting = {}
+        self._loaded = {}
+
+        return loaded
+
+    def _is_loaded(self, ref_id):
+        """Check whether a referencer holds a given reference ID."""
+        if ref_id in self._loaded:
+            return True
+
+        try:
+            self.referencer[ref_id]
+
+        except KeyError:
+            return False
+
+        return True
+
+    def _load(self, ref_id, data):
+        """Create an entry and all entries which were waiting only for it."""
+        ready = [(ref_id, data)]
+
+        while ready:
+            ref_id, data = ready.pop()
+
+            instance = _create_instance(data, self.referencer)
+
+            try:
+                self.referencer[ref_id] = instance
+
+            # Another response sharing a referencer registered it first
+            except ZGSanityCheckFailed as err:
+                try:
+                    instance = self.referencer[ref_id]
+
+                except KeyError:
+                    raise err
+
+            self._loaded[ref_id] = instance
+
+            ready.extend(self._release(ref_id))
+
+    def _release(self, dependency):
+        """Mark a dependency as met and return entries which became ready."""
+        ready = []
+
+        for ref_id in self._waiting.pop(dependency, ()):
+            data, unmet = self._parked[ref_id]
+            unmet.discard(dependency)
+
+            if not unmet:
+                del self._parked[ref_id]
+                ready.append((ref_id, data))
+
+        # Entries waiting only for unknown references are created right away
+        if dependency not in self._loaded:
+            for ref_id, data in ready:
+                self._load(ref_id, data)
+
+            return []
+
+        return ready
+
+
+def load_reference_table(table, referencer=None, strict=True):
+    """Load all entries of a reference table in a dependency order.
+
+    :param table:      Reference table dictionary of string reference IDs
+                       mapping to data type dictionaries.
+    :param referencer: Referencer to register created objects into. A new
+                       dictionary referencer is used if not set.
+    :param strict:     Same as in `ReferenceTableLoader`.
+
+    :return: Mapping of reference IDs to created objects.
+    :rtype:  dict
+
+    :raises: ValueError, zeroguard.errors.client.ZGClientError
+    """
+    loader = ReferenceTableLoader(
+        DictReferencer() if referencer is None else referencer,
+        strict=strict
+    )
+
+    for ref_id, data in table.items():
+        loader.add(ref_id, data)
+
+    return loader.finish()
+
+
+def iter_encode(instances, referencer=None, strict=True):
+    """Encode data type instances as a JSON list of response envelopes.
+
+    Referenced objects keep their reference IDs if a referencer holds them
+    and get new unused reference IDs otherwise.
+
+    :param instances:  Iterable of data type instances to encode as records.
+    :param referencer: Referencer holding referenced objects. A new
+                       dictionary referencer is used if not set.
+    :param strict:     Raise if a record refers to an object which is not
+                       known to a referencer. Otherwise such references are
+                       written without a reference table entry.
+
+    :type instances:  iterable(zeroguard.types.meta.DataTypeMeta)
+    :type referencer: zeroguard.referencer.ReferencerMeta child
+    :type strict:     bool
+
+    :return: Generator of JSON document chunks, one per envelope.
+    :rtype:  generator(str)
+
+    :raises: zeroguard.errors.client.ZGClientError
+    """
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    references = _ReferenceAllocator(
+        DictReferencer() if referencer is None else referencer
+    )
+
+    # Reference IDs of objects which were already written to a document
+    emitted = set()
+    separator = '['
+
+    for instance in instances:
+        record = instance.to_ref_dict(references.ref_of)
+        table = {}
+
+        for ref_id in _iter_dependencies(record):
+            _encode_reference(ref_id, references, emitted, table, strict)
+
+        yield '%s[%s,%s]' % (separator, encode(record), encode(table))
+        separator = ','
+
+    yield '[]' if separator == '[' else ']'
+
+
+def dump(instances, fp, referencer=None, strict=True):
+    """Write data type instances as a JSON list of response envelopes.
+
+    :param instances: Iterable of data type instances to encode as records.
+    :param fp:        File-like object with a `write` method. Both text and
+                      binary files are supported (binary files are written
+                      UTF-8 encoded data).
+
+    Other arguments are the same as of `iter_encode` function.
+
+    :raises: zeroguard.errors.client.ZGClientError
+    """
+    write = fp.write
+
+    for chunk in iter_encode(instances, referencer, strict):
+        try:
+            write(chunk)
+
+        except TypeError:
+            write = _binary_writer(fp)
+            write(chunk)
+
+
+def _binary_writer(fp):
+    """Return a function which writes text chunks into a binary file."""
+    def write(chunk):
+        fp.write(chunk.encode('utf-8'))
+
+    return write
+
+
+def _encode_reference(ref_id, references, emitted, table, strict):
+    """Add a referenced object and its dependencies to a reference table.
+
+    Dependencies are added first. Already emitted objects are skipped.
+
+    :raises: zeroguard.errors.client.ZGClientError
+    """
+    if ref_id in emitted:
+        return
+
+    # Marked before dependencies are walked so cycles terminate
+    emitted.add(ref_id)
+
+    try:
+        instance = references[ref_id]
+
+    except KeyError as err:
+        if not strict:
+            return
+
+        raise ZGClientError(
+            error=err,
+            message='Failed to find a referenced object during encoding',
+            context={'reference_id': ref_id}
+        )
+
+    data = instance.to_ref_dict(references.ref_of)
+
+    for dependency in _iter_dependencies(data):
+        _encode_reference(dependency, references, emitted, table, strict)
+
+    table[str(ref_id)] = data
+
+
+class _ReferenceAllocator:
+    """Reference ID lookup and allocation for encoded objects.
+
+    Objects are looked up by their identity. Objects which a referencer does
+    not hold get new reference IDs above all IDs already in use. Those are
+    kept only by an allocator and are never added to a referencer.
+    """
+
+    def __init__(self, referencer):
+        """."""
+        self.referencer = referencer
+
+        self._ref_ids = {}
+        self._instances = {}
+        self._next_ref_id = None
+
+        # Plain dictionaries cannot look up reference IDs on their own
+        self._referencer_ref_ids = None
+
+    def __getitem__(self, ref_id):
+        """Return a referenced object by its reference ID.
+
+        :raises: KeyError
+        """
+        try:
+            return self._instances[ref_id]
+
+        except KeyError:
+            return self.referencer[ref_id]
+
+    def ref_of(self, instance):
+        """Return a reference ID of an instance allocating it if needed."""
+        try:
+            return self._ref_ids[id(instance)]
+
+        except KeyError:
+            pass
+
+        try:
+            ref_id = self._lookup(instance)
+
+        except KeyError:
+            ref_id = self._allocate()
+
+        # Instances are kept alive so their identities are never reused
+        self._ref_ids[id(instance)] = ref_id
+        self._instances[ref_id] = instance
+
+        return ref_id
+
+    def _allocate(self):
+        """Return a next reference ID which is not used by a referencer."""
+        if self._next_ref_id is None:
+            self._next_ref_id = max(
+                (r for r in self.referencer if isinstance(r, int)),
+                default=-1
+            ) + 1
+
+        ref_id = self._next_ref_id
+        self._next_ref_id += 1
+
+        return ref_id
+
+    def _lookup(self, instance):
+        """Return a reference ID under which a referencer holds an instance.
+
+        :raises: KeyError
+        """
+        try:
+            return self.referencer.ref_of(instance)
+
+        except AttributeError:
+            pass
+
+        if self._referencer_ref_ids is None:
+            self._referencer_ref_ids = {
+                id(v): r for r, v in reversed(list(self.referencer.items()))
+            }
+
+        return self._referencer_ref_ids[id(instance)]
+
+
+def _read_chunks(source, chunk_size):
+    """Yield chunks read from a file-like object until it is exhausted."""
+    while True:
+        chunk = source.read(chunk_size)
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+class _JSONStream:
+    """Incremental reader of JSON tokens from a chunked source."""
+
+    def __init__(self, source, chunk_size):
+        """."""
+        self._chunks = (
+            _read_chunks(source, chunk_size)
+            if hasattr(source, 'read') else iter(source)
+        )
+
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._chunk_size = chunk_size
+        self._eof = False
+
+        # Number of characters dropped from a buffer start for error messages
+        self._offset = 0
+
+        self.buffer = ''
+        self.pos = 0
+
+    def error(self, message, error=None, data=None):
+        """Create an exception for a malformed document."""
+        fields = {'position': self._offset + self.pos}
+
+        if data is not None:
+            fields['data'] = data
+
+        return LazyValueError(
+            'Failed to decode a response envelope: %s' % message,
+            error=error,
+            fields=fields
+        )
+
+    def expect(self, chars):
+        """Consume one of given structural characters and return it.
+
+        :raises: ValueError
+        """
+        char = self.peek()
+
+        if not char or char not in chars:
+            raise self.error('Expected one of "%s", got "%s"' % (chars, char))
+
+        self.pos += 1
+        return char
+
+    def fill(self):
+        """Read a next chunk into a buffer.
+
+        :return: False if a source is exhausted.
+        """
+        # Drop already consumed data before growing a buffer
+        if self.pos >= self._chunk_size:
+            self.buffer = self.buffer[self.pos:]
+            self._offset += self.pos
+            self.pos = 0
+
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+
+            # Skip empty chunks and incomplete multi-byte sequences
+            if chunk:
+                self.buffer += chunk
+                return True
+
+        if not self._eof:
+            self._eof = True
+            self.buffer += self._decoder.decode(b'', final=True)
+
+        return False
+
+    def object(self):
+        """Decode a next JSON object.
+
+        :raises: ValueError
+        """
+        if self.peek() != '{':
+            raise self.error('Expected an object')
+
+        return self._value()
+
+    def peek(self):
+        """Return a next non-whitespace character or an empty string."""
+        self.skip_whitespace()
+        return self.buffer[self.pos:self.pos + 1]
+
+    def skip_whitespace(self):
+        """Move a position to a next non-whitespace character."""
+        while True:
+            while (
+                    self.pos < len(self.buffer) and
+                    self.buffer[self.pos] in JSON_WHITESPACE
+            ):
+                self.pos += 1
+
+            if self.pos < len(self.buffer) or not self.fill():
+                return
+
+    def string(self):
+        """Decode a next JSON string.
+
+        :raises: ValueError
+        """
+        if self.peek() != '"':
+            raise self.error('Expected a string')
+
+        return self._value()
+
+    def _value(self):
+        """Decode a next JSON object or string reading as much as needed.
+
+        Objects and strings end with a closing character, so a successful
+        decode of a buffer prefix is never a truncated value.
+        """
+        while True:
+            try:
+                value, self.pos = self._json_decoder.raw_decode(
+                    self.buffer,
+                    self.pos
+                )
+
+                return value
+
+            except json.JSONDecodeError as err:
+                if not self.fill():
+                    raise self.error('Malformed JSON value', err)
@@ -0,0 +1,19 @@
+"""Built-in error classes with lazily rendered messages.
+
+These are raised instead of their built-in base classes where rendering a
+message may cost more than a failed operation itself (e.g. by validators of
+dirty data). See `zeroguard.errors.meta.LazyErrorMeta`.
+"""
+from zeroguard.errors.meta import LazyErrorMeta
+
+
+class LazyRuntimeError(LazyErrorMeta, RuntimeError):
+    """."""
+
+
+class LazyTypeError(LazyErrorMeta, TypeError):
+    """."""
+
+
+class LazyValueError(LazyErrorMeta, ValueError):
+    """."""
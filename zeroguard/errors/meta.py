@@ -1,11 +1,50 @@
 """Abstract error base classes."""
 from abc import ABC
 
-from zeroguard.utils.log import check_printable, format_logmsg
+from zeroguard.utils.log import (
+    LazyLogMessage,
+    check_printable,
+    format_logmsg
+)
+
+
+class LazyErrorMeta(Exception, ABC):
+    """Base abstract class for errors with lazily rendered messages.
+
+    An only argument of an error is a plain message, so `args[0]` is a
+    string, while fields and an original error (including its trace) are
+    formatted only when an error is converted to a string. An original error
+    is kept without its traceback (see `LazyLogMessage`).
+    """
+
+    def __init__(self, message, fields=None, error=None, trace=True):
+        """.
+
+        Arguments are the same as of `zeroguard.utils.log.format_logmsg`.
+        """
+        super().__init__(message)
+
+        self.logmsg = LazyLogMessage(
+            message,
+            fields=fields,
+            error=error,
+            trace=trace
+        )
+
+    def __str__(self):
+        """."""
+        return str(self.logmsg)
 
 
 class ZGErrorMeta(Exception, ABC):
-    """Base abstract class for ZeroGuard SDK errors."""
+    """Base abstract class for ZeroGuard SDK errors.
+
+    Errors only keep references to their message, context and an original
+    error. All of them (including an original error trace) are formatted
+    when an error is converted to a string, so raising and handling an error
+    costs no formatting. Messages can be lazy log messages as well, in which
+    case `args[0]` is a plain message without fields.
+    """
 
     NAME = None
     DESC = None
@@ -18,7 +57,9 @@ class ZGErrorMeta(Exception, ABC):
         self.context = context
         self.message = message
 
-        super().__init__(self.message)
+        super().__init__(
+            message.text if isinstance(message, LazyLogMessage) else message
+        )
 
     def __str__(self, as_tuple=False):
         """."""
@@ -35,10 +76,10 @@ class ZGErrorMeta(Exception, ABC):
         #if check_printable(self.context):
         fields['error_context'] = self.context
 
-        return message, fields if as_tuple else format_logmsg(
-            message,
-            fields=fields
-        )
+        if as_tuple:
+            return message, fields
+
+        return format_logmsg(message, fields=fields)
 
     @property
     def name(self):
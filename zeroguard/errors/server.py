@@ -60,3 +60,56 @@ class ZGProcessingTimeout(ZGServerError):
 
     NAME = 'processing_timeout'
     DESC = 'Request processing took too long'
+
+
+# Server-side errors by their names as returned by the API
+KNOWN_ERRORS = {
+    error.NAME: error for error in (
+        ZGBadRequest,
+        ZGEmptyResult,
+        ZGInternalServerError,
+        ZGMethodNotAllowed,
+        ZGNoSuchEndpoint,
+        ZGRateLimitExceeded,
+        ZGProcessingTimeout
+    )
+}
+
+# Server-side errors assumed from HTTP status codes of responses without an
+# error name
+STATUS_CODE_ERRORS = {
+    400: ZGBadRequest,
+    404: ZGNoSuchEndpoint,
+    405: ZGMethodNotAllowed,
+    429: ZGRateLimitExceeded,
+    500: ZGInternalServerError,
+    504: ZGProcessingTimeout
+}
+
+
+def get_server_error(status_code, name=None, message=None, query=None):
+    """Create a server-side error of a failed API response.
+
+    An error class is chosen by an error name if it is known and by an HTTP
+    status code otherwise. Errors of unknown names keep a received name.
+
+    :param status_code: HTTP status code of a response.
+    :param name:        Error name returned by the API.
+    :param message:     Error message returned by the API.
+    :param query:       Query parameters of a failed request.
+
+    :type status_code: int
+    :type name:        str
+    :type message:     str
+    :type query:       dict
+
+    :rtype: zeroguard.errors.server.ZGServerError
+    """
+    try:
+        return KNOWN_ERRORS[name](status_code, query=query, message=message)
+
+    except KeyError:
+        pass
+
+    error = STATUS_CODE_ERRORS.get(status_code, ZGServerError)
+    return error(status_code, query=query, message=message, name=name)
@@ -0,0 +1,298 @@
+"""Network prefix index.
+
+Prefix index keeps network prefix data type instances in a path-compressed
+binary (Patricia) trie per IP version and answers longest-prefix and
+all-covering-prefix queries for IP addresses. A lookup walks at most one trie
+node per stored prefix on a path, which is bounded by a prefix length.
+"""
+import ipaddress
+
+from zeroguard.errors.builtin import LazyValueError
+from zeroguard.errors.client import ZGSanityCheckFailed
+from zeroguard.types.ip_address import IPv4Address, IPv6Address
+from zeroguard.types.network_prefix import NetworkPrefix
+
+ADDRESS_BITS = {4: 32, 6: 128}
+
+
+class _PrefixNode:
+    """Patricia trie node.
+
+    A node without a value is a glue node which only exists to branch on the
+    first bit in which its two children differ.
+    """
+
+    __slots__ = ('network', 'length', 'value', 'children')
+
+    def __init__(self, network, length, value=None):
+        """."""
+        self.network = network
+        self.length = length
+        self.value = value
+        self.children = [None, None]
+
+
+class PrefixIndex:
+    """Longest-prefix match index of network prefix data type instances."""
+
+    def __init__(self, prefixes=None):
+        """.
+
+        :param prefixes: Network prefix data type instances to index.
+        :type prefixes:  iterable(zeroguard.types.NetworkPrefix)
+        """
+        self._roots = {
+            version: _PrefixNode(0, 0) for version in ADDRESS_BITS
+        }
+
+        self._len = 0
+
+        for prefix in prefixes if prefixes else ():
+            self.add(prefix)
+
+    def __len__(self):
+        """Return a total number of indexed network prefixes."""
+        return self._len
+
+    def __iter__(self):
+        """Return iterator over all indexed network prefixes."""
+        for root in self._roots.values():
+            stack = [root]
+
+            while stack:
+                node = stack.pop()
+
+                if node.value is not None:
+                    yield node.value
+
+                stack.extend(c for c in reversed(node.children) if c)
+
+    @classmethod
+    def from_referencer(cls, referencer):
+        """Create an index from all network prefixes held in a referencer.
+
+        :type referencer: zeroguard.referencer.ReferencerMeta child
+        """
+        return cls(
+            instance for _, instance in referencer.items()
+            if isinstance(instance, NetworkPrefix)
+        )
+
+    def add(self, prefix):
+        """Add a network prefix to the index.
+
+        A prefix which is equal to an already indexed one replaces it.
+
+        :type prefix: zeroguard.types.NetworkPrefix
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        if not isinstance(prefix, NetworkPrefix):
+            raise ZGSanityCheckFailed(
+                message='Only network prefixes can be indexed',
+                context={'instance_type': type(prefix), 'instance': prefix}
+            )
+
+        network = prefix.prefix
+        bits = ADDRESS_BITS[network.version]
+
+        net = int(network.network_address)
+        length = network.prefixlen
+
+        node = self._roots[network.version]
+
+        while True:
+            if node.length == length:
+                if node.value is None:
+                    self._len += 1
+
+                node.value = prefix
+                return
+
+            # Node is always a strict prefix of a network being inserted here
+            bit = (net >> (bits - node.length - 1)) & 1
+            child = node.children[bit]
+
+            if child is None:
+                node.children[bit] = _PrefixNode(net, length, prefix)
+                self._len += 1
+                return
+
+            common = _common_length(
+                child.network,
+                net,
+                bits,
+                min(child.length, length)
+            )
+
+            if common == child.length:
+                node = child
+                continue
+
+            new_node = _PrefixNode(net, length, prefix)
+            self._len += 1
+
+            # New network is a parent of an existing child node
+            if common == length:
+                new_node.children[
+                    (child.network >> (bits - length - 1)) & 1
+                ] = child
+
+                node.children[bit] = new_node
+                return
+
+            # Networks diverge so a glue node has to be inserted
+            glue_node = _PrefixNode(
+                net >> (bits - common) << (bits - common),
+                common
+            )
+
+            child_bit = (child.network >> (bits - common - 1)) & 1
+            glue_node.children[child_bit] = child
+            glue_node.children[child_bit ^ 1] = new_node
+
+            node.children[bit] = glue_node
+            return
+
+    def longest_prefix(self, address):
+        """Return the most specific indexed prefix containing an address.
+
+        :param address: IP address as a string, integer, ipaddress module
+                        object or IP address data type instance.
+
+        :return: Matching network prefix or None if nothing matches.
+        :rtype:  zeroguard.types.NetworkPrefix | None
+
+        :raises: ValueError
+        """
+        version, value = _address_to_int(address)
+        return self._longest_prefix(version, value)
+
+    def covering_prefixes(self, address):
+        """Return all indexed prefixes containing an address.
+
+        Prefixes are ordered from the most specific to the least specific one
+        which is the same order in which API returns prefixes of an address.
+
+        :rtype: list(zeroguard.types.NetworkPrefix)
+
+        :raises: ValueError
+        """
+        version, value = _address_to_int(address)
+        return self._covering_prefixes(version, value)
+
+    def longest_prefixes(self, addresses, version=None):
+        """Return the most specific indexed prefix for each given address.
+
+        :param addresses: Iterable of IP addresses in any format supported by
+                          `longest_prefix` method.
+        :param version:   If set, all addresses are assumed to be integers of
+                          this IP version (i.e. a packed array of addresses)
+                          which skips per-address type detection.
+
+        :rtype: list(zeroguard.types.NetworkPrefix | None)
+
+        :raises: ValueError
+        """
+        lookup = self._longest_prefix
+
+        if version:
+            return [lookup(version, a) for a in addresses]
+
+        return [lookup(*_address_to_int(a)) for a in addresses]
+
+    def covering_prefixes_many(self, addresses, version=None):
+        """Return all indexed prefixes for each given address.
+
+        Arguments are the same as in `longest_prefixes` method.
+
+        :rtype: list(list(zeroguard.types.NetworkPrefix))
+
+        :raises: ValueError
+        """
+        lookup = self._covering_prefixes
+
+        if version:
+            return [lookup(version, a) for a in addresses]
+
+        return [lookup(*_address_to_int(a)) for a in addresses]
+
+    def _longest_prefix(self, version, value):
+        """Find the most specific prefix for an integer address."""
+        bits = ADDRESS_BITS[version]
+        node = self._roots[version]
+        best = None
+
+        while node is not None:
+            shift = bits - node.length
+
+            if (value ^ node.network) >> shift:
+                break
+
+            if node.value is not None:
+                best = node.value
+
+            if not shift:
+                break
+
+            node = node.children[(value >> (shift - 1)) & 1]
+
+        return best
+
+    def _covering_prefixes(self, version, value):
+        """Find all prefixes for an integer address."""
+        bits = ADDRESS_BITS[version]
+        node = self._roots[version]
+        found = []
+
+        while node is not None:
+            shift = bits - node.length
+
+            if (value ^ node.network) >> shift:
+                break
+
+            if node.value is not None:
+                found.append(node.value)
+
+            if not shift:
+                break
+
+            node = node.children[(value >> (shift - 1)) & 1]
+
+        found.reverse()
+        return found
+
+
+def _address_to_int(address):
+    """Convert an IP address to an IP version and an integer pair.
+
+    :raises: ValueError
+    """
+    if isinstance(address, (IPv4Address, IPv6Address)):
+        address = address.address
+
+    if not isinstance(
+            address,
+            (ipaddress.IPv4Address, ipaddress.IPv6Address)
+    ):
+        try:
+            address = ipaddress.ip_address(address)
+
+        except ValueError as err:
+            raise LazyValueError(
+                'Failed to look up a prefix for a bad IP address',
+                error=err,
+                fields={'address': address}
+            )
+
+    return address.version, int(address)
+
+
+def _common_length(first, second, bits, limit):
+    """Return a length of a common prefix of two integers capped by limit."""
+    diff = first ^ second
+
+    if not diff:
+        return limit
+
+    return min(bits - diff.bit_length(), limit)
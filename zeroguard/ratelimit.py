@@ -0,0 +1,272 @@
+"""Client-side API rate limiting.
+
+A rate limiter paces requests with a token bucket, so a client stays just
+under an API rate limit instead of triggering `ZGRateLimitExceeded` errors.
+A permitted rate is learned from API responses:
+
+* `X-RateLimit-Remaining` and `X-RateLimit-Reset` headers tell how many
+  requests are left until a limit window resets in a given number of
+  seconds. Remaining requests are spread evenly over a rest of a window.
+* A rate limit exceeded response pauses all requests for a `Retry-After`
+  number of seconds and halves a current rate (or a recently observed rate
+  of requests if no rate is known yet).
+
+A single rate limiter can be shared by any number of threads and asyncio
+tasks (and thus by synchronous and asynchronous clients). Every request
+reserves a token upfront and then waits for as long as the reservation
+requires, so waiters are served in order without polling.
+"""
+import asyncio
+import math
+import threading
+import time
+
+from zeroguard.errors.client import ZGSanityCheckFailed
+
+RATE_LIMIT_REMAINING_HEADER = 'X-RateLimit-Remaining'
+RATE_LIMIT_RESET_HEADER = 'X-RateLimit-Reset'
+RETRY_AFTER_HEADER = 'Retry-After'
+
+RATE_LIMIT_STATUS_CODE = 429
+
+# Share of a permitted rate which is actually used
+DEFAULT_MARGIN = 0.9
+
+# Rate multiplier applied when a rate limit is exceeded anyway
+DEFAULT_DECREASE = 0.5
+
+# Pause after a rate limit exceeded response without a Retry-After header
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class RateLimiter:
+    """Thread-safe token bucket rate limiter which learns a permitted rate.
+
+    A rate limiter without a rate does not limit requests at all until it
+    learns a rate from API responses or is paused by a rate limit exceeded
+    response.
+    """
+
+    def __init__(
+            self,
+            rate=None,
+            burst=None,
+            margin=DEFAULT_MARGIN,
+            decrease=DEFAULT_DECREASE
+    ):
+        """.
+
+        :param rate:     Initial number of requests per second.
+        :param burst:    Maximum number of requests which can be sent at once
+                         after a period of inactivity. Same as a rate (but at
+                         least one) if not set.
+        :param margin:   Share of a learned permitted rate to use.
+        :param decrease: Rate multiplier applied when a rate limit is
+                         exceeded.
+
+        :type rate:     float
+        :type burst:    int
+        :type margin:   float
+        :type decrease: float
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        for name, value in (('rate', rate), ('burst', burst)):
+            if value is not None and not value > 0:
+                raise ZGSanityCheckFailed(
+                    message='Rate limiter %s must be a positive number' % name,
+                    context={name: value}
+                )
+
+        self.burst = burst
+        self.margin = margin
+        self.decrease = decrease
+
+        self._rate = rate
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+        # Numbers of requests in a current and a previous one second window
+        self._window_start = self._updated
+        self._window_count = 0
+        self._last_window_count = 0
+
+        self._acquired = 0
+        self._delayed = 0
+        self._wait_time = 0.0
+        self._throttled = 0
+
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        """Return a current number of requests per second or None."""
+        return self._rate
+
+    @property
+    def stats(self):
+        """Return rate limiter metrics.
+
+        * `tokens` - Number of requests which can be sent right away.
+          Negative if requests are already waiting.
+        * `wait_time` - Total number of seconds requests were delayed for.
+        * `delayed` - Number of requests which were delayed.
+        * `throttled` - Number of rate limit exceeded responses.
+        * `paused_for` - Number of seconds until requests are resumed.
+
+        :rtype: dict
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            return {
+                'rate': self._rate,
+                'tokens': self._tokens,
+                'acquired': self._acquired,
+                'delayed': self._delayed,
+                'wait_time': self._wait_time,
+                'throttled': self._throttled,
+                'paused_for': max(self._paused_until - now, 0.0)
+            }
+
+    def acquire(self):
+        """Block a current thread until a request can be sent."""
+        delay = self.reserve()
+
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """Suspend a current task until a request can be sent."""
+        delay = self.reserve()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def reserve(self):
+        """Reserve a token for a single request.
+
+        :return: Number of seconds to wait before a request can be sent.
+        :rtype:  float
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            self._acquired += 1
+            self._count_request(now)
+
+            # Tokens are not refilled while requests are paused, so waiting
+            # requests are spread over time after a pause as well
+            delay = max(self._paused_until - now, 0.0)
+
+            if self._rate is not None:
+                self._tokens -= 1
+
+                if self._tokens < 0:
+                    delay += -self._tokens / self._rate
+
+            if delay > 0:
+                self._delayed += 1
+                self._wait_time += delay
+
+            return delay
+
+    def throttle(self, retry_after=None):
+        """Pause all requests after a rate limit was exceeded.
+
+        :param retry_after: Number of seconds to pause requests for.
+        :type retry_after:  float
+        """
+        if retry_after is None:
+            retry_after = DEFAULT_RETRY_AFTER
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            self._throttled += 1
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+            # A rate is estimated from recent requests if it is not known yet
+            rate = self._rate
+
+            if rate is None:
+                rate = max(self._window_count, self._last_window_count, 1)
+
+            self._set_rate(rate * self.decrease)
+            self._tokens = min(self._tokens, 0)
+
+    def update(self, status_code, headers):
+        """Learn a permitted rate from an API response.
+
+        :param status_code: HTTP status code of a response.
+        :param headers:     Response headers. Any mapping with a `get`
+                            method, which should be case insensitive.
+
+        :type status_code: int
+        """
+        if status_code == RATE_LIMIT_STATUS_CODE:
+            self.throttle(_parse_number(headers.get(RETRY_AFTER_HEADER)))
+
+        remaining = _parse_number(headers.get(RATE_LIMIT_REMAINING_HEADER))
+        reset = _parse_number(headers.get(RATE_LIMIT_RESET_HEADER))
+
+        if remaining is None or not reset:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if remaining < 1:
+                self._paused_until = max(self._paused_until, now + reset)
+            else:
+                self._set_rate(self.margin * remaining / reset)
+
+    @property
+    def _capacity(self):
+        """Return a maximum number of stored tokens."""
+        if self.burst is not None:
+            return self.burst
+
+        return max(self._rate or 1.0, 1.0)
+
+    def _count_request(self, now):
+        """Count a request in a one second window of a request rate."""
+        if now - self._window_start >= 1.0:
+            self._last_window_count = self._window_count
+            self._window_count = 0
+            self._window_start = now
+
+        self._window_count += 1
+
+    def _refill(self, now):
+        """Add tokens accumulated since a last refill outside of a pause."""
+        start = max(self._updated, self._paused_until)
+
+        if self._rate is not None and now > start:
+            self._tokens = min(
+                self._tokens + (now - start) * self._rate,
+                self._capacity
+            )
+
+        self._updated = now
+
+    def _set_rate(self, rate):
+        """Change a rate keeping already reserved tokens."""
+        self._rate = rate
+        self._tokens = min(self._tokens, self._capacity)
+
+
+def _parse_number(value):
+    """Parse a finite non-negative number of a header value or return None."""
+    try:
+        value = float(value)
+
+    except (TypeError, ValueError):
+        return None
+
+    return value if math.isfinite(value) and value >= 0 else None
@@ -5,14 +5,38 @@ throughout a whole user session (which may consist from one or multiple
 requests to the API).
 """
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import json
+import sqlite3
+import sys
+import threading
+import time
+import weakref
 
 from zeroguard.errors.client import ZGSanityCheckFailed
-from zeroguard.types.meta import DataTypeMeta
-from zeroguard.utils.log import format_logmsg, get_labeled_logger
+from zeroguard.types import KNOWN_TYPES
+from zeroguard.types.meta import DataTypeMeta, ReferenceInternTable
+from zeroguard.utils.log import LazyLogMessage, get_labeled_logger
+
+# Maximum number of reference IDs looked up with a single SQLite query. This
+# is kept well below the default SQLite host parameters limit.
+SQLITE_MAX_QUERY_PARAMS = 500
+
+# Lock of lazily created intern tables of referencers which do not call a
+# parent constructor
+_REFERENCE_TABLE_LOCK = threading.Lock()
 
 
 class ReferencerMeta(ABC):
-    """Abstract interface for storing and searching referenced objects."""
+    """Abstract interface for storing and searching referenced objects.
+
+    Implementations should call this constructor, which creates a table of
+    interned data references shared by all threads using a referencer.
+    """
+
+    def __init__(self):
+        """."""
+        self._reference_table = ReferenceInternTable()
 
     @abstractmethod
     def __delitem__(self, ref):
@@ -41,6 +65,88 @@ class ReferencerMeta(ABC):
     def items(self):
         """Return a list of tuples of all ref-object pairs."""
 
+    def get_many(self, refs):
+        """Get many referenced objects at once.
+
+        This default implementation looks reference IDs up one by one.
+        Implementations are free to provide a batched lookup.
+
+        :return: Mapping of found reference IDs to referenced objects.
+        :rtype:  dict
+        """
+        found = {}
+
+        for ref in refs:
+            try:
+                found[ref] = self.__getitem__(ref, log=False)
+            except KeyError:
+                pass
+
+        return found
+
+    def intern_reference(self, ref_id, fields=None):
+        """Return a data reference shared with all equal references.
+
+        Data types create references through this method when decoding, so
+        thousands of instances referring to the same object hold one
+        immutable data reference instead of a copy each.
+
+        :rtype: zeroguard.types.meta.DataReference
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        try:
+            table = self._reference_table
+
+        # Implementations which do not call a parent constructor get a table
+        # on a first use, but only one of them
+        except AttributeError:
+            with _REFERENCE_TABLE_LOCK:
+                if not hasattr(self, '_reference_table'):
+                    self._reference_table = ReferenceInternTable()
+
+            table = self._reference_table
+
+        return table.get(ref_id, fields)
+
+    def ref_of(self, instance):
+        """Return a reference ID under which a given instance is referenced.
+
+        This default implementation scans all referenced objects.
+        Implementations are free to provide a faster lookup.
+
+        :raises: KeyError
+        """
+        for ref, referenced_instance in self.items():
+            if referenced_instance is instance:
+                return ref
+
+        raise KeyError(instance)
+
+    @staticmethod
+    def check_reference(ref, instance):
+        """Check that a reference ID and an instance can be referenced.
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        if not isinstance(ref, int):
+            raise ZGSanityCheckFailed(
+                message='Reference ID must be a number',
+                context={
+                    'reference_id_type': type(ref),
+                    'reference_id': ref
+                }
+            )
+
+        if not isinstance(instance, DataTypeMeta):
+            raise ZGSanityCheckFailed(
+                message='Bad referenced object type detected',
+                context={
+                    'instance_type': type(instance),
+                    'instance': instance
+                }
+            )
+
 
 class DictReferencer(ReferencerMeta):
     """A simple implementation of a referencer that is essentially a dict.
@@ -59,14 +165,26 @@ class DictReferencer(ReferencerMeta):
         :param logger_label: Label to include in a name of an instance logger.
         :type logger_label:  str
         """
+        super().__init__()
+
         self.logger = get_labeled_logger(__name__, logger_label)
         self._refs = {}
 
+        # Reverse mapping of referenced object identities to lists of reference
+        # IDs, as a single object may be referenced under several IDs
+        self._ref_ids = {}
+
     def __delitem__(self, ref):
         """Delete a referenced object using its reference ID."""
-        self._refs.__delitem__(ref)
+        instance = self._refs.pop(ref)
 
-        self.logger.debug(format_logmsg(
+        ref_ids = self._ref_ids[id(instance)]
+        ref_ids.remove(ref)
+
+        if not ref_ids:
+            del self._ref_ids[id(instance)]
+
+        self.logger.debug(LazyLogMessage(
             'Deleted object reference',
             fields={'ref_id': ref}
         ))
@@ -81,7 +199,7 @@ class DictReferencer(ReferencerMeta):
 
         except KeyError as err:
             if log:
-                self.logger.debug(format_logmsg(
+                self.logger.debug(LazyLogMessage(
                     'Failed to retrieve object reference as it was not found',
                     fields={'ref_id': ref}
                 ))
@@ -101,18 +219,186 @@ class DictReferencer(ReferencerMeta):
 
         :raises: zeroguard.errors.client.ZGSanityCheckFailed
         """
-        if not isinstance(ref, int):
+        self.check_reference(ref, instance)
+
+        try:
+            existing_instance = self.__getitem__(ref, log=False)
+
             raise ZGSanityCheckFailed(
-                message='Reference ID must be a number',
+                message='Referenced object with such ID already exists',
                 context={
-                    'reference_id_type': type(ref),
-                    'reference_id': ref
+                    'ref_id': ref,
+                    'existing_instance': existing_instance,
+                    'new_instance': instance
                 }
             )
 
+        except KeyError:
+            pass
+
+        # This is a new reference that can be set
+        self._refs[ref] = instance
+        self._ref_ids.setdefault(id(instance), []).append(ref)
+
+    def items(self):
+        """Return a list of tuples of all ref-object pairs."""
+        return self._refs.items()
+
+    def ref_of(self, instance):
+        """Return a reference ID under which a given instance is referenced.
+
+        :raises: KeyError
+        """
         try:
-            existing_instance = self.__getitem__(ref, log=False)
+            return self._ref_ids[id(instance)][0]
+
+        except KeyError:
+            raise KeyError(instance)
+
+
+class BoundedReferencer(ReferencerMeta):
+    """Referencer with a limited capacity for long running sessions.
+
+    Referenced objects are evicted in a least recently used order once either
+    a maximum number of entries or a byte budget is exceeded. Optionally,
+    objects also expire after a fixed time to live since their insertion.
+
+    Eviction never breaks objects which are still in use. An evicted object is
+    kept in a weak mapping, so as long as any live data type instance holds
+    it, it can still be retrieved (and is brought back into the referencer).
+    Objects can also be pinned explicitly to never be evicted at all.
+
+    Same as DictReferencer, this implementation does not allow to update
+    existing references without explicit deletion of an existing value.
+    """
+
+    def __init__(
+            self,
+            max_entries=None,
+            max_bytes=None,
+            ttl=None,
+            sizer=sys.getsizeof,
+            logger_label=None
+    ):
+        """.
+
+        :param max_entries:  Maximum number of held objects.
+        :param max_bytes:    Maximum total size of held objects.
+        :param ttl:          Number of seconds after which an object expires.
+        :param sizer:        Function that estimates a size of an object in
+                             bytes. Shallow `sys.getsizeof` is used by default.
+        :param logger_label: Label to include in a name of an instance logger.
+
+        :type max_entries:  int
+        :type max_bytes:    int
+        :type ttl:          float
+        :type sizer:        callable
+        :type logger_label: str
+        """
+        super().__init__()
+
+        self.logger = get_labeled_logger(__name__, logger_label)
 
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizer = sizer
+
+        # Reference ID to (instance, size) mapping in a least recently used
+        # order and reference ID to expiration time mapping in an insertion
+        # (and thus expiration) order
+        self._refs = OrderedDict()
+        self._expires = OrderedDict()
+
+        self._evicted = weakref.WeakValueDictionary()
+        self._pins = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revivals = 0
+
+    def __delitem__(self, ref):
+        """Delete a referenced object using its reference ID."""
+        try:
+            self._remove(ref)
+
+        except KeyError:
+            del self._evicted[ref]
+
+        self._evicted.pop(ref, None)
+        self._pins.pop(ref, None)
+
+        self.logger.debug(LazyLogMessage(
+            'Deleted object reference',
+            fields={'ref_id': ref}
+        ))
+
+    def __getitem__(self, ref, log=True):
+        """Get a referenced object using its reference ID.
+
+        :raises: KeyError
+        """
+        self._expire()
+
+        try:
+            instance, _ = self._refs[ref]
+
+        except KeyError:
+            try:
+                instance = self._evicted.pop(ref)
+
+            except KeyError as err:
+                self.misses += 1
+
+                if log:
+                    self.logger.debug(LazyLogMessage(
+                        'Failed to retrieve object reference as it was not '
+                        'found',
+                        fields={'ref_id': ref}
+                    ))
+
+                raise err
+
+            # Object was evicted but is still used by some live instance. It is
+            # the most recently used one after an insertion (or is held weakly
+            # again if it does not fit into limits at all)
+            self.revivals += 1
+            self._insert(ref, instance)
+
+        else:
+            self._refs.move_to_end(ref)
+
+        self.hits += 1
+
+        return instance
+
+    def __iter__(self):
+        """Return iterator over all stored reference IDs."""
+        self._expire()
+        return iter(list(self._refs))
+
+    def __len__(self):
+        """Return a total number of currently referenced objects."""
+        self._expire()
+        return len(self._refs)
+
+    def __setitem__(self, ref, instance):
+        """Set a referenced object using its reference ID.
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        self.check_reference(ref, instance)
+        self._expire()
+
+        existing_instance = self._refs.get(ref, (None,))[0]
+
+        if existing_instance is None:
+            existing_instance = self._evicted.get(ref)
+
+        if existing_instance is not None:
             raise ZGSanityCheckFailed(
                 message='Referenced object with such ID already exists',
                 context={
@@ -122,21 +408,559 @@ class DictReferencer(ReferencerMeta):
                 }
             )
 
-        except KeyError:
-            pass
+        self._insert(ref, instance)
+
+    @property
+    def stats(self):
+        """Return a dictionary of referencer counters for monitoring."""
+        return {
+            'entries': len(self._refs),
+            'bytes': self._bytes,
+            'pinned': len(self._pins),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'revivals': self.revivals
+        }
 
-        if not isinstance(instance, DataTypeMeta):
+    def items(self):
+        """Return a list of tuples of all ref-object pairs."""
+        self._expire()
+        return [(r, i) for r, (i, _) in self._refs.items()]
+
+    def pin(self, ref):
+        """Pin a referenced object so it is never evicted or expired.
+
+        Pins are counted, so an object has to be unpinned as many times as it
+        was pinned.
+
+        :raises: KeyError
+        """
+        instance = self.__getitem__(ref)
+        self._pins[ref] = self._pins.get(ref, 0) + 1
+
+        # Objects which do not fit into limits are held strongly once pinned
+        if ref not in self._refs:
+            self._evicted.pop(ref, None)
+            self._insert(ref, instance)
+
+    def unpin(self, ref):
+        """Unpin a referenced object.
+
+        :raises: KeyError
+        """
+        count = self._pins.pop(ref) - 1
+
+        if count:
+            self._pins[ref] = count
+
+        self._evict()
+
+    def _insert(self, ref, instance):
+        """Insert a new object and evict old ones if limits are exceeded.
+
+        An unpinned object which alone exceeds limits is held weakly right
+        away, so no other object is evicted for it.
+        """
+        size = self.sizer(instance)
+
+        if ref not in self._pins and (
+                self.max_entries is not None and self.max_entries < 1 or
+                self.max_bytes is not None and size > self.max_bytes
+        ):
+            self._evicted[ref] = instance
+            self.evictions += 1
+
+            self.logger.debug(LazyLogMessage(
+                'Object reference exceeds referencer limits and is held '
+                'weakly',
+                fields={'ref_id': ref, 'size': size}
+            ))
+
+            return
+
+        self._refs[ref] = (instance, size)
+        self._bytes += size
+
+        if self.ttl is not None:
+            self._expires[ref] = time.monotonic() + self.ttl
+
+        self._evict()
+
+    def _remove(self, ref):
+        """Remove an object from strongly held ones.
+
+        :raises: KeyError
+        """
+        instance, size = self._refs.pop(ref)
+
+        self._bytes -= size
+        self._expires.pop(ref, None)
+
+        return instance
+
+    def _evict(self):
+        """Evict the least recently used objects until limits are met."""
+        # Number of pinned objects which were moved out of the way
+        skipped = 0
+
+        while (
+                self.max_entries is not None and
+                len(self._refs) > self.max_entries
+        ) or (
+                self.max_bytes is not None and
+                self._bytes > self.max_bytes
+        ):
+            if skipped >= len(self._refs):
+                break
+
+            ref = next(iter(self._refs))
+
+            if ref in self._pins:
+                self._refs.move_to_end(ref)
+                skipped += 1
+                continue
+
+            self._evicted[ref] = self._remove(ref)
+            self.evictions += 1
+
+    def _expire(self):
+        """Drop all objects which time to live has passed."""
+        if not self._expires:
+            return
+
+        now = time.monotonic()
+
+        # Number of pinned objects which expiration was postponed
+        skipped = 0
+
+        while self._expires and skipped < len(self._expires):
+            ref, expires = next(iter(self._expires.items()))
+
+            if expires > now:
+                break
+
+            if ref in self._pins:
+                self._expires.move_to_end(ref)
+                self._expires[ref] = now + self.ttl
+                skipped += 1
+                continue
+
+            self._remove(ref)
+            self.expirations += 1
+
+
+class StripedReferencer(ReferencerMeta):
+    """Thread-safe referencer with lock striping by reference ID.
+
+    Referenced objects are spread over a number of stripes, each being a
+    separate dictionary guarded by its own lock, so threads which register
+    objects with different reference IDs rarely contend for the same lock.
+    Lookups do not take any locks as a single dictionary read is atomic.
+
+    Same as DictReferencer, this implementation does not allow to update
+    existing references without explicit deletion of an existing value. The
+    existence check and the assignment are done atomically under a stripe
+    lock, so out of many threads registering the same reference ID only one
+    succeeds.
+    """
+
+    def __init__(self, stripes=16, logger_label=None):
+        """.
+
+        :param stripes:      Number of independently locked stripes.
+        :param logger_label: Label to include in a name of an instance logger.
+
+        :type stripes:      int
+        :type logger_label: str
+        """
+        if not isinstance(stripes, int) or stripes < 1:
             raise ZGSanityCheckFailed(
-                message='Bad referenced object type detected',
+                message='Number of stripes must be a positive integer',
+                context={'stripes': stripes}
+            )
+
+        super().__init__()
+
+        self.logger = get_labeled_logger(__name__, logger_label)
+
+        self._refs = [{} for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def __delitem__(self, ref):
+        """Delete a referenced object using its reference ID."""
+        stripe = self._stripe(ref)
+
+        with self._locks[stripe]:
+            del self._refs[stripe][ref]
+
+        self.logger.debug(LazyLogMessage(
+            'Deleted object reference',
+            fields={'ref_id': ref}
+        ))
+
+    def __getitem__(self, ref, log=True):
+        """Get a referenced object using its reference ID.
+
+        :raises: KeyError
+        """
+        try:
+            return self._refs[self._stripe(ref)][ref]
+
+        except KeyError as err:
+            if log:
+                self.logger.debug(LazyLogMessage(
+                    'Failed to retrieve object reference as it was not found',
+                    fields={'ref_id': ref}
+                ))
+
+            raise err
+
+    def __iter__(self):
+        """Return iterator over all stored reference IDs."""
+        return iter([r for r, _ in self.items()])
+
+    def __len__(self):
+        """Return a total number of currently referenced objects."""
+        return sum(len(r) for r in self._refs)
+
+    def __setitem__(self, ref, instance):
+        """Set a referenced object using its reference ID.
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        existing_instance = self.setdefault(ref, instance)
+
+        if existing_instance is not instance:
+            raise ZGSanityCheckFailed(
+                message='Referenced object with such ID already exists',
                 context={
-                    'instance_type': type(instance),
-                    'instance': instance
+                    'ref_id': ref,
+                    'existing_instance': existing_instance,
+                    'new_instance': instance
                 }
             )
 
-        # This is a new reference that can be set
-        self._refs[ref] = instance
+    def get_or_create(self, ref, factory):
+        """Get a referenced object or create and set it if it is missing.
+
+        Factory is called under a stripe lock, so an object for a reference ID
+        is created only once even if many threads request it at the same time.
+        Factories should therefore be quick and must not access this
+        referencer with reference IDs from the same stripe.
+
+        :param factory: Function which returns a new data type instance.
+        :type factory:  callable
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        stripe = self._stripe(ref)
+        refs = self._refs[stripe]
+
+        try:
+            return refs[ref]
+        except KeyError:
+            pass
+
+        with self._locks[stripe]:
+            try:
+                return refs[ref]
+
+            except KeyError:
+                instance = factory()
+                self.check_reference(ref, instance)
+
+                refs[ref] = instance
+                return instance
 
     def items(self):
         """Return a list of tuples of all ref-object pairs."""
-        return self._refs.items()
+        items = []
+
+        for refs, lock in zip(self._refs, self._locks):
+            with lock:
+                items.extend(refs.items())
+
+        return items
+
+    def setdefault(self, ref, instance):
+        """Set a referenced object unless one with such ID already exists.
+
+        :return: Object which is referenced by the ID after this call, which
+                 is either a given instance or an already existing one.
+        :rtype:  zeroguard.types.meta.DataTypeMeta child
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        self.check_reference(ref, instance)
+        stripe = self._stripe(ref)
+
+        with self._locks[stripe]:
+            return self._refs[stripe].setdefault(ref, instance)
+
+    def _stripe(self, ref):
+        """Return an index of a stripe which holds a given reference ID."""
+        return hash(ref) % len(self._refs)
+
+
+class SQLiteReferencer(ReferencerMeta):
+    """Persistent referencer backed by an SQLite database file.
+
+    Referenced objects are stored in their `to_ref_dict` form, thus
+    references between stored objects are kept as reference IDs. Objects are
+    rehydrated lazily with `from_dict` of their data type on first access and
+    kept in a weak cache while they are in use. Only an accessed object is
+    rehydrated, its references to objects which are not cached yet are kept
+    as data references and dereferenced on access.
+
+    Database is opened in a write-ahead log mode, so many processes can read
+    it concurrently while one of them writes, and it survives restarts. Each
+    thread uses its own database connection, all of them are closed by
+    `close`.
+
+    Same as DictReferencer, this implementation does not allow to update
+    existing references without explicit deletion of an existing value. The
+    check is enforced by the database, so it holds across processes as well.
+    """
+
+    def __init__(self, path, timeout=30.0, logger_label=None):
+        """.
+
+        :param path:         Path to a database file. It is created if it does
+                             not exist.
+        :param timeout:      Number of seconds to wait for a database lock.
+        :param logger_label: Label to include in a name of an instance logger.
+
+        :type path:         str
+        :type timeout:      float
+        :type logger_label: str
+        """
+        super().__init__()
+
+        self.logger = get_labeled_logger(__name__, logger_label)
+
+        self.path = path
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._cache = weakref.WeakValueDictionary()
+        self._ref_ids = weakref.WeakKeyDictionary()
+
+        with self._connection as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS refs ('
+                'ref_id INTEGER PRIMARY KEY, '
+                'type TEXT NOT NULL, '
+                'data TEXT NOT NULL)'
+            )
+
+    def __delitem__(self, ref):
+        """Delete a referenced object using its reference ID."""
+        with self._connection as connection:
+            cursor = connection.execute(
+                'DELETE FROM refs WHERE ref_id = ?',
+                (ref,)
+            )
+
+        if not cursor.rowcount:
+            raise KeyError(ref)
+
+        self._cache.pop(ref, None)
+
+        self.logger.debug(LazyLogMessage(
+            'Deleted object reference',
+            fields={'ref_id': ref}
+        ))
+
+    def __getitem__(self, ref, log=True):
+        """Get a referenced object using its reference ID.
+
+        :raises: KeyError
+        """
+        try:
+            return self._cache[ref]
+        except KeyError:
+            # Nested references of an object being rehydrated are left for
+            # lazy dereferencing instead of being queried one by one
+            if getattr(self._local, 'rehydrating', False):
+                raise
+
+        row = self._connection.execute(
+            'SELECT type, data FROM refs WHERE ref_id = ?',
+            (ref,)
+        ).fetchone()
+
+        if row is None:
+            if log:
+                self.logger.debug(LazyLogMessage(
+                    'Failed to retrieve object reference as it was not found',
+                    fields={'ref_id': ref}
+                ))
+
+            raise KeyError(ref)
+
+        return self._rehydrate(ref, *row)
+
+    def __iter__(self):
+        """Return iterator over all stored reference IDs."""
+        return iter([
+            r for r, in self._connection.execute(
+                'SELECT ref_id FROM refs ORDER BY ref_id'
+            )
+        ])
+
+    def __len__(self):
+        """Return a total number of currently referenced objects."""
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM refs'
+        ).fetchone()[0]
+
+    def __setitem__(self, ref, instance):
+        """Set a referenced object using its reference ID.
+
+        Objects referenced by a given instance must already be referenced by
+        this referencer.
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        self.check_reference(ref, instance)
+
+        try:
+            data = instance.to_ref_dict(self.ref_of)
+
+        except KeyError as err:
+            raise ZGSanityCheckFailed(
+                error=err,
+                message=(
+                    'Referenced object refers to an object which is not '
+                    'stored in this referencer'
+                ),
+                context={'ref_id': ref, 'instance': instance}
+            )
+
+        data = json.dumps(data, separators=(',', ':'))
+
+        try:
+            with self._connection as connection:
+                connection.execute(
+                    'INSERT INTO refs (ref_id, type, data) VALUES (?, ?, ?)',
+                    (ref, instance.type, data)
+                )
+
+        except sqlite3.IntegrityError:
+            raise ZGSanityCheckFailed(
+                message='Referenced object with such ID already exists',
+                context={'ref_id': ref, 'new_instance': instance}
+            )
+
+        self._cache[ref] = instance
+        self._ref_ids[instance] = ref
+
+    def close(self):
+        """Close database connections of all threads.
+
+        A connection is reopened when a thread uses this referencer again.
+        Referencer must not be used by other threads while it is closed.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, set()
+
+        for connection in connections:
+            connection.close()
+
+    def get_many(self, refs):
+        """Get many referenced objects with a single query per 500 IDs.
+
+        :return: Mapping of found reference IDs to referenced objects.
+        :rtype:  dict
+        """
+        found = {}
+        missing = []
+
+        for ref in refs:
+            try:
+                found[ref] = self._cache[ref]
+            except KeyError:
+                missing.append(ref)
+
+        for offset in range(0, len(missing), SQLITE_MAX_QUERY_PARAMS):
+            chunk = missing[offset:offset + SQLITE_MAX_QUERY_PARAMS]
+
+            rows = self._connection.execute(
+                'SELECT ref_id, type, data FROM refs WHERE ref_id IN (%s)' % (
+                    ', '.join('?' * len(chunk))
+                ),
+                chunk
+            ).fetchall()
+
+            for ref, data_type, data in rows:
+                found[ref] = self._rehydrate(ref, data_type, data)
+
+        return found
+
+    def items(self):
+        """Return iterator over tuples of all ref-object pairs.
+
+        Objects are rehydrated one by one as the iterator is consumed.
+        """
+        return ((r, self[r]) for r in self)
+
+    def ref_of(self, instance):
+        """Return a reference ID under which a given instance is referenced.
+
+        Only instances which were stored or retrieved by this referencer
+        instance can be looked up.
+
+        :raises: KeyError
+        """
+        try:
+            return self._ref_ids[instance]
+
+        except TypeError:
+            raise KeyError(instance)
+
+    def _rehydrate(self, ref, data_type, data):
+        """Create a data type instance from a stored object."""
+        self._local.rehydrating = True
+
+        try:
+            instance = KNOWN_TYPES[data_type].from_dict(
+                json.loads(data),
+                self
+            )
+
+        finally:
+            self._local.rehydrating = False
+
+        # Another thread may have rehydrated the same object in the meantime
+        instance = self._cache.setdefault(ref, instance)
+        self._ref_ids[instance] = ref
+
+        return instance
+
+    @property
+    def _connection(self):
+        """Return a database connection of a current thread."""
+        connection = getattr(self._local, 'connection', None)
+
+        # Connection might have been closed by close in another thread
+        if connection is not None and connection in self._connections:
+            return connection
+
+        # Connections are only shared with close which may run in any thread
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+
+        with self._lock:
+            self._connections.add(connection)
+
+        self._local.connection = connection
+        return connection
@@ -0,0 +1,248 @@
+"""Retries of transient API errors.
+
+A retry policy retries requests which failed with transient server-side
+errors (processing timeouts and internal server errors by default) after an
+exponentially growing delay with full jitter, so retries of many clients
+which failed at the same time are spread over time.
+
+Retries are bounded so they can not amplify load on an API which is already
+failing:
+
+* A per-request deadline. No retry is scheduled past a deadline of an
+  original request.
+* A global retry budget shared by all requests of a policy. Every request
+  deposits a fraction of a retry into a budget and every retry withdraws a
+  whole one, so retries are limited to a fraction of all requests (plus a
+  small reserve) no matter how many requests fail.
+"""
+import asyncio
+import random
+import threading
+import time
+
+from zeroguard.errors.client import ZGSanityCheckFailed
+from zeroguard.errors.meta import ZGServerErrorMeta
+from zeroguard.errors.server import ZGInternalServerError, ZGProcessingTimeout
+from zeroguard.utils.log import LazyLogMessage, get_labeled_logger
+
+# Names of server-side errors which are retried by default
+RETRYABLE_ERRORS = frozenset((
+    ZGProcessingTimeout.NAME,
+    ZGInternalServerError.NAME
+))
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 10.0
+DEFAULT_DEADLINE = 60.0
+
+# Retries deposited into a budget by every request and a maximum number of
+# retries a budget can hold (which is also an initial reserve)
+DEFAULT_BUDGET_RATIO = 0.1
+DEFAULT_BUDGET_RESERVE = 10
+
+
+class RetryPolicy:
+    """Thread-safe retry policy with a shared retry budget.
+
+    A single policy is meant to be shared by all clients of an API, so that
+    a retry budget covers all their requests.
+    """
+
+    def __init__(
+            self,
+            retryable=RETRYABLE_ERRORS,
+            max_attempts=DEFAULT_MAX_ATTEMPTS,
+            base_delay=DEFAULT_BASE_DELAY,
+            max_delay=DEFAULT_MAX_DELAY,
+            deadline=DEFAULT_DEADLINE,
+            budget_ratio=DEFAULT_BUDGET_RATIO,
+            budget_reserve=DEFAULT_BUDGET_RESERVE,
+            logger_label=None
+    ):
+        """.
+
+        :param retryable:      Names of server-side errors to retry.
+        :param max_attempts:   Maximum number of attempts of a request
+                               (including a first one).
+        :param base_delay:     Upper bound of a first retry delay in seconds.
+                               It doubles with every next attempt.
+        :param max_delay:      Upper bound of any retry delay in seconds.
+        :param deadline:       Number of seconds since a first attempt after
+                               which a request is not retried anymore.
+        :param budget_ratio:   Number of retries every request adds to a
+                               retry budget.
+        :param budget_reserve: Maximum number of retries held by a budget.
+        :param logger_label:   Label to include in a name of an instance
+                               logger.
+
+        :type retryable:      collections.abc.Set
+        :type max_attempts:   int
+        :type base_delay:     float
+        :type max_delay:      float
+        :type deadline:       float
+        :type budget_ratio:   float
+        :type budget_reserve: float
+        :type logger_label:   str
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        if max_attempts < 1:
+            raise ZGSanityCheckFailed(
+                message='Retry policy must allow at least one attempt',
+                context={'max_attempts': max_attempts}
+            )
+
+        self.retryable = frozenset(retryable)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.budget_ratio = budget_ratio
+        self.budget_reserve = budget_reserve
+
+        self.logger = get_labeled_logger(__name__, logger_label)
+
+        self._budget = budget_reserve
+        self._requests = 0
+        self._retries = 0
+        self._rejected = 0
+
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """Return retry metrics.
+
+        * `budget` - Number of retries which can be made right now.
+        * `rejected` - Number of retryable errors which were not retried
+          because of an exhausted budget or a deadline.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'budget': self._budget,
+                'requests': self._requests,
+                'retries': self._retries,
+                'rejected': self._rejected
+            }
+
+    def is_retryable(self, error):
+        """Check whether an error is a transient server-side error.
+
+        Errors are classified by their classes rather than by names returned
+        by the API, so errors guessed from HTTP status codes are retried too.
+
+        :rtype: bool
+        """
+        return (
+            isinstance(error, ZGServerErrorMeta)
+            and error.NAME in self.retryable
+        )
+
+    def call(self, func, *args, **kwargs):
+        """Call a function retrying transient errors it raises.
+
+        :param func: Function sending a request.
+        :type func:  callable
+
+        :return: Function result.
+        """
+        deadline = self._start()
+        attempt = 1
+
+        while True:
+            try:
+                return func(*args, **kwargs)
+
+            except ZGServerErrorMeta as err:
+                delay = self.get_delay(err, attempt, deadline)
+
+                if delay is None:
+                    raise
+
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, func, *args, **kwargs):
+        """Await a coroutine function retrying transient errors it raises.
+
+        Same as `call`.
+        """
+        deadline = self._start()
+        attempt = 1
+
+        while True:
+            try:
+                return await func(*args, **kwargs)
+
+            except ZGServerErrorMeta as err:
+                delay = self.get_delay(err, attempt, deadline)
+
+                if delay is None:
+                    raise
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def get_delay(self, error, attempt, deadline):
+        """Withdraw a retry of a failed attempt from a budget.
+
+        :param error:    Error an attempt failed with.
+        :param attempt:  Number of a failed attempt starting with one.
+        :param deadline: Monotonic time after which no retry may start.
+
+        :type error:    zeroguard.errors.meta.ZGServerErrorMeta
+        :type attempt:  int
+        :type deadline: float
+
+        :return: Number of seconds to wait before a next attempt or None if
+                 an error must not be retried.
+        :rtype:  float
+        """
+        if not self.is_retryable(error) or attempt >= self.max_attempts:
+            return None
+
+        delay = random.uniform(
+            0,
+            min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+        with self._lock:
+            if time.monotonic() + delay > deadline or self._budget < 1:
+                self._rejected += 1
+                reason = 'deadline' if self._budget >= 1 else 'budget'
+
+            else:
+                self._budget -= 1
+                self._retries += 1
+                reason = None
+
+        if reason:
+            self.logger.debug(LazyLogMessage(
+                'Not retrying a failed request',
+                fields={'reason': reason, 'attempt': attempt},
+                error=error
+            ))
+
+            return None
+
+        self.logger.debug(LazyLogMessage(
+            'Retrying a failed request',
+            fields={'attempt': attempt, 'delay': delay},
+            error=error
+        ))
+
+        return delay
+
+    def _start(self):
+        """Deposit a new request into a budget and return its deadline."""
+        with self._lock:
+            self._requests += 1
+            self._budget = min(
+                self._budget + self.budget_ratio,
+                self.budget_reserve
+            )
+
+        return time.monotonic() + self.deadline
@@ -2,6 +2,7 @@
 # flake8: noqa
 # pylama:ignore=W0611:
 from zeroguard.types.ip_address import IPv4Address, IPv6Address
+from zeroguard.types.ip_address_batch import IPAddressBatch
 from zeroguard.types.network_prefix import NetworkPrefix
 from zeroguard.types.subdomain import Subdomain
 
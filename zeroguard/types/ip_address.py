@@ -1,23 +1,47 @@
 """IP address data types and helper classes."""
+from datetime import datetime
 import ipaddress
-import time
 
+from zeroguard.errors.builtin import LazyValueError
 from zeroguard.utils.fmt import lpad
-from zeroguard.utils.log import format_logmsg
-from zeroguard.types.meta import DataTypeMeta, DataReference
+from zeroguard.types.meta import DataTypeMeta, resolve_packed_reference
+from zeroguard.types.schema import Field, NestedField, ReferenceField
 from zeroguard.validators.networks import check_valid_ip_address
 from zeroguard.validators.time import check_valid_unix_time
 
 
 class IPReputationEntry:
-    """."""
+    """.
+
+    First and last seen timestamps are stored as UNIX time integers and are
+    converted to datetime objects only when accessed.
+    """
+
+    __slots__ = ('name', 'current', 'first_seen_ts', 'last_seen_ts')
+
+    SCHEMA = (
+        Field('name'),
+        Field('current'),
+        Field('first_seen'),
+        Field('last_seen')
+    )
 
     def __init__(self, name, current, first_seen, last_seen):
         """."""
         self.name = name
         self.current = current
-        self.first_seen = check_valid_unix_time(first_seen)
-        self.last_seen = check_valid_unix_time(last_seen)
+        self.first_seen_ts = self._check_unix_time(first_seen)
+        self.last_seen_ts = self._check_unix_time(last_seen)
+
+    @property
+    def first_seen(self):
+        """Return a datetime when this entry was seen for the first time."""
+        return datetime.fromtimestamp(self.first_seen_ts)
+
+    @property
+    def last_seen(self):
+        """Return a datetime when this entry was seen for the last time."""
+        return datetime.fromtimestamp(self.last_seen_ts)
 
     def __str__(self, as_list=False):
         """."""
@@ -34,17 +58,31 @@ class IPReputationEntry:
 
     def to_dict(self):
         """."""
-        def dt2unix(dt):
-            """."""
-            return int(time.mktime(dt.timetuple()))
-
         return {
             'name': self.name,
             'current': self.current,
-            'first_seen': dt2unix(self.first_seen),
-            'last_seen': dt2unix(self.last_seen)
+            'first_seen': self.first_seen_ts,
+            'last_seen': self.last_seen_ts
         }
 
+    def to_packed(self):
+        """Return this entry as a list of compact field values."""
+        return [self.name, self.current, self.first_seen_ts, self.last_seen_ts]
+
+    @staticmethod
+    def _check_unix_time(value):
+        """Validate a UNIX time value and return it as an integer.
+
+        :raises: ValueError
+        """
+        if not check_valid_unix_time(value, as_result=True).ok:
+            raise LazyValueError(
+                'Value is not a valid UNIX time',
+                fields={'value': value}
+            )
+
+        return int(value)
+
     @classmethod
     def from_dict(cls, data):
         """."""
@@ -57,14 +95,14 @@ class IPReputationEntry:
             )
 
         except KeyError as err:
-            raise ValueError(format_logmsg(
+            raise LazyValueError(
                 (
                     'Failed to create an IP reputation entry instance from a '
                     'supplied data dictionary'
                 ),
                 error=err,
                 fields={'data': data}
-            ))
+            )
 
 
 class IPv4Address(DataTypeMeta):
@@ -72,6 +110,16 @@ class IPv4Address(DataTypeMeta):
 
     TYPE = 'ipv4'
 
+    FIELDS = ('address', 'closest_prefix', 'prefixes', 'reputation')
+    REFERENCE_FIELDS = ('closest_prefix', 'prefixes')
+
+    SCHEMA = (
+        Field('address'),
+        ReferenceField('closest_prefix'),
+        ReferenceField('prefixes', many=True),
+        NestedField('reputation', IPReputationEntry, default=())
+    )
+
     def __init__(
             self,
             address,
@@ -86,8 +134,8 @@ class IPv4Address(DataTypeMeta):
             expected_type=ipaddress.IPv4Address
         )
 
-        self.closest_prefix = closest_prefix
-        self.prefixes = prefixes
+        self._set_reference_field('closest_prefix', closest_prefix)
+        self._set_reference_field('prefixes', prefixes)
         self.reputation = reputation
 
         super().__init__(**kwargs)
@@ -129,69 +177,45 @@ class IPv4Address(DataTypeMeta):
             'reputation': [r.to_dict() for r in self.reputation]
         }
 
-    def update_from_reference_fields(self, reference, derefed_value):
-        """Do nothing when this callback is executed.
-
-        IPv4Address may contain references to network prefix objects but there
-        are not extra fields expected in the reference objects.
-        """
+    def to_ref_dict(self, ref_of):
+        """."""
+        return {
+            'type': self.TYPE,
+            'address': str(self.address),
+            'closest_prefix': self._to_ref_value('closest_prefix', ref_of),
+            'prefixes': self._to_ref_value('prefixes', ref_of),
+            'reputation': [r.to_dict() for r in self.reputation]
+        }
 
     @classmethod
-    def from_dict(cls, data, referencer):
+    def from_packed(cls, values, referencer):
         """."""
-        errmsg = (
-            'Failed to create an IPv4 instance from a supplied data dictionary'
-        )
+        address, closest_prefix, prefixes, reputation = values
 
-        try:
-            data_type = data['type']
-            address = data['address']
-
-            # Create instances of IP reputation entries
-            reputation = [
-                IPReputationEntry.from_dict(d)
-                for d in data.get('reputation', [])
-            ]
-
-            closest_prefix_ref = data['closest_prefix']['_ref']
-            prefixes_refs = [p['_ref'] for p in data['prefixes']]
-
-            if data_type != cls.TYPE:
-                raise ValueError(format_logmsg(
-                    errmsg,
-                    error=Exception('Wrong data type in data'),
-                    fields={'data': data}
-                ))
-
-        except (KeyError, TypeError, ValueError) as err:
-            raise ValueError(format_logmsg(
-                errmsg,
-                error=err,
-                fields={'data': data}
-            ))
-
-        # Attempt to resolve references in place
-        try:
-            closest_prefix = referencer[closest_prefix_ref]
-        except KeyError:
-            closest_prefix = DataReference(closest_prefix_ref)
-
-        prefixes = []
-        for prefixes_ref in prefixes_refs:
-            try:
-                prefixes.append(referencer[prefixes_ref])
-            except KeyError:
-                prefixes.append(DataReference(prefixes_ref))
-
-        # Create a new instance of IPv4 address data type
         return cls(
             address,
-            closest_prefix,
-            prefixes,
-            reputation,
+            resolve_packed_reference(referencer, closest_prefix),
+            [resolve_packed_reference(referencer, p) for p in prefixes],
+            [IPReputationEntry(*r) for r in reputation],
             referencer=referencer
         )
 
+    def to_packed(self, ref_of):
+        """."""
+        return [
+            self.address.packed,
+            self._to_packed_reference('closest_prefix', ref_of),
+            self._to_packed_reference('prefixes', ref_of),
+            [r.to_packed() for r in self.reputation]
+        ]
+
+    def update_from_reference_fields(self, reference, derefed_value):
+        """Do nothing when this callback is executed.
+
+        IPv4Address may contain references to network prefix objects but there
+        are not extra fields expected in the reference objects.
+        """
+
 
 class IPv6Address(DataTypeMeta):
     """.
@@ -205,6 +229,16 @@ class IPv6Address(DataTypeMeta):
 
     TYPE = 'ipv6'
 
+    FIELDS = ('address', 'closest_prefix', 'prefixes', 'reputation')
+    REFERENCE_FIELDS = ('closest_prefix', 'prefixes')
+
+    SCHEMA = (
+        Field('address'),
+        ReferenceField('closest_prefix'),
+        ReferenceField('prefixes', many=True),
+        NestedField('reputation', IPReputationEntry, default=())
+    )
+
     def __init__(
             self,
             address,
@@ -219,8 +253,8 @@ class IPv6Address(DataTypeMeta):
             expected_type=ipaddress.IPv6Address
         )
 
-        self.closest_prefix = closest_prefix
-        self.prefixes = prefixes
+        self._set_reference_field('closest_prefix', closest_prefix)
+        self._set_reference_field('prefixes', prefixes)
         self.reputation = reputation
 
         super().__init__(**kwargs)
@@ -262,65 +296,41 @@ class IPv6Address(DataTypeMeta):
             'reputation': [r.to_dict() for r in self.reputation]
         }
 
-    def update_from_reference_fields(self, reference, derefed_value):
-        """Do nothing when this callback is executed.
-
-        IPv4Address may contain references to network prefix objects but there
-        are not extra fields expected in the reference objects.
-        """
+    def to_ref_dict(self, ref_of):
+        """."""
+        return {
+            'type': self.TYPE,
+            'address': str(self.address),
+            'closest_prefix': self._to_ref_value('closest_prefix', ref_of),
+            'prefixes': self._to_ref_value('prefixes', ref_of),
+            'reputation': [r.to_dict() for r in self.reputation]
+        }
 
     @classmethod
-    def from_dict(cls, data, referencer):
+    def from_packed(cls, values, referencer):
         """."""
-        errmsg = (
-            'Failed to create an IPv6 instance from a supplied data dictionary'
-        )
-
-        try:
-            data_type = data['type']
-            address = data['address']
-
-            # Create instances of IP reputation entries
-            reputation = [
-                IPReputationEntry.from_dict(d)
-                for d in data.get('reputation', [])
-            ]
-
-            closest_prefix_ref = data['closest_prefix']['_ref']
-            prefixes_refs = [p['_ref'] for p in data['prefixes']]
-
-            if data_type != cls.TYPE:
-                raise ValueError(format_logmsg(
-                    errmsg,
-                    error=Exception('Wrong data type in data'),
-                    fields={'data': data}
-                ))
-
-        except (KeyError, TypeError, ValueError) as err:
-            raise ValueError(format_logmsg(
-                errmsg,
-                error=err,
-                fields={'data': data}
-            ))
+        address, closest_prefix, prefixes, reputation = values
 
-        # Attempt to resolve references in place
-        try:
-            closest_prefix = referencer[closest_prefix_ref]
-        except KeyError:
-            closest_prefix = DataReference(closest_prefix_ref)
-
-        prefixes = []
-        for prefixes_ref in prefixes_refs:
-            try:
-                prefixes.append(referencer[prefixes_ref])
-            except KeyError:
-                prefixes.append(DataReference(prefixes_ref))
-
-        # Create a new instance of IPv4 address data type
         return cls(
             address,
-            closest_prefix,
-            prefixes,
-            reputation,
+            resolve_packed_reference(referencer, closest_prefix),
+            [resolve_packed_reference(referencer, p) for p in prefixes],
+            [IPReputationEntry(*r) for r in reputation],
             referencer=referencer
         )
+
+    def to_packed(self, ref_of):
+        """."""
+        return [
+            self.address.packed,
+            self._to_packed_reference('closest_prefix', ref_of),
+            self._to_packed_reference('prefixes', ref_of),
+            [r.to_packed() for r in self.reputation]
+        ]
+
+    def update_from_reference_fields(self, reference, derefed_value):
+        """Do nothing when this callback is executed.
+
+        IPv4Address may contain references to network prefix objects but there
+        are not extra fields expected in the reference objects.
+        """
@@ -0,0 +1,386 @@
+"""Columnar container of IP address data type records."""
+from array import array
+import ipaddress
+
+from zeroguard.errors.builtin import LazyValueError
+from zeroguard.types.ip_address import (
+    IPReputationEntry,
+    IPv4Address,
+    IPv6Address
+)
+from zeroguard.types.meta import intern_reference
+from zeroguard.validators.networks import UINT32_TYPECODE, pack_ip_addresses
+from zeroguard.validators.time import check_valid_unix_time
+
+VERSION_TYPES = {4: IPv4Address, 6: IPv6Address}
+TYPE_VERSIONS = {t.TYPE: v for v, t in VERSION_TYPES.items()}
+
+
+class IPAddressBatch:
+    """Many IPv4/IPv6 address records stored in contiguous arrays.
+
+    Addresses, reference IDs and reputation entries of all records are kept
+    column by column in `array` module arrays. Variable length columns
+    (prefixes and reputation entries) are flattened and indexed by offset
+    arrays, so values of a record `i` are located between `offsets[i]` and
+    `offsets[i + 1]`. Full IPv4Address/IPv6Address instances are only
+    created when a batch is indexed.
+    """
+
+    def __init__(self, referencer=None):
+        """.
+
+        :param referencer: Referencer used to resolve network prefixes when
+                           records are materialized.
+        :type referencer:  zeroguard.referencer.ReferencerMeta child
+        """
+        self.referencer = referencer
+
+        # IP version of each record and an index of its address in the
+        # address array of a corresponding IP version
+        self._versions = bytearray()
+        self._address_index = array('L')
+
+        self._ipv4 = array(UINT32_TYPECODE)
+        self._ipv6 = bytearray()
+
+        self._closest_prefix_refs = array('q')
+        self._prefix_refs = array('q')
+        self._prefix_offsets = array('L', [0])
+
+        # Reputation entry names are stored as indexes into a names table
+        self._names = []
+        self._name_index = {}
+
+        self._rep_names = array('L')
+        self._rep_current = bytearray()
+        self._rep_first_seen = array('q')
+        self._rep_last_seen = array('q')
+        self._rep_offsets = array('L', [0])
+
+    def __len__(self):
+        """Return a total number of records in this batch."""
+        return len(self._versions)
+
+    def __getitem__(self, index):
+        """Materialize a record (or a list of records for a slice).
+
+        :rtype: zeroguard.types.IPv4Address | zeroguard.types.IPv6Address
+
+        :raises: IndexError
+        """
+        if isinstance(index, slice):
+            return [self._materialize(i) for i in range(len(self))[index]]
+
+        length = len(self)
+
+        if index < 0:
+            index += length
+
+        if not 0 <= index < length:
+            raise IndexError('Batch index out of range')
+
+        return self._materialize(index)
+
+    def __iter__(self):
+        """Return iterator over materialized records."""
+        for index in range(len(self)):
+            yield self._materialize(index)
+
+    @classmethod
+    def from_dicts(cls, data, referencer=None):
+        """Create a batch from a list of IPv4/IPv6 address dictionaries.
+
+        Dictionaries have the same structure as accepted by
+        `IPv4Address.from_dict` and `IPv6Address.from_dict` methods.
+
+        :raises: ValueError
+        """
+        batch = cls(referencer=referencer)
+        batch.extend(data)
+        return batch
+
+    def extend(self, data):
+        """Append many IPv4/IPv6 address dictionaries to this batch.
+
+        All records are validated and converted into temporary columns before
+        any of them is appended, so the batch is left untouched if any record
+        is malformed.
+
+        :raises: ValueError
+        """
+        data = list(data)
+        errmsg = 'Failed to add an IP address record to a batch'
+
+        versions = []
+        addresses = []
+        closest_prefix_refs = array('q')
+        prefix_refs = array('q')
+        prefix_counts = []
+        reputation = []
+
+        for index, record in enumerate(data):
+            try:
+                versions.append(TYPE_VERSIONS[record['type']])
+                addresses.append(record['address'])
+                closest_prefix_refs.append(
+                    _check_ref(record['closest_prefix']['_ref'])
+                )
+
+                refs = [_check_ref(p['_ref']) for p in record['prefixes']]
+                prefix_refs.extend(refs)
+                prefix_counts.append(len(refs))
+
+                reputation.append([
+                    (
+                        _check_name(r['name']),
+                        bool(r['current']),
+                        _check_unix_time(r['first_seen']),
+                        _check_unix_time(r['last_seen'])
+                    ) for r in record.get('reputation', [])
+                ])
+
+            except (KeyError, TypeError, ValueError) as err:
+                raise LazyValueError(
+                    errmsg,
+                    error=err,
+                    fields={'index': index, 'data': record}
+                )
+
+        packed = pack_ip_addresses(addresses)
+
+        for index, (version, got_version) in enumerate(
+                zip(versions, packed.versions)
+        ):
+            if version != got_version:
+                raise LazyValueError(
+                    errmsg,
+                    error=Exception('Bad IP address or wrong data type'),
+                    fields={'index': index, 'data': data[index]}
+                )
+
+        # All records are valid and converted at this point, so appending
+        # them cannot fail halfway
+        ipv4_count = len(self._ipv4)
+        ipv6_count = len(self._ipv6) // 16
+
+        for version in versions:
+            if version == 4:
+                self._address_index.append(ipv4_count)
+                ipv4_count += 1
+            else:
+                self._address_index.append(ipv6_count)
+                ipv6_count += 1
+
+        self._versions += packed.versions
+        self._ipv4.extend(packed.ipv4)
+        self._ipv6 += packed.ipv6
+
+        self._closest_prefix_refs.extend(closest_prefix_refs)
+        self._prefix_refs.extend(prefix_refs)
+
+        for count in prefix_counts:
+            self._prefix_offsets.append(self._prefix_offsets[-1] + count)
+
+        for entries in reputation:
+            for name, current, first_seen, last_seen in entries:
+                self._rep_names.append(self._intern_name(name))
+                self._rep_current.append(current)
+                self._rep_first_seen.append(first_seen)
+                self._rep_last_seen.append(last_seen)
+
+            self._rep_offsets.append(len(self._rep_names))
+
+    def take(self, indexes):
+        """Return a new batch with only the records at given indexes."""
+        batch = IPAddressBatch(referencer=self.referencer)
+        batch.extend(self._to_ref_dict(i) for i in indexes)
+        return batch
+
+    def where_prefix(self, ref_id):
+        """Return indexes of records which have a given prefix reference."""
+        offsets = self._prefix_offsets
+        refs = self._prefix_refs
+
+        return [
+            index for index in range(len(self))
+            if ref_id in refs[offsets[index]:offsets[index + 1]]
+        ]
+
+    def where_reputation(self, name, current_only=False):
+        """Return indexes of records which have a given reputation entry."""
+        try:
+            name_index = self._name_index[name]
+        except KeyError:
+            return []
+
+        offsets = self._rep_offsets
+        names = self._rep_names
+        current = self._rep_current
+        found = []
+
+        for index in range(len(self)):
+            for entry in range(offsets[index], offsets[index + 1]):
+                if names[entry] == name_index and (
+                        current[entry] or not current_only
+                ):
+                    found.append(index)
+                    break
+
+        return found
+
+    def to_dicts(self):
+        """Return all records in the same format as returned by `to_dict`.
+
+        Network prefix dictionaries are built once per reference ID and copied
+        for each record which refers to them.
+
+        :raises: KeyError
+        """
+        prefix_dicts = {}
+
+        def prefix_dict(ref_id):
+            try:
+                return dict(prefix_dicts[ref_id])
+
+            except KeyError:
+                prefix_dicts[ref_id] = self.referencer[ref_id].to_dict()
+                return dict(prefix_dicts[ref_id])
+
+        result = []
+
+        for index in range(len(self)):
+            record = self._to_ref_dict(index)
+
+            record['closest_prefix'] = prefix_dict(
+                self._closest_prefix_refs[index]
+            )
+
+            record['prefixes'] = [
+                prefix_dict(p['_ref']) for p in record['prefixes']
+            ]
+
+            result.append(record)
+
+        return result
+
+    def _address(self, index):
+        """Return an ipaddress module object of a record address."""
+        version = self._versions[index]
+        position = self._address_index[index]
+
+        if version == 4:
+            return ipaddress.IPv4Address(self._ipv4[position])
+
+        return ipaddress.IPv6Address(
+            bytes(self._ipv6[position * 16:position * 16 + 16])
+        )
+
+    def _intern_name(self, name):
+        """Return an index of a reputation entry name in a names table."""
+        try:
+            return self._name_index[name]
+
+        except KeyError:
+            self._names.append(name)
+            self._name_index[name] = len(self._names) - 1
+            return self._name_index[name]
+
+    def _reputation(self, index):
+        """Return reputation entry tuples of a record."""
+        return [
+            (
+                self._names[self._rep_names[entry]],
+                bool(self._rep_current[entry]),
+                self._rep_first_seen[entry],
+                self._rep_last_seen[entry]
+            ) for entry in range(
+                self._rep_offsets[index],
+                self._rep_offsets[index + 1]
+            )
+        ]
+
+    def _resolve(self, ref_id):
+        """Resolve a reference ID in place if possible."""
+        try:
+            return self.referencer[ref_id]
+
+        except (KeyError, TypeError):
+            return intern_reference(self.referencer, ref_id)
+
+    def _materialize(self, index):
+        """Create a full IP address data type instance of a record."""
+        return VERSION_TYPES[self._versions[index]](
+            self._address(index),
+            self._resolve(self._closest_prefix_refs[index]),
+            [
+                self._resolve(r) for r in self._prefix_refs[
+                    self._prefix_offsets[index]:
+                    self._prefix_offsets[index + 1]
+                ]
+            ],
+            [IPReputationEntry(*r) for r in self._reputation(index)],
+            referencer=self.referencer
+        )
+
+    def _to_ref_dict(self, index):
+        """Return a record dictionary with unresolved references."""
+        return {
+            'type': VERSION_TYPES[self._versions[index]].TYPE,
+            'address': str(self._address(index)),
+            'closest_prefix': {'_ref': self._closest_prefix_refs[index]},
+            'prefixes': [
+                {'_ref': r} for r in self._prefix_refs[
+                    self._prefix_offsets[index]:
+                    self._prefix_offsets[index + 1]
+                ]
+            ],
+            'reputation': [
+                {
+                    'name': name,
+                    'current': current,
+                    'first_seen': first_seen,
+                    'last_seen': last_seen
+                } for name, current, first_seen, last_seen in
+                self._reputation(index)
+            ]
+        }
+
+
+def _check_name(value):
+    """Validate a reputation entry name.
+
+    :raises: TypeError
+    """
+    if not isinstance(value, str):
+        raise TypeError('Reputation entry name must be a string')
+
+    return value
+
+
+def _check_ref(value):
+    """Validate a reference ID which is stored in a signed 64-bit column.
+
+    :raises: TypeError, ValueError
+    """
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError('Reference ID must be an integer')
+
+    if not -2 ** 63 <= value < 2 ** 63:
+        raise ValueError('Reference ID is out of range')
+
+    return value
+
+
+def _check_unix_time(value):
+    """Validate a UNIX time value and return it as an integer.
+
+    :raises: ValueError
+    """
+    if not check_valid_unix_time(value, as_result=True).ok:
+        raise LazyValueError(
+            'Value is not a valid UNIX time',
+            fields={'value': value}
+        )
+
+    return int(value)
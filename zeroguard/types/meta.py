@@ -1,9 +1,22 @@
 """Abstract data base classes."""
-from abc import ABC, abstractmethod
-import inspect
-
+from abc import ABC, ABCMeta, abstractmethod
+from collections.abc import Mapping
+import threading
+from types import MappingProxyType
+import warnings
+import weakref
+
+from zeroguard.errors.builtin import LazyValueError
 from zeroguard.errors.client import ZGClientError, ZGSanityCheckFailed
-from zeroguard.utils.log import format_logmsg, get_labeled_logger
+from zeroguard.types.schema import compile_decoder
+from zeroguard.utils.log import LazyLogMessage, get_labeled_logger
+
+# Prefix of an instance attribute name under which a raw (not yet
+# dereferenced) value of a reference field is kept
+PENDING_PREFIX = '_pending_'
+
+# Read-only fields mapping shared by all data references without fields
+EMPTY_FIELDS = MappingProxyType({})
 
 
 class NotResolved:
@@ -18,36 +31,124 @@ class NotResolved:
         return 'NotResolved'
 
 
-class DataTypeMeta(ABC):
+class DataTypeMetaclass(ABCMeta):
+    """Metaclass that generates a compact data type instance layout.
+
+    Each data type declares a tuple of its field names in a `FIELDS` class
+    attribute and a subset of reference-bearing ones in `REFERENCE_FIELDS`.
+    At class definition time this metaclass turns them into `__slots__` (plus
+    a `PENDING_PREFIX` prefixed slot for a raw value of each reference field)
+    and assigns every reference field a bit in a per-instance pending mask.
+
+    Reading a dereferenced field is a plain slot access. A reference field
+    that is still pending has an empty slot, so reading it falls through to
+    `DataTypeMeta.__getattr__` which dereferences it.
+
+    A data type which declares a `SCHEMA` of its fields and does not
+    implement `from_dict` gets a decoder generated from a schema (see
+    `zeroguard.types.schema` module).
+    """
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        """."""
+        if 'FIELDS' in namespace:
+            fields = tuple(namespace['FIELDS'])
+            reference_fields = tuple(namespace.get('REFERENCE_FIELDS', ()))
+
+            if not set(reference_fields).issubset(fields):
+                raise ZGSanityCheckFailed(
+                    message='Reference fields must be a subset of fields',
+                    context={
+                        'data_type': name,
+                        'fields': fields,
+                        'reference_fields': reference_fields
+                    }
+                )
+
+            extra_slots = namespace.get('__slots__', ())
+
+            if isinstance(extra_slots, str):
+                extra_slots = (extra_slots,)
+
+            namespace['__slots__'] = (
+                fields +
+                tuple(PENDING_PREFIX + f for f in reference_fields) +
+                tuple(extra_slots)
+            )
+
+        if 'SCHEMA' in namespace and 'from_dict' not in namespace:
+            decoder, source = compile_decoder(
+                name,
+                namespace['TYPE'],
+                namespace['SCHEMA'],
+                {'_resolve': _resolve_reference}
+            )
+
+            namespace['from_dict'] = classmethod(decoder)
+            namespace['DECODER_SOURCE'] = source
+
+        cls = super().__new__(mcs, name, bases, namespace, **kwargs)
+
+        cls._REFERENCE_BITS = {
+            field_name: 1 << index
+            for index, field_name in enumerate(cls.REFERENCE_FIELDS)
+        }
+
+        return cls
+
+
+class DataTypeMeta(ABC, metaclass=DataTypeMetaclass):
     """."""
 
+    __slots__ = ('_referencer', '_pending_mask', '__weakref__')
+
     TYPE = None
 
+    # Names of all data fields of a data type
+    FIELDS = ()
+
+    # Names of data fields that may contain references to other objects and
+    # thus have to be dereferenced before use
+    REFERENCE_FIELDS = ()
+
+    # Logger shared by all data type instances
+    _logger = get_labeled_logger(__name__)
+
     def __init__(self, logger_label=None, referencer=None):
-        """."""
-        self._logger = get_labeled_logger(__name__, logger_label)
-        self._referencer = referencer
-        self._deref_map = {}
+        """.
 
-    def __getattribute__(self, name):
-        """."""
-        value = object.__getattribute__(self, name)
+        :param logger_label: Deprecated and ignored, as all data type
+                             instances share one class-level logger.
+        :param referencer:   Referencer used to dereference reference fields.
 
-        # Bypass if getting an instance method or an internal attribute
-        if name.startswith('_') or inspect.ismethod(value):
-            return value
+        :type logger_label: str
+        :type referencer:   zeroguard.referencer.ReferencerMeta child
+        """
+        if logger_label is not None:
+            warnings.warn(
+                'logger_label argument of data types is deprecated and '
+                'ignored',
+                DeprecationWarning,
+                stacklevel=3
+            )
 
-        # Attribute was already dereferenced
-        try:
-            if self._deref_map[name]:
-                return value
+        self._referencer = referencer
 
-        except KeyError:
-            pass
+    def __getattr__(self, name):
+        """Dereference a pending reference field.
+
+        This is only called when a regular attribute lookup fails, which for
+        a reference field means that it was not yet dereferenced.
+
+        :raises: AttributeError, zeroguard.errors.client.ZGClientError
+        """
+        if name in self._REFERENCE_BITS:
+            return self.dereference(name)
 
-        # Return an attribute that was just dereferenced. This will raise if
-        # dereferencing failed.
-        return self.dereference(name)
+        raise AttributeError("'%s' object has no attribute '%s'" % (
+            self.__class__.__name__,
+            name
+        ))
 
     @property
     def type(self):
@@ -60,44 +161,112 @@ class DataTypeMeta(ABC):
 
         return self.TYPE
 
-    # FIXME: This is not tested and should be considered highly experimental
+    @property
+    def pending_fields(self):
+        """Return a tuple of reference field names not yet dereferenced."""
+        mask = self._get_pending_mask()
+
+        return tuple(
+            name for name, bit in self._REFERENCE_BITS.items() if mask & bit
+        )
+
     def dereference_all(self, recursive=False):
-        """."""
-        for name in dir(self):
-            if name.startswith('_'):
-                continue
+        """Dereference all reference fields of this instance.
+
+        :param recursive: Also dereference all data type instances which are
+                          referenced by this instance.
+        :type recursive:  bool
 
-            value = getattr(self, name)
+        :raises: zeroguard.errors.client.ZGClientError
+        """
+        for name in self.REFERENCE_FIELDS:
+            value = self.dereference(name)
+
+            if not recursive:
+                continue
 
-            if recursive and isinstance(value, DataTypeMeta):
-                value.dereference_all()
+            for child in value if isinstance(value, list) else (value,):
+                if isinstance(child, DataTypeMeta):
+                    child.dereference_all(recursive=True)
 
     def dereference(self, attribute_name):
-        """."""
+        """Dereference a reference field and return its resolved value.
+
+        Raw value is kept untouched if dereferencing fails so it can be
+        retried later (i.e. after a missing object has been added to a
+        referencer).
+
+        :raises: zeroguard.errors.client.ZGClientError
+        """
+        bit = self._REFERENCE_BITS.get(attribute_name, 0)
+
+        # Attribute was already dereferenced or is not a reference field
+        if not self._get_pending_mask() & bit:
+            return object.__getattribute__(self, attribute_name)
+
         attribute_value = self._dereference(
-            object.__getattribute__(self, attribute_name)
+            getattr(self, PENDING_PREFIX + attribute_name)
         )
 
-        self._deref_map[attribute_name] = True
-        setattr(self, attribute_name, attribute_value)
-        return object.__getattribute__(self, attribute_name)
+        self._set_dereferenced_field(attribute_name, attribute_value)
+        return attribute_value
+
+    def _set_dereferenced_field(self, name, value):
+        """Replace a pending raw value of a field with a dereferenced one."""
+        object.__setattr__(self, name, value)
+        object.__delattr__(self, PENDING_PREFIX + name)
+        self._pending_mask &= ~self._REFERENCE_BITS[name]
+
+    def _get_pending_mask(self):
+        """Return a bitmask of pending reference fields."""
+        try:
+            return object.__getattribute__(self, '_pending_mask')
+
+        except AttributeError:
+            return 0
+
+    def _set_reference_field(self, name, value):
+        """Set a raw value of a reference field to be dereferenced lazily."""
+        try:
+            object.__delattr__(self, name)
+
+        except AttributeError:
+            pass
+
+        object.__setattr__(self, PENDING_PREFIX + name, value)
+
+        self._pending_mask = (
+            self._get_pending_mask() | self._REFERENCE_BITS[name]
+        )
 
-    def _dereference(self, value):
+    def _dereference(self, value, referencer=None):
         """.
 
+        :param referencer: Mapping of reference IDs to objects to use instead
+                           of an instance referencer.
+
         :raises zeroguard.errors.client.ZGClientError
         """
+        if referencer is None:
+            referencer = self._referencer
+
         # Value is a data reference that can be resolved directly
         if isinstance(value, DataReference):
-            self._logger.debug(format_logmsg(
+            self._logger.debug(LazyLogMessage(
                 'Attempting to dereference a value',
                 fields={'reference': value}
             ))
 
+            if referencer is None:
+                raise ZGClientError(
+                    message='Cannot dereference a value without a referencer',
+                    context={'reference': value}
+                )
+
             try:
                 # Attempt to get a referenced object from a referencer by its
                 # reference ID. This might fail.
-                referenced_object = self._referencer[value.ref_id]
+                referenced_object = referencer[value.ref_id]
 
                 try:
                     # Execute a callback that allows a data type to handle any
@@ -139,12 +308,14 @@ class DataTypeMeta(ABC):
         # Value is a list which may contain references thus it should be
         # dereferenced recursively
         elif isinstance(value, list):
-            return [self._dereference(v) for v in value]
+            return [self._dereference(v, referencer) for v in value]
 
         # Value is a dictionary which may contain references thus it should be
         # dereferenced recursively
         elif isinstance(value, dict):
-            return {k: self._dereference(v) for k, v in value}
+            return {
+                k: self._dereference(v, referencer) for k, v in value.items()
+            }
 
         # Value is a nested data type instance which will be lazily derefernced
         # as soon as accessed or other non-reference value.
@@ -223,6 +394,145 @@ class DataTypeMeta(ABC):
         additional transformations needed.
         """
 
+    def to_ref_dict(self, ref_of):
+        """Return this object instance as a dictionary with references.
+
+        Unlike `to_dict`, referenced objects are not inlined but represented
+        with `_ref` dictionaries, which is the same format in which objects
+        are returned by the API and accepted by `from_dict`.
+
+        Data types without reference fields return `to_dict`. Others return
+        all `FIELDS` by their names with reference fields converted to `_ref`
+        dictionaries and other values converted to plain values (see
+        `to_plain_value`). Data types which dictionary form differs from their
+        fields override this method.
+
+        :param ref_of: Function which returns a reference ID of a referenced
+                       data type instance or raises KeyError.
+        :type ref_of:  callable
+
+        :raises: KeyError
+        """
+        if not self.REFERENCE_FIELDS:
+            return self.to_dict()
+
+        data = {'type': self.TYPE}
+
+        for name in self.FIELDS:
+            if name in self._REFERENCE_BITS:
+                data[name] = self._to_ref_value(name, ref_of)
+            else:
+                data[name] = to_plain_value(getattr(self, name))
+
+        return data
+
+    @classmethod
+    def from_packed(cls, values, referencer):
+        """Return a new instance of this data type loaded from packed values.
+
+        The default implementation passes values to a constructor as
+        positional arguments in a `FIELDS` order, with packed references of
+        reference fields resolved. It is an inverse of a default `to_packed`
+        for data types which constructors accept all fields in that order and
+        in their plain form.
+
+        :param values:     List of field values as returned by `to_packed`.
+        :param referencer: Referencer which is used to resolve references.
+
+        :type values:     list
+        :type referencer: zeroguard.referencer.ReferencerMeta child
+
+        :raises: IndexError, TypeError, ValueError
+        """
+        if len(values) != len(cls.FIELDS):
+            raise LazyValueError(
+                'Number of packed values does not match data type fields',
+                fields={'data_type': cls.TYPE, 'values': values}
+            )
+
+        return cls(
+            *(
+                _resolve_packed_field(referencer, value)
+                if name in cls._REFERENCE_BITS else value
+                for name, value in zip(cls.FIELDS, values)
+            ),
+            referencer=referencer
+        )
+
+    def to_packed(self, ref_of):
+        """Return this object instance as a list of compact field values.
+
+        This is a positional counterpart of `to_ref_dict` used by binary
+        serialization (see `zeroguard.codec`). References are represented as
+        reference IDs (or `[reference ID, fields]` pairs if references have
+        extra fields).
+
+        The default implementation returns all `FIELDS` in order with other
+        values converted to plain values. Data types override it to use more
+        compact forms (e.g. addresses as packed bytes).
+
+        :param ref_of: Same as in `to_ref_dict`.
+        :type ref_of:  callable
+
+        :raises: KeyError
+        """
+        return [
+            self._to_packed_reference(name, ref_of)
+            if name in self._REFERENCE_BITS
+            else to_plain_value(getattr(self, name))
+            for name in self.FIELDS
+        ]
+
+    def _get_raw_field(self, name):
+        """Return a value of a reference field without dereferencing it."""
+        if self._get_pending_mask() & self._REFERENCE_BITS[name]:
+            return getattr(self, PENDING_PREFIX + name)
+
+        return getattr(self, name)
+
+    def _to_ref_value(self, name, ref_of):
+        """Convert a reference field value to a `_ref` dictionary form.
+
+        :raises: KeyError
+        """
+        def convert(value):
+            if isinstance(value, DataReference):
+                data = dict(value.fields)
+                data['_ref'] = value.ref_id
+                return data
+
+            if isinstance(value, DataTypeMeta):
+                data = self._get_reference_fields(name, value)
+                data['_ref'] = ref_of(value)
+                return data
+
+            if isinstance(value, list):
+                return [convert(v) for v in value]
+
+            return value
+
+        return convert(self._get_raw_field(name))
+
+    def _to_packed_reference(self, name, ref_of):
+        """Convert a reference field value to its packed form.
+
+        :raises: KeyError
+        """
+        value = self._to_ref_value(name, ref_of)
+
+        if isinstance(value, list):
+            return [_pack_reference(v) for v in value]
+
+        return _pack_reference(value)
+
+    def _get_reference_fields(self, name, instance):
+        """Return extra reference fields of an already dereferenced instance.
+
+        This is an inverse of `update_from_reference_fields` callback.
+        """
+        # pylint: disable=W0613,R0201
+        return {}
+
     @abstractmethod
     def update_from_reference_fields(self, reference, derefed_value):
         """.
@@ -231,16 +541,183 @@ class DataTypeMeta(ABC):
         """
 
 
+def dereference_graph(objects, referencer=None, fetch=None, strict=True):
+    """Dereference all references of many data type instances at once.
+
+    All pending references of given instances are collected and looked up in
+    a referencer with a single batched `get_many` call. Reference IDs which
+    are missing from a referencer are requested with a single call of a fetch
+    hook and added to the referencer. All instances are then patched in
+    place. Newly dereferenced objects are processed the same way, level by
+    level, until a whole object graph is dereferenced.
+
+    :param objects:    Data type instances to dereference.
+    :param referencer: Referencer to use for all instances. Own referencer of
+                       each instance is used if not set.
+    :param fetch:      Function which accepts a list of missing reference IDs
+                       and returns a dictionary of reference IDs to data type
+                       instances.
+    :param strict:     Raise if any references are left unresolved. Otherwise
+                       such fields are left to be dereferenced lazily.
+
+    :type objects:    iterable(zeroguard.types.meta.DataTypeMeta)
+    :type referencer: zeroguard.referencer.ReferencerMeta child
+    :type fetch:      callable
+    :type strict:     bool
+
+    :return: Reference IDs which could not be resolved.
+    :rtype:  set(int)
+
+    :raises: zeroguard.errors.client.ZGClientError
+    """
+    frontier = list(objects)
+    visited = set()
+    unresolved = set()
+
+    while frontier:
+        # Pending fields and their reference IDs grouped by a referencer
+        groups = {}
+        next_frontier = []
+
+        for instance in frontier:
+            if not isinstance(instance, DataTypeMeta) or (
+                    id(instance) in visited
+            ):
+                continue
+
+            visited.add(id(instance))
+
+            # pylint: disable=W0212
+            instance_referencer = (
+                referencer if referencer is not None else instance._referencer
+            )
+
+            _, pending, ref_ids = groups.setdefault(
+                id(instance_referencer),
+                (instance_referencer, [], set())
+            )
+
+            for name in instance.REFERENCE_FIELDS:
+                if name not in instance.pending_fields:
+                    next_frontier.extend(_iter_instances(getattr(
+                        instance,
+                        name
+                    )))
+                    continue
+
+                field_ref_ids = set(_iter_reference_ids(
+                    instance._get_raw_field(name)
+                ))
+
+                pending.append((instance, name, field_ref_ids))
+                ref_ids.update(field_ref_ids)
+
+        for group_referencer, pending, ref_ids in groups.values():
+            found = _get_many(group_referencer, ref_ids)
+            missing = ref_ids.difference(found)
+
+            if missing and fetch is not None:
+                for ref_id, fetched in fetch(sorted(missing)).items():
+                    if group_referencer is not None:
+                        group_referencer[ref_id] = fetched
+
+                    found[ref_id] = fetched
+
+                missing = ref_ids.difference(found)
+
+            unresolved.update(missing)
+
+            for instance, name, field_ref_ids in pending:
+                # Fields are only patched when all their references can be
+                # resolved as update callbacks must run exactly once
+                if not field_ref_ids.issubset(found):
+                    continue
+
+                # pylint: disable=W0212
+                value = instance._dereference(
+                    instance._get_raw_field(name),
+                    found
+                )
+
+                instance._set_dereferenced_field(name, value)
+                next_frontier.extend(_iter_instances(value))
+
+        frontier = next_frontier
+
+    if unresolved and strict:
+        raise ZGClientError(
+            message='Failed to find referenced objects during dereferencing',
+            context={'reference_ids': sorted(unresolved)}
+        )
+
+    return unresolved
+
+
+def _get_many(referencer, ref_ids):
+    """Look up many reference IDs in a referencer or a plain mapping."""
+    if referencer is None or not ref_ids:
+        return {}
+
+    try:
+        get_many = referencer.get_many
+
+    except AttributeError:
+        found = {}
+
+        for ref_id in ref_ids:
+            try:
+                found[ref_id] = referencer[ref_id]
+            except KeyError:
+                pass
+
+        return found
+
+    return get_many(ref_ids)
+
+
+def _iter_instances(value):
+    """Yield all data type instances from a field value."""
+    if isinstance(value, DataTypeMeta):
+        yield value
+
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_instances(item)
+
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_instances(item)
+
+
+def _iter_reference_ids(value):
+    """Yield reference IDs of all data references from a raw field value."""
+    if isinstance(value, DataReference):
+        yield value.ref_id
+
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_reference_ids(item)
+
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_reference_ids(item)
+
+
 class DataReference:
-    """."""
+    """Immutable reference to a data type instance by its reference ID.
+
+    Extra reference fields are kept in a read-only mapping. All references
+    without fields share a single empty mapping. Use `intern_reference` to
+    get a reference which is shared with all equal references of a
+    referencer.
+    """
+
+    __slots__ = ('ref_id', 'fields', '__weakref__')
 
     def __init__(self, ref_id, fields=None):
         """."""
-        self.ref_id = ref_id
-        self.fields = fields if fields else {}
-
         # Basic data validation
-        if not isinstance(self.ref_id, int):
+        if not isinstance(ref_id, int):
             raise ZGSanityCheckFailed(
                 message='Reference ID is not an integer',
                 context={
@@ -249,7 +726,7 @@ class DataReference:
                 }
             )
 
-        if not isinstance(self.fields, dict):
+        if fields is not None and not isinstance(fields, Mapping):
             raise ZGSanityCheckFailed(
                 message='Fields is not a dictionary',
                 context={
@@ -258,6 +735,39 @@ class DataReference:
                 }
             )
 
+        object.__setattr__(self, 'ref_id', ref_id)
+        object.__setattr__(
+            self,
+            'fields',
+            MappingProxyType(dict(fields)) if fields else EMPTY_FIELDS
+        )
+
+    def __setattr__(self, name, value):
+        """."""
+        raise AttributeError('Data references are immutable')
+
+    def __delattr__(self, name):
+        """."""
+        raise AttributeError('Data references are immutable')
+
+    def __eq__(self, other):
+        """."""
+        if not isinstance(other, DataReference):
+            return NotImplemented
+
+        return (
+            self.ref_id == other.ref_id and
+            dict(self.fields) == dict(other.fields)
+        )
+
+    def __hash__(self):
+        """."""
+        return hash(reference_key(self.ref_id, self.fields))
+
+    def __reduce__(self):
+        """."""
+        return self.__class__, (self.ref_id, dict(self.fields))
+
     def __str__(self):
         """."""
         data = [
@@ -275,3 +785,148 @@ class DataReference:
         ]
 
         return '\n'.join(data)
+
+
+def reference_key(ref_id, fields=None):
+    """Return a hashable key of a reference ID and fields pair.
+
+    :raises: TypeError
+    """
+    if not fields:
+        return ref_id
+
+    return ref_id, frozenset(fields.items())
+
+
+def intern_reference(referencer, ref_id, fields=None):
+    """Return a data reference shared with all equal references.
+
+    References are interned per referencer. A new data reference is created
+    for referencers which do not support interning (e.g. plain dictionaries).
+
+    :type referencer: zeroguard.referencer.ReferencerMeta child
+
+    :rtype: zeroguard.types.meta.DataReference
+
+    :raises: zeroguard.errors.client.ZGSanityCheckFailed
+    """
+    try:
+        intern = referencer.intern_reference
+
+    except AttributeError:
+        return DataReference(ref_id, fields)
+
+    return intern(ref_id, fields)
+
+
+def _resolve_reference(referencer, ref_id):
+    """Resolve a reference ID in place or return an interned reference."""
+    try:
+        return referencer[ref_id]
+
+    except KeyError:
+        return intern_reference(referencer, ref_id)
+
+
+def _pack_reference(data):
+    """Convert a `_ref` dictionary to its packed form."""
+    if len(data) == 1:
+        return data['_ref']
+
+    fields = dict(data)
+    return [fields.pop('_ref'), fields]
+
+
+def to_plain_value(value):
+    """Convert a field value into a JSON and MessagePack marshallable form.
+
+    Objects with a `to_dict` method are converted to dictionaries, lists are
+    converted item by item and values of other types which are not plain
+    (e.g. `ipaddress` module objects) are converted to strings.
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+
+    if isinstance(value, (list, tuple)):
+        return [to_plain_value(v) for v in value]
+
+    if isinstance(value, dict):
+        return {k: to_plain_value(v) for k, v in value.items()}
+
+    try:
+        to_dict = value.to_dict
+
+    except AttributeError:
+        return str(value)
+
+    return to_dict()
+
+
+def _resolve_packed_field(referencer, value):
+    """Resolve a packed reference field value which may be a list.
+
+    A list is a list of packed references unless it is a single
+    `[reference ID, fields]` pair.
+
+    :raises: TypeError, ValueError
+    """
+    if isinstance(value, list) and not (
+            len(value) == 2 and isinstance(value[1], dict)
+    ):
+        return [resolve_packed_reference(referencer, v) for v in value]
+
+    return resolve_packed_reference(referencer, value)
+
+
+def resolve_packed_reference(referencer, value):
+    """Resolve a packed reference in place or return an interned reference.
+
+    References with extra fields are always left to be dereferenced lazily,
+    as the extra fields have to be handled by `update_from_reference_fields`
+    callback.
+
+    :raises: TypeError, ValueError
+    """
+    if isinstance(value, list):
+        ref_id, fields = value
+        return intern_reference(referencer, ref_id, fields)
+
+    return _resolve_reference(referencer, value)
+
+
+class ReferenceInternTable:
+    """Table of interned data references.
+
+    References are held weakly, so an entry is dropped as soon as no data
+    type instance refers to it anymore. A table is thread-safe, and only
+    misses are synchronized.
+    """
+
+    def __init__(self):
+        """."""
+        self._references = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return a number of currently interned references."""
+        return len(self._references)
+
+    def get(self, ref_id, fields=None):
+        """Return an interned reference for a reference ID and fields pair.
+
+        :raises: zeroguard.errors.client.ZGSanityCheckFailed
+        """
+        try:
+            key = reference_key(ref_id, fields)
+            return self._references[key]
+
+        except KeyError:
+            with self._lock:
+                return self._references.setdefault(
+                    key,
+                    DataReference(ref_id, fields)
+                )
+
+        # Unhashable reference IDs or field values are never interned
+        except (AttributeError, TypeError):
+            return DataReference(ref_id, fields)
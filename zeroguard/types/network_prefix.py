@@ -1,7 +1,7 @@
 """Network prefix data type."""
 from zeroguard.types.meta import DataTypeMeta
+from zeroguard.types.schema import Field
 from zeroguard.validators.networks import check_valid_network_prefix
-from zeroguard.utils.log import format_logmsg
 
 
 class NetworkPrefix(DataTypeMeta):
@@ -9,6 +9,10 @@ class NetworkPrefix(DataTypeMeta):
 
     TYPE = 'netpref'
 
+    FIELDS = ('prefix',)
+
+    SCHEMA = (Field('prefix'),)
+
     def __init__(self, prefix, **kwargs):
         """."""
         self.prefix = check_valid_network_prefix(prefix)
@@ -26,37 +30,19 @@ class NetworkPrefix(DataTypeMeta):
             'prefix': str(self.prefix)
         }
 
+    @classmethod
+    def from_packed(cls, values, referencer):
+        """."""
+        address, prefixlen = values
+        return cls((address, prefixlen), referencer=referencer)
+
+    def to_packed(self, ref_of):
+        """."""
+        return [self.prefix.network_address.packed, self.prefix.prefixlen]
+
     def update_from_reference_fields(self, reference, derefed_value):
         """Do nothing when this callback is executed.
 
         Network prefix data type does not have any fields that may be
         references thus does not need to handle any extra reference fields.
         """
-
-    @classmethod
-    def from_dict(cls, data, referencer):
-        """."""
-        errmsg = (
-            'Failed to create a network prefix instance from a supplied data '
-            'dictionary'
-        )
-
-        try:
-            data_type = data['type']
-            prefix = data['prefix']
-
-        except KeyError as err:
-            raise ValueError(format_logmsg(
-                errmsg,
-                error=err,
-                fields={'data': data}
-            ))
-
-        if data_type != cls.TYPE:
-            raise ValueError(format_logmsg(
-                errmsg,
-                error=Exception('Wrong data type in data'),
-                fields={'data': data}
-            ))
-
-        return cls(prefix, referencer=referencer)
@@ -0,0 +1,180 @@
+"""Declarative data type field schemas and generated decoders.
+
+A data type may declare its fields as a `SCHEMA` class attribute instead of
+implementing a `from_dict` method by hand. A decoder specialized for a schema
+is then generated as Python source code, compiled once at class definition
+time and used as a `from_dict` class method. A generated decoder is a single
+straight-line function without any per-field dispatch.
+
+Schema fields must be listed in the same order as respective positional
+arguments of a data type constructor.
+"""
+from zeroguard.errors.builtin import LazyValueError
+
+# Sentinel of a field without a default value
+REQUIRED = object()
+
+
+class Field:
+    """Field which is passed to a constructor as is."""
+
+    def __init__(self, name, key=None, default=REQUIRED):
+        """.
+
+        :param name:    Field (and a generated local variable) name.
+        :param key:     Data dictionary key. Same as a field name if not set.
+        :param default: Default value used if a key is missing. A field is
+                        required if not set.
+
+        :type name: str
+        :type key:  str
+        """
+        self.name = name
+        self.key = key if key else name
+        self.default = default
+
+    def source(self, data, namespace):
+        """Return a source code expression which extracts a field value.
+
+        :param data:      Variable name of a data dictionary.
+        :param namespace: Generated code globals to add constants to.
+
+        :type data:      str
+        :type namespace: dict
+        """
+        if self.default is REQUIRED:
+            return '%s[%r]' % (data, self.key)
+
+        default = '_default_%s' % self.name
+        namespace[default] = self.default
+
+        return '%s.get(%r, %s)' % (data, self.key, default)
+
+
+class ReferenceField(Field):
+    """Field holding a reference (or a list of references) to other objects.
+
+    References are resolved in place if a referencer already holds them and
+    are kept as interned data references otherwise.
+    """
+
+    def __init__(self, name, many=False, **kwargs):
+        """.
+
+        :param many: Field is a list of references.
+        :type many:  bool
+        """
+        self.many = many
+        super().__init__(name, **kwargs)
+
+    def source(self, data, namespace):
+        """Return an expression which extracts reference IDs."""
+        value = super().source(data, namespace)
+
+        if self.many:
+            return "[v['_ref'] for v in %s]" % value
+
+        return "%s['_ref']" % value
+
+    def resolve_source(self):
+        """Return an expression which resolves extracted reference IDs."""
+        if self.many:
+            return '[_resolve(referencer, r) for r in %s]' % self.name
+
+        return '_resolve(referencer, %s)' % self.name
+
+
+class NestedField(Field):
+    """Field holding a list of nested (not referenced) objects.
+
+    Nested objects are created by calling a nested class constructor with
+    values of its `SCHEMA` fields as positional arguments.
+    """
+
+    def __init__(self, name, cls, **kwargs):
+        """.
+
+        :param cls: Nested object class with a `SCHEMA` of plain fields.
+        """
+        self.cls = cls
+        super().__init__(name, **kwargs)
+
+    def source(self, data, namespace):
+        """Return an expression which creates nested objects."""
+        nested = '_nested_%s' % self.name
+        namespace[nested] = self.cls
+
+        return '[%s(%s) for v in %s]' % (
+            nested,
+            ', '.join(f.source('v', namespace) for f in self.cls.SCHEMA),
+            super().source(data, namespace)
+        )
+
+
+def compile_decoder(name, type_name, schema, namespace):
+    """Generate and compile a `from_dict` decoder for a data type schema.
+
+    :param name:      Data type class name.
+    :param type_name: Data type name expected in a 'type' key of data.
+    :param schema:    Data type fields.
+    :param namespace: Generated code globals. It must provide a `_resolve`
+                      function which resolves a reference ID using a
+                      referencer.
+
+    :type name:      str
+    :type type_name: str
+    :type schema:    tuple(zeroguard.types.schema.Field)
+    :type namespace: dict
+
+    :return: Decoder function with a `(cls, data, referencer)` signature and
+             its source code.
+    :rtype:  2-tuple of (function, str)
+    """
+    namespace = dict(
+        namespace,
+        LazyValueError=LazyValueError,
+        _errmsg=(
+            'Failed to create %s instance from a supplied data dictionary' % (
+                name
+            )
+        )
+    )
+
+    lines = [
+        'def from_dict(cls, data, referencer):',
+        '    try:',
+        "        if data['type'] != %r:" % type_name,
+        "            raise ValueError('Wrong data type in data')"
+    ]
+
+    for field in schema:
+        lines.append('        %s = %s' % (
+            field.name,
+            field.source('data', namespace)
+        ))
+
+    lines += [
+        '    except (KeyError, TypeError, ValueError) as err:',
+        '        raise LazyValueError(',
+        '            _errmsg,',
+        '            error=err,',
+        "            fields={'data': data}",
+        '        )'
+    ]
+
+    for field in schema:
+        if isinstance(field, ReferenceField):
+            lines.append('    %s = %s' % (field.name, field.resolve_source()))
+
+    lines.append('    return cls(%s, referencer=referencer)' % ', '.join(
+        field.name for field in schema
+    ))
+
+    source = '\n'.join(lines) + '\n'
+
+    exec(  # pylint: disable=W0122
+        compile(source, '<%s decoder>' % name, 'exec'),
+        namespace
+    )
+
+    return namespace['from_dict'], source
@@ -1,9 +1,14 @@
 """Subdomain data type."""
+from zeroguard.errors.builtin import LazyValueError
 from zeroguard.errors.client import ZGSanityCheckFailed
-from zeroguard.types.meta import DataTypeMeta, NotResolved
+from zeroguard.types.meta import (
+    DataTypeMeta,
+    NotResolved,
+    intern_reference,
+    resolve_packed_reference
+)
 from zeroguard.types.ip_address import IPv4Address, IPv6Address
 from zeroguard.utils.fmt import lpad
-from zeroguard.utils.log import format_logmsg
 from zeroguard.validators.domains import check_valid_domain
 
 
@@ -12,6 +17,18 @@ class Subdomain(DataTypeMeta):
 
     TYPE = 'subdomain'
 
+    FIELDS = ('name', 'ipv4', 'ipv6')
+    REFERENCE_FIELDS = ('ipv4', 'ipv6')
+
+    __slots__ = (
+        '_live_ipv4',
+        '_latest_ipv4',
+        '_oldest_ipv4',
+        '_live_ipv6',
+        '_latest_ipv6',
+        '_oldest_ipv6'
+    )
+
     def __init__(
             self,
             name,
@@ -22,16 +39,24 @@ class Subdomain(DataTypeMeta):
         """."""
         self.name = check_valid_domain(name)
 
-        self._live_ipv4 = None
-        self._latest_ipv4 = None
-        self._oldest_ipv4 = None
+        # These are resolved when IPv4/IPv6 addresses are dereferenced
+        self._live_ipv4 = NotResolved
+        self._latest_ipv4 = NotResolved
+        self._oldest_ipv4 = NotResolved
+
+        self._live_ipv6 = NotResolved
+        self._latest_ipv6 = NotResolved
+        self._oldest_ipv6 = NotResolved
 
-        self._live_ipv4 = None
-        self._latest_ipv6 = None
-        self._olders_ipv6 = None
+        self._set_reference_field(
+            'ipv4',
+            ipv4_addresses if ipv4_addresses else []
+        )
 
-        self.ipv4 = ipv4_addresses if ipv4_addresses else []
-        self.ipv6 = ipv6_addresses if ipv6_addresses else []
+        self._set_reference_field(
+            'ipv6',
+            ipv6_addresses if ipv6_addresses else []
+        )
 
         super().__init__(**kwargs)
 
@@ -158,6 +183,39 @@ class Subdomain(DataTypeMeta):
             'ipv6': [ipv6.to_dict() for ipv6 in self.ipv6]
         }
 
+    def to_ref_dict(self, ref_of):
+        """."""
+        return {
+            'type': self.TYPE,
+            'name': self.name,
+            'ipv4': self._to_ref_value('ipv4', ref_of),
+            'ipv6': self._to_ref_value('ipv6', ref_of)
+        }
+
+    @classmethod
+    def from_packed(cls, values, referencer):
+        """."""
+        name, ipv4_addresses, ipv6_addresses = values
+
+        return cls(
+            name,
+            ipv4_addresses=[
+                resolve_packed_reference(referencer, a) for a in ipv4_addresses
+            ],
+            ipv6_addresses=[
+                resolve_packed_reference(referencer, a) for a in ipv6_addresses
+            ],
+            referencer=referencer
+        )
+
+    def to_packed(self, ref_of):
+        """."""
+        return [
+            self.name,
+            self._to_packed_reference('ipv4', ref_of),
+            self._to_packed_reference('ipv6', ref_of)
+        ]
+
     def update_from_reference_fields(self, reference, derefed_value):
         """Update live/latest/oldest IPv4/IPv6 address properties."""
         # Determine a type of a dereferenced object
@@ -185,7 +243,7 @@ class Subdomain(DataTypeMeta):
                 if current_value == NotResolved:
                     setattr(self, attr_name, derefed_value)
                 else:
-                    RuntimeError()
+                    raise RuntimeError()
 
         # Multiple objects claim to be live/oldest/latest
         except RuntimeError:
@@ -198,6 +256,73 @@ class Subdomain(DataTypeMeta):
                 }
             )
 
+    def _get_reference_fields(self, name, instance):
+        """Return live/latest/oldest flags of a dereferenced address."""
+        return {
+            prop: True for prop in ('live', 'latest', 'oldest')
+            if getattr(self, '_%s_%s' % (prop, name)) is instance
+        }
+
     @classmethod
     def from_dict(cls, data, referencer):
         """."""
+        errmsg = (
+            'Failed to create a subdomain instance from a supplied data '
+            'dictionary'
+        )
+
+        try:
+            data_type = data['type']
+            name = data['name']
+
+            addresses_refs = [
+                [
+                    (
+                        ref['_ref'],
+                        {k: v for k, v in ref.items() if k != '_ref'}
+                    ) for ref in data.get(version, [])
+                ] for version in ('ipv4', 'ipv6')
+            ]
+
+        except (AttributeError, KeyError, TypeError) as err:
+            raise LazyValueError(
+                errmsg,
+                error=err,
+                fields={'data': data}
+            )
+
+        if data_type != cls.TYPE:
+            raise LazyValueError(
+                errmsg,
+                error=Exception('Wrong data type in data'),
+                fields={'data': data}
+            )
+
+        # Attempt to resolve references without extra fields in place. The
+        # rest are always dereferenced lazily as the extra fields have to be
+        # handled by update_from_reference_fields callback.
+        addresses = []
+
+        for refs in addresses_refs:
+            resolved = []
+
+            for ref_id, fields in refs:
+                try:
+                    if fields:
+                        raise KeyError(ref_id)
+
+                    resolved.append(referencer[ref_id])
+
+                except KeyError:
+                    resolved.append(
+                        intern_reference(referencer, ref_id, fields)
+                    )
+
+            addresses.append(resolved)
+
+        return cls(
+            name,
+            ipv4_addresses=addresses[0],
+            ipv6_addresses=addresses[1],
+            referencer=referencer
+        )
@@ -0,0 +1,25 @@
+"""Asyncio compatibility helper functions."""
+import asyncio
+
+
+def get_running_loop():
+    """Return an event loop running in a current thread.
+
+    `asyncio.get_running_loop` is only available since Python 3.7, so older
+    versions fall back to a private function it is based on.
+
+    :rtype: asyncio.AbstractEventLoop
+
+    :raises: RuntimeError
+    """
+    try:
+        return asyncio.get_running_loop()
+
+    except AttributeError:
+        # pylint: disable=W0212
+        loop = asyncio._get_running_loop()
+
+    if loop is None:
+        raise RuntimeError('No running event loop')
+
+    return loop
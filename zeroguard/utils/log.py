@@ -1,4 +1,5 @@
 """Logging and formatting utility functions."""
+import copy
 import logging
 import traceback
 
@@ -35,8 +36,13 @@ def check_printable(value):
     return False
 
 
-def format_logmsg(*msg, fields=None, error=None, trace=True):
-    """Format log message into a unified key-value format."""
+def format_logmsg(*msg, fields=None, error=None, trace=True, stack=None):
+    """Format log message into a unified key-value format.
+
+    :param stack: Summary of an error traceback to format instead of a
+                  traceback of an error itself.
+    :type stack:  traceback.StackSummary
+    """
     def tostrip(value):
         """Convert a value to a string and strip whitespace characters."""
         return str(value).strip().translate(ESCAPE_TRANSLATION_TABLE)
@@ -55,12 +61,22 @@ def format_logmsg(*msg, fields=None, error=None, trace=True):
         ))
 
         if trace:
-            fields.append('error_trace="%s"' % r'\\n'.join(
-                tostrip(l) for l in traceback.format_exception(
+            if stack is None:
+                lines = traceback.format_exception(
                     type(error),
                     error,
                     error.__traceback__
                 )
+
+            else:
+                lines = traceback.format_exception_only(type(error), error)
+
+                if stack:
+                    lines[:0] = ['Traceback (most recent call last):\n']
+                    lines[1:1] = stack.format()
+
+            fields.append('error_trace="%s"' % r'\\n'.join(
+                tostrip(l) for l in lines
             ))
 
     if fields:
@@ -72,6 +88,73 @@ def format_logmsg(*msg, fields=None, error=None, trace=True):
     return msg
 
 
+class LazyLogMessage:
+    """Log message which is formatted only when it is actually emitted.
+
+    Arguments are the same as of `format_logmsg` function. Passing an instance
+    to a logger instead of a formatted string defers all formatting until a
+    log record is rendered, so messages of disabled log levels cost only an
+    instance creation.
+
+    An error is kept as a copy without a traceback along with a summary of
+    its traceback, so a message does not keep frames of a failed call (and
+    their local variables) alive.
+    """
+
+    __slots__ = ('msg', 'fields', 'error', 'trace', 'stack')
+
+    def __init__(self, *msg, fields=None, error=None, trace=True):
+        """."""
+        self.msg = msg
+        self.fields = fields
+        self.error = None
+        self.trace = trace
+        self.stack = None
+
+        if error is not None:
+            self.error = detach_error(error)
+
+            if trace:
+                self.stack = traceback.StackSummary.extract(
+                    traceback.walk_tb(error.__traceback__),
+                    lookup_lines=False
+                )
+
+    def __str__(self):
+        """."""
+        return format_logmsg(
+            *self.msg,
+            fields=self.fields,
+            error=self.error,
+            trace=self.trace,
+            stack=self.stack
+        )
+
+    @property
+    def text(self):
+        """Return a plain message without fields and an error."""
+        return ' '.join(str(m) for m in self.msg if m)
+
+
+def detach_error(error):
+    """Return a copy of an error without its traceback and chained errors.
+
+    Errors which can not be rebuilt from their arguments are copied without
+    calling their `__init__`.
+    """
+    try:
+        return copy.copy(error)
+
+    except Exception:  # pylint: disable=W0703
+        cls = type(error)
+
+    detached = cls.__new__(cls, *error.args)
+    detached.args = error.args
+    detached.__dict__.update(error.__dict__)
+
+    return detached
+
+
 def get_labeled_logger(name, label=None):
     """.
 
@@ -0,0 +1,218 @@
+"""Memoization of validation and convertion results.
+
+Validators of frequently repeated values (IP addresses, network prefixes
+etc.) keep successful convertion results in bounded caches keyed on a raw
+value, its type and an expected type, so a repeated value costs a single
+dictionary lookup. Outcomes of checks without conversion (`convert=False`)
+are cached separately, including rejections, as they do not create errors.
+Cache entries are evicted in insertion order once a cache
+is full. Cached results must be immutable as they are shared by all callers.
+"""
+from zeroguard.validators.meta import (
+    REASON_OK,
+    ValidationResult,
+    validate,
+    validate_result
+)
+
+DEFAULT_MAX_ENTRIES = 8192
+
+# All conversion caches by their names
+CACHES = {}
+
+
+class ConversionCache:
+    """Bounded cache of convertion results of a single validator.
+
+    Converted values and outcomes of checks without conversion are kept in
+    two separate stores, each bounded by a maximum number of entries. Hit and
+    miss counters are not synchronized between threads and are
+    therefore approximate under concurrent use.
+    """
+
+    def __init__(self, name, max_entries=DEFAULT_MAX_ENTRIES):
+        """.
+
+        :param name:        Cache name under which it is registered.
+        :param max_entries: Maximum number of cached results. Caching is
+                            disabled if set to zero.
+
+        :type name:        str
+        :type max_entries: int
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = {}
+        self._outcomes = {}
+
+        CACHES[name] = self
+
+    def __len__(self):
+        """Return a number of currently cached results."""
+        return len(self._entries) + len(self._outcomes)
+
+    @property
+    def stats(self):
+        """Return cache usage statistics.
+
+        :rtype: dict
+        """
+        lookups = self.hits + self.misses
+
+        return {
+            'entries': len(self),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        """Drop all cached results and reset statistics."""
+        self._entries = {}
+        self._outcomes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def resize(self, max_entries):
+        """Change a maximum number of cached results.
+
+        Oldest results are dropped if a cache holds more results than a new
+        maximum. Setting it to zero disables caching.
+        """
+        self.max_entries = max_entries
+        self._evict(self._entries, max_entries)
+        self._evict(self._outcomes, max_entries)
+
+    def validate(
+            self,
+            value,
+            validators,
+            convert=True,
+            expected_type=None,
+            as_result=False
+    ):
+        """Validate a value using a cached result if possible.
+
+        Arguments and the return value are the same as of
+        `zeroguard.validators.meta.validate` function.
+
+        :raises: ValueError
+        """
+        if not self.max_entries:
+            return validate(
+                value,
+                validators,
+                convert,
+                expected_type,
+                as_result
+            )
+
+        key = (value.__class__, value, expected_type)
+
+        try:
+            result = self._entries[key]
+            self.hits += 1
+
+            if as_result:
+                return ValidationResult(True, result, REASON_OK)
+
+            return result if convert else True
+
+        except KeyError:
+            pass
+
+        # Unhashable values are never cached
+        except TypeError:
+            return validate(
+                value,
+                validators,
+                convert,
+                expected_type,
+                as_result
+            )
+
+        if not convert and not as_result:
+            return self._check(key, value, validators, expected_type)
+
+        self.misses += 1
+
+        if as_result:
+            result = validate_result(value, validators, expected_type)
+
+            if result.ok:
+                self._put(self._entries, key, result.value)
+
+            return result
+
+        result = validate(value, validators, convert, expected_type)
+
+        # Failures are not cached at all as they raise errors
+        self._put(self._entries, key, result)
+
+        return result
+
+    def _check(self, key, value, validators, expected_type):
+        """Check a value without conversion using a cached outcome.
+
+        :rtype: bool
+
+        :raises: ValueError
+        """
+        try:
+            outcome = self._outcomes[key]
+            self.hits += 1
+
+            return outcome
+
+        except KeyError:
+            self.misses += 1
+
+        outcome = validate(value, validators, False, expected_type)
+        self._put(self._outcomes, key, outcome)
+
+        return outcome
+
+    def _put(self, entries, key, result):
+        """Cache a result evicting the oldest one of a store if full."""
+        self._evict(entries, self.max_entries - 1)
+        entries[key] = result
+
+    @staticmethod
+    def _evict(entries, max_entries):
+        """Drop oldest results until there is at most a given number left."""
+        while len(entries) > max(max_entries, 0):
+            try:
+                del entries[next(iter(entries))]
+
+            # Entries are modified by another thread at the same time
+            except (KeyError, RuntimeError, StopIteration):
+                pass
+
+
+def cache_stats():
+    """Return usage statistics of all conversion caches by their names.
+
+    :rtype: dict
+    """
+    return {name: cache.stats for name, cache in CACHES.items()}
+
+
+def resize_caches(max_entries, names=None):
+    """Change a maximum number of cached results of conversion caches.
+
+    :param max_entries: Maximum number of cached results. Caching is disabled
+                        if set to zero.
+    :param names:       Names of caches to resize. All caches are resized if
+                        not set.
+
+    :type max_entries: int
+    :type names:       iterable(str)
+
+    :raises: KeyError
+    """
+    for name in CACHES if names is None else names:
+        CACHES[name].resize(max_entries)
@@ -1,7 +1,14 @@
 """Validation functions for internet domains, hostnames etc."""
 import re
 
-from zeroguard.validators.meta import to_unicode, validate
+from zeroguard.validators.cache import ConversionCache
+from zeroguard.validators.meta import (
+    BAD_VALUE_RESULT,
+    REASON_OK,
+    ValidationResult,
+    to_unicode,
+    validate
+)
 
 # This was kindly borrowed from 'validators' library:
 # https://github.com/kvesteri/validators/blob/master/validators/domain.py
@@ -12,24 +19,115 @@ DOMAIN_RE = re.compile((
     r'[A-Za-z]$'
 ), flags=re.IGNORECASE)
 
+# Plain ASCII strings (`str.isascii` is only available since Python 3.7)
+ASCII_RE = re.compile(r'[\x00-\x7f]*\Z')
+
+# Internationalized domain names converted to their ASCII form
+IDNA_CACHE = ConversionCache('idna')
 
-def check_valid_domain(value, convert=True, expected_type=None):
-    """Check whether a given value represents a valid internet domain."""
-    def convertor(value):
-        try:
-            converted = to_unicode(value).encode('idna').decode('ascii')
 
-            if DOMAIN_RE.match(converted):
-                return converted
+def check_valid_domain(
+        value,
+        convert=True,
+        expected_type=None,
+        as_result=False
+):
+    """Check whether a given value represents a valid internet domain.
 
-        except UnicodeError as err:
-            raise ValueError(err)
+    Plain ASCII names are matched directly as IDNA encoding leaves them
+    intact. Only internationalized names go through the IDNA codec and their
+    convertion results are memoized in `IDNA_CACHE`.
+    """
+    # Plain ASCII names are validated without raising any errors at all
+    if as_result and isinstance(value, str) and ASCII_RE.match(value) and (
+            expected_type in (None, str)
+    ):
+        if DOMAIN_RE.match(value):
+            return ValidationResult(True, value, REASON_OK)
 
-        raise ValueError()
+        return BAD_VALUE_RESULT
 
     return validate(
         value,
-        (convertor,),
+        (_to_ascii_domain,),
         convert=convert,
-        expected_type=expected_type
+        expected_type=expected_type,
+        as_result=as_result
     )
+
+
+def check_valid_domains(values):
+    """Validate and convert many internet domains at once.
+
+    This is a bulk counterpart of `check_valid_domain` which does not build
+    an exception for every ASCII name that fails validation.
+
+    :param values: Iterable of values to validate.
+    :type values:  iterable
+
+    :return: Converted names of valid values in order of appearance and a
+             list of (index, value) pairs of rejected values.
+    :rtype:  2-tuple of (list(str), list(tuple))
+    """
+    match = DOMAIN_RE.match
+    is_ascii = ASCII_RE.match
+
+    names = []
+    rejected = []
+
+    for index, value in enumerate(values):
+        if isinstance(value, str) and is_ascii(value):
+            if match(value):
+                names.append(value)
+            else:
+                rejected.append((index, value))
+
+            continue
+
+        try:
+            names.append(_to_ascii_domain(value))
+
+        except ValueError:
+            rejected.append((index, value))
+
+    return names, rejected
+
+
+def _to_ascii_domain(value):
+    """Convert a domain to its ASCII form.
+
+    :raises: ValueError
+    """
+    try:
+        value = to_unicode(value)
+
+    except UnicodeError as err:
+        raise ValueError(err)
+
+    if value is None:
+        raise ValueError('Domain is not set')
+
+    if ASCII_RE.match(value):
+        if DOMAIN_RE.match(value):
+            return value
+
+        raise ValueError()
+
+    return IDNA_CACHE.validate(value, (_idna_to_ascii_domain,))
+
+
+def _idna_to_ascii_domain(value):
+    """Convert an internationalized domain to its ASCII form.
+
+    :raises: ValueError
+    """
+    try:
+        converted = value.encode('idna').decode('ascii')
+
+        if DOMAIN_RE.match(converted):
+            return converted
+
+    except UnicodeError as err:
+        raise ValueError(err)
+
+    raise ValueError()
@@ -1,5 +1,35 @@
 """Utility and helper data validation/convertion functions."""
-from zeroguard.utils.log import format_logmsg
+from collections import namedtuple
+
+from zeroguard.errors.builtin import (
+    LazyRuntimeError,
+    LazyTypeError,
+    LazyValueError
+)
+
+# Reason codes of validation results
+REASON_OK = 0
+REASON_BAD_VALUE = 1
+REASON_CAST_ERROR = 2
+REASON_UNEXPECTED_TYPE = 3
+
+REASONS = {
+    REASON_OK: 'ok',
+    REASON_BAD_VALUE: 'bad_value',
+    REASON_CAST_ERROR: 'cast_error',
+    REASON_UNEXPECTED_TYPE: 'unexpected_type'
+}
+
+ValidationResult = namedtuple('ValidationResult', ('ok', 'value', 'reason'))
+
+# Failed validation results do not carry a value and are therefore shared
+BAD_VALUE_RESULT = ValidationResult(False, None, REASON_BAD_VALUE)
+CAST_ERROR_RESULT = ValidationResult(False, None, REASON_CAST_ERROR)
+UNEXPECTED_TYPE_RESULT = ValidationResult(
+    False,
+    None,
+    REASON_UNEXPECTED_TYPE
+)
 
 
 def cast_value(value, *cast_functions):
@@ -11,10 +41,10 @@ def cast_value(value, *cast_functions):
     :raises: TypeError, RuntimeError
     """
     if not cast_functions:
-        raise TypeError(format_logmsg(
+        raise LazyTypeError(
             'At least one cast function is required',
             fields={'cast_functions_provided': str(cast_functions)}
-        ))
+        )
 
     casted_value = None
     last_err = None
@@ -27,18 +57,18 @@ def cast_value(value, *cast_functions):
             last_err = err
 
         except Exception as err:
-            raise RuntimeError(format_logmsg(
+            raise LazyRuntimeError(
                 'Cast function raised a non-ValueError exception',
                 fields={'cast_function': cast_func, 'value': value},
                 error=err
-            ))
+            )
 
     if casted_value is None:
-        raise RuntimeError(format_logmsg(
+        raise LazyRuntimeError(
             'Failed to cast a value to any of the provided types',
             fields={'value': value},
             error=last_err
-        ))
+        )
 
     return casted_value
 
@@ -60,39 +90,101 @@ def to_unicode(obj, charset='utf-8', errors='strict'):
     return obj.decode(charset, errors)
 
 
-def validate(value, validators, convert=True, expected_type=None):
-    """."""
-    verb_expected_type = str(expected_type) if expected_type else 'not_spec'
+def validate(
+        value,
+        validators,
+        convert=True,
+        expected_type=None,
+        as_result=False
+):
+    """.
 
-    try:
-        result = cast_value(value, *validators)
+    Error messages are rendered only when a raised error is converted to a
+    string. Values rejected with `convert=False` do not create errors at all.
 
-    # Failed to cast which means that check has failed as well
-    except RuntimeError as err:
-        if convert:
-            raise ValueError(format_logmsg(
-                'Failed to convert a value to a native type',
-                error=err,
-                fields={
-                    'value': value,
-                    'expected_type': verb_expected_type
-                }
-            ))
-
-        return False
+    :param as_result: Return a validation result instead of raising errors.
+                      Overrides `convert`.
+    :type as_result:  bool
+
+    :rtype: bool | any | zeroguard.validators.meta.ValidationResult
+    """
+    if as_result:
+        return validate_result(value, validators, expected_type)
+
+    if not convert and validators:
+        checked = validate_result(value, validators)
+
+        if not checked.ok:
+            return False
+
+        result = checked.value
+
+    else:
+        result = _cast_or_raise(value, validators, expected_type)
 
     # Check whether conversion end up with an expected type
     if expected_type:
         if expected_type == type(result):
             return result
 
-        raise ValueError(format_logmsg(
+        raise LazyValueError(
             'Convertion yielded a type different from the one requested',
             fields={
                 'value': value,
-                'expected_type': verb_expected_type,
+                'expected_type': expected_type or 'not_spec',
                 'got_type': type(result)
             }
-        ))
+        )
 
     return result if convert else True
+
+
+def _cast_or_raise(value, validators, expected_type):
+    """Cast a value or raise a conversion error.
+
+    :raises: TypeError, ValueError
+    """
+    try:
+        return cast_value(value, *validators)
+
+    # Failed to cast which means that check has failed as well
+    except RuntimeError as err:
+        raise LazyValueError(
+            'Failed to convert a value to a native type',
+            error=err,
+            fields={
+                'value': value,
+                'expected_type': expected_type or 'not_spec'
+            }
+        )
+
+
+def validate_result(value, validators, expected_type=None):
+    """Validate and convert a value without raising any errors.
+
+    This is an exception-free counterpart of `validate` intended for bulk
+    filtering of dirty data. Only cast functions themselves may raise (and
+    their errors are discarded right away).
+
+    :return: Named tuple of a success flag, a converted value (None if
+             validation has failed) and a reason code (one of `REASON_*`
+             constants).
+    :rtype:  zeroguard.validators.meta.ValidationResult
+    """
+    for cast_func in validators:
+        try:
+            result = cast_func(value)
+
+        except ValueError:
+            continue
+
+        # pylint: disable=W0703
+        except Exception:
+            return CAST_ERROR_RESULT
+
+        if expected_type and expected_type != type(result):
+            return UNEXPECTED_TYPE_RESULT
+
+        return ValidationResult(True, result, REASON_OK)
+
+    return BAD_VALUE_RESULT
@@ -1,47 +1,309 @@
 """Network/internet data values validation and convertion functions."""
+from array import array
+from collections import namedtuple
 from ipaddress import ip_address, ip_network
+import socket
+import sys
 
-from zeroguard.validators.meta import validate
+from zeroguard.validators.cache import ConversionCache
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-def check_valid_ip_address(value, convert=True, expected_type=None):
+# Array type code of an unsigned integer which is exactly 32 bits wide
+UINT32_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+
+PackedIPAddresses = namedtuple(
+    'PackedIPAddresses',
+    ('versions', 'ipv4', 'ipv6')
+)
+
+IP_ADDRESS_CACHE = ConversionCache('ip_address')
+NETWORK_PREFIX_CACHE = ConversionCache('network_prefix')
+
+_IPV4_INVALID = bytes(4)
+_IPV6_INVALID = bytes(16)
+
+
+def check_valid_ip_address(
+        value,
+        convert=True,
+        expected_type=None,
+        as_result=False
+):
     """Check whether a given value represents a valid IP address.
 
-    Only IPv4 and IPv6 addresses are deemed to be valid.
+    Only IPv4 and IPv6 addresses are deemed to be valid. Convertion results
+    are memoized in `IP_ADDRESS_CACHE`.
     """
-    return validate(
+    return IP_ADDRESS_CACHE.validate(
         value,
         (ip_address,),
         convert=convert,
-        expected_type=expected_type
+        expected_type=expected_type,
+        as_result=as_result
     )
 
 
-def check_valid_network_prefix(value, convert=True, expected_type=None):
+def check_valid_network_prefix(
+        value,
+        convert=True,
+        expected_type=None,
+        as_result=False
+):
     """Check whether a given value represents a valid network prefix.
 
-    Network prefix can be a IPv4/IPv6 CIDR.
+    Network prefix can be a IPv4/IPv6 CIDR. Convertion results are memoized
+    in `NETWORK_PREFIX_CACHE`.
 
     :param string:        String to validate.
     :param convert:       Convert a given string to a native type if validation
                           succeeds.
     :param expected_type: Exact expected type that should be yielded after
                           convertion.
+    :param as_result:     Return a validation result instead of raising
+                          errors.
 
     :type string:        str
     :type convert:       bool
     :type expected_type: any
+    :type as_result:     bool
 
     :return: Validation result or a converted value.
     :rtype:  bool |
              ipaddress.IPv4Network |
-             ipaddress.IPv6Network
+             ipaddress.IPv6Network |
+             zeroguard.validators.meta.ValidationResult
 
     :raises: ValueError
     """
-    return validate(
+    return NETWORK_PREFIX_CACHE.validate(
         value,
         (ip_network,),
         convert=convert,
-        expected_type=expected_type
+        expected_type=expected_type,
+        as_result=as_result
+    )
+
+
+def pack_ipv4_addresses(values, use_numpy=False):
+    """Validate and pack many IPv4 addresses at once.
+
+    This is a bulk counterpart of `check_valid_ip_address` which does not
+    create any per-address objects. Values can be strings, packed 4 byte
+    addresses or integers, the same as accepted by `ipaddress.ip_address`.
+
+    :param values:    Iterable of values to validate.
+    :param use_numpy: Return NumPy arrays instead of standard library ones.
+
+    :type values:    iterable
+    :type use_numpy: bool
+
+    :return: Addresses as unsigned 32 bit integers (zero for invalid values)
+             and a validity mask, both aligned with the input.
+    :rtype:  2-tuple of (array.array, bytearray) |
+             2-tuple of (numpy.ndarray, numpy.ndarray)
+
+    :raises: ImportError
+    """
+    inet_pton = socket.inet_pton
+    af_inet = socket.AF_INET
+
+    packed = bytearray()
+    mask = bytearray()
+
+    for value in values:
+        try:
+            packed += inet_pton(af_inet, value)
+            mask.append(1)
+            continue
+
+        except (OSError, TypeError, ValueError):
+            pass
+
+        address = _pack_non_string(value, 4)
+        packed += address if address else _IPV4_INVALID
+        mask.append(1 if address else 0)
+
+    return _to_uint32_array(packed, use_numpy), _to_mask(mask, use_numpy)
+
+
+def pack_ipv6_addresses(values, use_numpy=False):
+    """Validate and pack many IPv6 addresses at once.
+
+    Values can be strings, packed 16 byte addresses or integers. Scoped IPv6
+    addresses (i.e. 'fe80::1%eth0') are rejected as a scope cannot be kept in
+    a packed form.
+
+    :param values:    Iterable of values to validate.
+    :param use_numpy: Return NumPy arrays instead of standard library ones.
+
+    :type values:    iterable
+    :type use_numpy: bool
+
+    :return: Addresses as 16 byte big endian records (zeroed for invalid
+             values) and a validity mask, both aligned with the input. NumPy
+             addresses array has a (N, 2) shape of unsigned 64 bit integers
+             (high and low halves of an address).
+    :rtype:  2-tuple of (bytearray, bytearray) |
+             2-tuple of (numpy.ndarray, numpy.ndarray)
+
+    :raises: ImportError
+    """
+    inet_pton = socket.inet_pton
+    af_inet6 = socket.AF_INET6
+
+    packed = bytearray()
+    mask = bytearray()
+
+    for value in values:
+        try:
+            packed += inet_pton(af_inet6, value)
+            mask.append(1)
+            continue
+
+        except (OSError, TypeError, ValueError):
+            pass
+
+        address = _pack_non_string(value, 6)
+        packed += address if address else _IPV6_INVALID
+        mask.append(1 if address else 0)
+
+    return _to_uint128_records(packed, use_numpy), _to_mask(mask, use_numpy)
+
+
+def pack_ip_addresses(values, use_numpy=False):
+    """Validate and pack many IP addresses of both versions at once.
+
+    :param values:    Iterable of values to validate.
+    :param use_numpy: Return NumPy arrays instead of standard library ones.
+
+    :type values:    iterable
+    :type use_numpy: bool
+
+    :return: Named tuple of IP versions aligned with the input (0 for invalid
+             values) and valid IPv4 and IPv6 addresses in order of
+             appearance. IPv4 and IPv6 addresses are in the same format as
+             returned by `pack_ipv4_addresses` and `pack_ipv6_addresses`.
+    :rtype:  PackedIPAddresses
+
+    :raises: ImportError
+    """
+    inet_pton = socket.inet_pton
+    af_inet = socket.AF_INET
+    af_inet6 = socket.AF_INET6
+
+    versions = bytearray()
+    packed_ipv4 = bytearray()
+    packed_ipv6 = bytearray()
+
+    for value in values:
+        try:
+            packed_ipv4 += inet_pton(af_inet, value)
+            versions.append(4)
+            continue
+
+        except (OSError, TypeError, ValueError):
+            pass
+
+        try:
+            packed_ipv6 += inet_pton(af_inet6, value)
+            versions.append(6)
+            continue
+
+        except (OSError, TypeError, ValueError):
+            pass
+
+        address = _pack_non_string(value, 4)
+
+        if address:
+            packed_ipv4 += address
+            versions.append(4)
+            continue
+
+        address = _pack_non_string(value, 6)
+
+        if address:
+            packed_ipv6 += address
+            versions.append(6)
+            continue
+
+        versions.append(0)
+
+    return PackedIPAddresses(
+        _to_mask(versions, use_numpy, dtype='u1'),
+        _to_uint32_array(packed_ipv4, use_numpy),
+        _to_uint128_records(packed_ipv6, use_numpy)
     )
+
+
+def _pack_non_string(value, version):
+    """Pack a bytes or an integer value the same way ipaddress does.
+
+    :return: Packed address or None if a value is not a valid address.
+    :rtype:  bytes | None
+    """
+    length = 4 if version == 4 else 16
+
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value) if len(value) == length else None
+
+    if isinstance(value, int) and not isinstance(value, bool):
+        # IPv4 range takes precedence in the same way as in ipaddress module
+        if version == 6 and 0 <= value < 2 ** 32:
+            return None
+
+        try:
+            return value.to_bytes(length, 'big')
+
+        except OverflowError:
+            return None
+
+    return None
+
+
+def _check_numpy():
+    """Make sure NumPy is available.
+
+    :raises: ImportError
+    """
+    if numpy is None:
+        raise ImportError('NumPy output was requested but it is not installed')
+
+
+def _to_mask(mask, use_numpy, dtype='bool'):
+    """Convert a mask bytearray to a requested output format."""
+    if not use_numpy:
+        return mask
+
+    _check_numpy()
+    return numpy.frombuffer(bytes(mask), dtype='u1').astype(dtype)
+
+
+def _to_uint32_array(packed, use_numpy):
+    """Convert packed big endian IPv4 addresses to an array of integers."""
+    if use_numpy:
+        _check_numpy()
+        return numpy.frombuffer(bytes(packed), dtype='>u4').astype('u4')
+
+    addresses = array(UINT32_TYPECODE)
+    addresses.frombytes(packed)
+
+    if sys.byteorder == 'little':
+        addresses.byteswap()
+
+    return addresses
+
+
+def _to_uint128_records(packed, use_numpy):
+    """Convert packed big endian IPv6 addresses to a requested format."""
+    if use_numpy:
+        _check_numpy()
+        return numpy.frombuffer(
+            bytes(packed),
+            dtype='>u8'
+        ).astype('u8').reshape(-1, 2)
+
+    return packed
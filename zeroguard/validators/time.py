@@ -4,7 +4,12 @@ from datetime import datetime
 from zeroguard.validators.meta import validate
 
 
-def check_valid_unix_time(value, convert=True, expected_type=None):
+def check_valid_unix_time(
+        value,
+        convert=True,
+        expected_type=None,
+        as_result=False
+):
     """."""
     def convertor(value):
         try:
@@ -17,5 +22,6 @@ def check_valid_unix_time(value, convert=True, expected_type=None):
         value,
         (convertor,),
         convert=convert,
-        expected_type=expected_type
+        expected_type=expected_type,
+        as_result=as_result
     )